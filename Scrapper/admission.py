@@ -0,0 +1,266 @@
+import math
+import time
+import heapq
+import itertools
+from collections import Counter
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from metrics import registry
+
+QUEUE_DEPTH = registry.gauge(
+    "lyrics_admission_queue_depth", "Generations waiting for a slot")
+QUEUED_TOKENS = registry.gauge(
+    "lyrics_admission_queued_tokens", "Token budget of the generations waiting for a slot")
+RUNNING = registry.gauge(
+    "lyrics_admission_running", "Generations holding a slot")
+SHED = registry.counter(
+    "lyrics_admission_shed_total", "Generations rejected by admission control", ("reason",))
+TOKEN_RATE = registry.gauge(
+    "lyrics_admission_tokens_per_second", "Estimated token budget completed per second per slot")
+
+class Overloaded(Exception):
+    """Admission control rejected the work; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+class Ticket:
+    """One unit of admitted work: a generation's token budget and the slot it runs in"""
+
+    def __init__(self, client, genre, cost, fn, kwargs, start_tag, seq, deadline):
+        self.client = client
+        self.genre = genre
+        self.cost = cost
+        self.fn = fn
+        self.kwargs = kwargs
+        self.start_tag = start_tag
+        self.seq = seq
+        self.deadline = deadline
+        self.future = Future()
+        self.started = None
+        self.released = False
+
+    def __lt__(self, other):
+        return (self.start_tag, self.seq) < (other.start_tag, other.seq)
+
+class AdmissionController:
+    """Bounded, fair work queue in front of a fixed number of generation slots.
+
+    Work is admitted with a token budget (its max_length). A request is
+    rejected up front when the queue already holds ``max_queue`` generations or
+    the queued budget would take longer than ``queue_timeout`` to drain at the
+    measured token rate; generations still waiting after ``queue_timeout`` are
+    shed instead of started late. Rejections carry a Retry-After derived from
+    the queued budget.
+
+    Free slots go to the waiting generation with the smallest start tag
+    (start-time fair queueing): a generation starts after the budget its client
+    and its genre already have queued, so one client or one hot genre cannot
+    starve the others, while an idle client's first request goes straight to
+    the front.
+    """
+
+    def __init__(self, slots=4, max_queue=32, queue_timeout=30.0, initial_rate=50.0):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = initial_rate
+        self.executor = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="generation")
+        self._queue = []
+        self._queued_tokens = 0
+        self._running = 0
+        self._running_tokens = 0
+        self._virtual_time = 0.0
+        self._client_finish = {}
+        self._genre_finish = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def retry_after(self, tokens=0):
+        """Seconds until the queued budget (plus `tokens`) should have drained"""
+        return max(1, math.ceil((self._queued_tokens + tokens) / (self.rate * self.slots)))
+
+    def submit_all(self, client, jobs):
+        """Queue (genre, cost, fn, kwargs) jobs all-or-nothing; returns a Future per job.
+
+        A job with fn None is a reservation: its future resolves to the ticket
+        once a slot is free, and the caller must release() it when done.
+        """
+        now = time.monotonic()
+        cost = sum(job_cost for _, job_cost, _, _ in jobs)
+        with self._lock:
+            self._expire(now)
+            client_finish = self._client_finish.get(client, 0.0)
+            genre_finish = dict(self._genre_finish)
+            tickets = []
+            for genre, job_cost, fn, kwargs in jobs:
+                start_tag = max(self._virtual_time, client_finish, genre_finish.get(genre, 0.0))
+                client_finish = genre_finish[genre] = start_tag + job_cost
+                tickets.append(Ticket(client, genre, job_cost, fn, kwargs, start_tag, next(self._seq),
+                                      now + self.queue_timeout))
+
+            # Only wait if the slots are busy; then predict the last job's wait from the budget
+            # served before it, plus the running generations (half done on average)
+            if self._running + len(self._queue) + len(jobs) > self.slots:
+                last = tickets[-1]
+                ahead = sum(ticket.cost for ticket in self._queue if ticket < last) + cost - last.cost
+                predicted = (ahead + self._running_tokens / 2) / (self.rate * self.slots)
+                if predicted > self.queue_timeout:
+                    self._shed("predicted_wait", len(jobs))
+                    raise Overloaded(f"Estimated queue wait of {predicted:.0f}s exceeds {self.queue_timeout:.0f}s",
+                                     self.retry_after(cost), "predicted_wait")
+
+            if not self._make_room(client, len(jobs)):
+                self._shed("queue_full", len(jobs))
+                raise Overloaded(f"Generation queue is full ({len(self._queue)} waiting)",
+                                 self.retry_after(cost), "queue_full")
+
+            self._client_finish[client] = client_finish
+            self._genre_finish.update(genre_finish)
+            for ticket in tickets:
+                heapq.heappush(self._queue, ticket)
+                self._queued_tokens += ticket.cost
+            self._dispatch(now)
+            self._update_gauges()
+        return [ticket.future for ticket in tickets]
+
+    def submit(self, client, genre, cost, fn, kwargs):
+        """Queue one generation; the future resolves to fn(**kwargs)"""
+        return self.submit_all(client, [(genre, cost, fn, kwargs)])[0]
+
+    def reserve(self, client, genre, cost):
+        """Future resolving to a ticket holding a slot, for work the caller runs itself (streaming)"""
+        return self.submit_all(client, [(genre, cost, None, {})])[0]
+
+    def release(self, ticket):
+        """Give a slot back; safe to call more than once"""
+        now = time.monotonic()
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._running -= 1
+            self._running_tokens -= ticket.cost
+            elapsed = now - ticket.started
+            # Moving average of budget completed per slot-second; cache hits finish almost
+            # instantly, so one sample may at most double the estimate
+            if elapsed > 0:
+                self.rate = 0.8 * self.rate + 0.2 * min(max(ticket.cost / elapsed, 1.0), 2 * self.rate)
+                TOKEN_RATE.set(self.rate)
+            self._dispatch(now)
+            self._update_gauges()
+
+    def result(self, future):
+        """Wait for queued work, shedding it if it has not started by its deadline"""
+        if not wait([future], timeout=self.queue_timeout).done:
+            self.expire()
+        return future.result()
+
+    def expire(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            self._update_gauges()
+
+    def _make_room(self, client, count):
+        """Free `count` queue entries, displacing the newest work of the client with the most queued.
+
+        Fails if the queue would still be full without taking entries from a
+        client that has no more queued than `client` would.
+        """
+        while len(self._queue) + count > self.max_queue:
+            queued = Counter(ticket.client for ticket in self._queue)
+            victim, victim_count = queued.most_common(1)[0] if queued else (None, 0)
+            if victim is None or victim == client or victim_count <= queued[client] + count:
+                return False
+            ticket = max(ticket for ticket in self._queue if ticket.client == victim)
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._queued_tokens -= ticket.cost
+            if ticket.future.set_running_or_notify_cancel():
+                self._shed("displaced", 1)
+                ticket.future.set_exception(Overloaded("Displaced from the generation queue by other clients",
+                                                       self.retry_after(), "displaced"))
+        return True
+
+    def _expire(self, now):
+        """Shed cancelled and timed out tickets still in the queue"""
+        if not any(ticket.future.cancelled() or ticket.deadline <= now for ticket in self._queue):
+            return
+        waiting = []
+        for ticket in self._queue:
+            if ticket.future.cancelled():
+                self._queued_tokens -= ticket.cost
+            elif ticket.deadline <= now:
+                self._queued_tokens -= ticket.cost
+                self._shed("queue_timeout", 1)
+                ticket.future.set_exception(Overloaded(
+                    f"Waited more than {self.queue_timeout:.0f}s for a generation slot",
+                    self.retry_after(), "queue_timeout"))
+            else:
+                waiting.append(ticket)
+        heapq.heapify(waiting)
+        self._queue = waiting
+
+    def _dispatch(self, now):
+        self._expire(now)
+        while self._queue and self._running < self.slots:
+            ticket = heapq.heappop(self._queue)
+            self._queued_tokens -= ticket.cost
+            # A future cancelled while queued (e.g. a collaborative timeout) never takes a slot
+            if not ticket.future.set_running_or_notify_cancel():
+                continue
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._running += 1
+            self._running_tokens += ticket.cost
+            ticket.started = now
+            if ticket.fn is None:
+                ticket.future.set_result(ticket)
+            else:
+                self.executor.submit(self._run, ticket)
+        if len(self._client_finish) + len(self._genre_finish) > 4 * self.max_queue:
+            # Finish tags in the past no longer hold anyone back
+            self._client_finish = {key: tag for key, tag in self._client_finish.items() if tag > self._virtual_time}
+            self._genre_finish = {key: tag for key, tag in self._genre_finish.items() if tag > self._virtual_time}
+
+    def _run(self, ticket):
+        try:
+            result = ticket.fn(**ticket.kwargs)
+        except BaseException as e:
+            ticket.future.set_exception(e)
+        else:
+            ticket.future.set_result(result)
+        finally:
+            self.release(ticket)
+
+    def _shed(self, reason, count):
+        SHED.inc(count, reason=reason)
+
+    def _update_gauges(self):
+        QUEUE_DEPTH.set(len(self._queue))
+        QUEUED_TOKENS.set(self._queued_tokens)
+        RUNNING.set(self._running)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "running": self._running,
+                "queued": len(self._queue),
+                "queued_tokens": self._queued_tokens,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "tokens_per_second": round(self.rate, 2)
+            }
+
+    def shutdown(self):
+        """Fail queued work and stop the generation threads once running work has finished"""
+        with self._lock:
+            for ticket in self._queue:
+                if ticket.future.set_running_or_notify_cancel():
+                    ticket.future.set_exception(Overloaded("Server is shutting down", self.retry_after(), "shutdown"))
+            self._queue = []
+            self._queued_tokens = 0
+            self._update_gauges()
+        self.executor.shutdown(wait=False)
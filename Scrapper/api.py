@@ -1,8 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 import os
+import json
+import math
+import time
+import threading
+from concurrent.futures import wait
+from contextlib import ExitStack
 import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from transformers import TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+from transformers import LogitsProcessor, LogitsProcessorList
+from transformers import TemperatureLogitsWarper, TopKLogitsWarper, TopPLogitsWarper
 import random
+from model_registry import ModelRegistry
+from generation_cache import GenerationCache, generation_key
+import metrics
+from metrics import Trace
+from sampling_profiler import SamplingProfiler
+from memorization_index import MemorizationChecker
+from admission import AdmissionController, Overloaded
+from rhyme_constraints import constraint_processors, parse_rhyme_scheme, parse_syllables
 
 app = Flask(__name__)
 
@@ -17,55 +33,320 @@ GENRE_TO_WRITER = {
     "latin": "Rico Vega"
 }
 
-# Dictionary to store loaded models
-loaded_models = {}
+COLLABORATIVE_TIMEOUT = float(os.environ.get("COLLABORATIVE_TIMEOUT", 60))
+MIN_COLLABORATIVE_TIMEOUT = 1.0
+
+# Per-request caps: max_length of one generation, max_length summed over a
+# request's generations, and genres per /api/collaborative request
+MAX_LENGTH_LIMIT = int(os.environ.get("MAX_LENGTH_LIMIT", 512))
+REQUEST_TOKEN_BUDGET = int(os.environ.get("REQUEST_TOKEN_BUDGET", 1536))
+MAX_COLLABORATIVE_GENRES = int(os.environ.get("MAX_COLLABORATIVE_GENRES", len(GENRE_TO_WRITER)))
+
+# Every generation waits in one bounded, fair queue for one of GENERATION_WORKERS slots, see admission.py
+admission = AdmissionController(
+    slots=int(os.environ.get("GENERATION_WORKERS", os.environ.get("COLLABORATIVE_WORKERS", 4))),
+    max_queue=int(os.environ.get("GENERATION_QUEUE_SIZE", 32)),
+    queue_timeout=float(os.environ.get("GENERATION_QUEUE_TIMEOUT", 30))
+)
+
+# Loaded models, bounded by MODEL_MEMORY_BUDGET_MB (0 means no limit)
+model_registry = ModelRegistry(
+    models_dir="trained_models",
+    memory_budget_mb=float(os.environ.get("MODEL_MEMORY_BUDGET_MB", 0)),
+    mmap_weights=os.environ.get("MMAP_WEIGHTS", "1") != "0",
+    quantized=os.environ.get("QUANTIZED_MODELS", "0") == "1",
+    speculative=os.environ.get("SPECULATIVE_DECODING", "0") == "1"
+)
+
+# Results of seeded generations, see generation_cache.py
+generation_cache = GenerationCache(
+    max_entries=int(os.environ.get("GENERATION_CACHE_SIZE", 1024)),
+    disk_dir=os.environ.get("GENERATION_CACHE_DIR") or None
+)
+
+# Verbatim overlap with the training lyrics, see memorization_index.py.
+# Generations copying MEMORIZATION_MAX_OVERLAP or more words are rejected (0 disables the check)
+MEMORIZATION_MAX_OVERLAP = int(os.environ.get("MEMORIZATION_MAX_OVERLAP", 0))
+memorization_checker = MemorizationChecker(os.environ.get("MEMORIZATION_INDEX_DIR", "memorization_index"))
+MEMORIZATION_BLOCKED = metrics.registry.counter(
+    "lyrics_memorization_blocked_total", "Generations rejected for copying training lyrics", ("genre",))
+
+# Sampling profiler, toggled at runtime through /api/admin/profiler
+profiler = SamplingProfiler()
 
 def load_model(genre):
     """Load a model for a specific genre if not already loaded"""
-    if genre not in loaded_models:
-        model_dir = os.path.join("trained_models", genre)
-        if not os.path.exists(model_dir):
-            return None, None
+    return model_registry.get(genre)
+
+# Serving state reported by the health and readiness endpoints
+server_state = {
+    "ready": False,
+    "draining": False,
+    "preloaded": []
+}
+
+def preload_models():
+    """Load the hot genres listed in PRELOAD_GENRES (comma separated) before serving"""
+    genres = [g.strip() for g in os.environ.get("PRELOAD_GENRES", "").split(",") if g.strip()]
+    if genres:
+        print(f"Preloading models: {', '.join(genres)}")
+        server_state["preloaded"] = model_registry.preload(genres)
+    server_state["ready"] = True
+
+def begin_shutdown():
+    """Stop reporting ready so load balancers drain this process before it exits"""
+    server_state["draining"] = True
+
+def shutdown():
+    """Release worker threads once in-flight requests have finished"""
+    begin_shutdown()
+    admission.shutdown()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # For streaming responses this covers the time until streaming starts
+    endpoint = request.endpoint or "unknown"
+    if hasattr(g, "request_start"):
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+class CancelledCriteria(StoppingCriteria):
+    """Stop generation as soon as the cancel event is set (e.g. the client went away)"""
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancel_event.is_set()
+
+class SeededSampler(LogitsProcessor):
+    """Sample each token from a private torch.Generator and force it as the only choice.
+
+    Used with greedy decoding, this makes a seeded request reproducible even while
+    other threads draw from torch's global RNG.
+    """
+    def __init__(self, seed, temperature=1.0, top_k=50, top_p=0.95, device="cpu"):
+        self.generator = torch.Generator(device=device)
+        self.generator.manual_seed(seed)
+        self.warpers = LogitsProcessorList()
+        if temperature != 1.0:
+            self.warpers.append(TemperatureLogitsWarper(temperature))
+        if top_k:
+            self.warpers.append(TopKLogitsWarper(top_k))
+        if top_p < 1.0:
+            self.warpers.append(TopPLogitsWarper(top_p))
+
+    def __call__(self, input_ids, scores):
+        scores = self.warpers(input_ids, scores)
+        probs = torch.softmax(scores.float(), dim=-1)
+        next_tokens = torch.multinomial(probs, num_samples=1, generator=self.generator)
+        forced = torch.full_like(scores, float("-inf"))
+        return forced.scatter_(1, next_tokens, 0.0)
+
+def sampling_kwargs(temperature, top_k, top_p, seed, device, constraints=()):
+    """Keyword arguments for model.generate() that implement the requested sampling"""
+    if seed is None:
+        kwargs = dict(temperature=temperature, top_k=top_k, top_p=top_p, do_sample=True)
+        if constraints:
+            kwargs["logits_processor"] = LogitsProcessorList(constraints)
+        return kwargs
+    # Constraint masks go first so the seeded sampler only draws allowed tokens
+    return dict(
+        do_sample=False,
+        logits_processor=LogitsProcessorList([*constraints, SeededSampler(seed, temperature, top_k, top_p, device)])
+    )
+
+def speculative_kwargs(genre, constraints=()):
+    """Use the genre's draft model as the assistant for speculative decoding, if it has one"""
+    # Constraint processors track lines token by token, which assisted decoding does not do
+    if constraints:
+        return {}
+    draft = model_registry.draft(genre)
+    if draft is None:
+        return {}
+    return dict(assistant_model=draft)
+
+def generate_lyrics(genre, prompt, max_length=200, temperature=1.0, top_k=50, top_p=0.95, seed=None, cancel_event=None, trace=None,
+                    rhyme_scheme=None, syllables=None):
+    """Generate lyrics using the model for a specific genre"""
+    if trace is None:
+        trace = Trace(genre)
+    trace.begin()
+    
+    # Seeded requests are deterministic, so serve repeats from the cache
+    cache_key = None
+    if seed is not None and model_registry.is_available(genre):
+        with trace.span("cache"):
+            params = {"max_length": max_length, "temperature": temperature, "top_k": top_k, "top_p": top_p,
+                      "speculative": model_registry.speculative and not (rhyme_scheme or syllables),
+                      "rhyme_scheme": rhyme_scheme, "syllables": syllables}
+            cache_key = generation_key(model_registry.fingerprint(genre, params["speculative"]), prompt, params, seed)
+            cached_text = generation_cache.get(cache_key)
+        if cached_text is not None:
+            trace.log(cached=True)
+            return cached_text
+    
+    with ExitStack() as stack:
+        with trace.span("load"):
+            model, tokenizer = stack.enter_context(model_registry.use(genre))
+        if model is None or tokenizer is None:
+            return f"No trained model found for genre: {genre}"
         
-        tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
-        model = GPT2LMHeadModel.from_pretrained(model_dir)
+        # Encode the prompt
+        with trace.span("encode"):
+            input_ids = tokenizer.encode(prompt, return_tensors="pt")
+            
+            # Move input to the same device as the model
+            device = next(model.parameters()).device
+            input_ids = input_ids.to(device)
+            constraints = constraint_processors(tokenizer, rhyme_scheme, syllables)
+        trace.count_tokens("prompt", input_ids.shape[1])
         
-        # Move model to GPU if available
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
+        # Let callers abandon the generation, e.g. after a timeout
+        stopping_criteria = None
+        if cancel_event is not None:
+            stopping_criteria = StoppingCriteriaList([CancelledCriteria(cancel_event)])
         
-        loaded_models[genre] = (model, tokenizer)
+        # Generate text
+        with trace.span("generate"):
+            output = model.generate(
+                input_ids,
+                max_length=max_length,
+                pad_token_id=tokenizer.eos_token_id,
+                stopping_criteria=stopping_criteria,
+                **sampling_kwargs(temperature, top_k, top_p, seed, device, constraints),
+                **speculative_kwargs(genre, constraints)
+            )
+        trace.count_tokens("generated", output.shape[1] - input_ids.shape[1])
+        
+        # Decode the generated text
+        with trace.span("decode"):
+            generated_text = tokenizer.decode(output[0], skip_special_tokens=True)
+    
+    # A cancelled generation is cut short, so it is not the deterministic result
+    if cache_key is not None and not (cancel_event is not None and cancel_event.is_set()):
+        generation_cache.put(cache_key, generated_text)
     
-    return loaded_models[genre]
+    trace.log(cached=False)
+    return generated_text
 
-def generate_lyrics(genre, prompt, max_length=200, temperature=1.0, top_k=50, top_p=0.95):
-    """Generate lyrics using the model for a specific genre"""
-    model, tokenizer = load_model(genre)
-    if model is None or tokenizer is None:
-        return f"No trained model found for genre: {genre}"
-    
-    # Encode the prompt
-    input_ids = tokenizer.encode(prompt, return_tensors="pt")
-    
-    # Move input to the same device as the model
-    device = next(model.parameters()).device
-    input_ids = input_ids.to(device)
-    
-    # Generate text
-    output = model.generate(
-        input_ids,
-        max_length=max_length,
-        temperature=temperature,
-        top_k=top_k,
-        top_p=top_p,
-        do_sample=True,
-        pad_token_id=tokenizer.eos_token_id
-    )
+def stream_lyrics(genre, prompt, max_length=200, temperature=1.0, top_k=50, top_p=0.95, seed=None, cancel_event=None, trace=None,
+                  rhyme_scheme=None, syllables=None):
+    """Generate lyrics for a genre, yielding text chunks as soon as tokens are decoded"""
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    if trace is None:
+        trace = Trace(genre)
+    trace.begin()
     
-    # Decode the generated text
-    generated_text = tokenizer.decode(output[0], skip_special_tokens=True)
+    # Keep the model pinned in the registry until the stream is finished
+    with ExitStack() as stack:
+        with trace.span("load"):
+            model, tokenizer = stack.enter_context(model_registry.use(genre))
+        if model is None or tokenizer is None:
+            raise ValueError(f"No trained model found for genre: {genre}")
+        
+        # Encode the prompt on the model's device
+        with trace.span("encode"):
+            device = next(model.parameters()).device
+            input_ids = tokenizer.encode(prompt, return_tensors="pt").to(device)
+            constraints = constraint_processors(tokenizer, rhyme_scheme, syllables)
+        trace.count_tokens("prompt", input_ids.shape[1])
+        
+        # The streamer hands decoded text from the generation thread to this one
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        generation_kwargs = dict(
+            input_ids=input_ids,
+            max_length=max_length,
+            pad_token_id=tokenizer.eos_token_id,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([CancelledCriteria(cancel_event)]),
+            **sampling_kwargs(temperature, top_k, top_p, seed, device, constraints),
+            **speculative_kwargs(genre, constraints)
+        )
+        
+        errors = []
+        outputs = []
+        
+        def run_generation():
+            try:
+                with torch.no_grad():
+                    outputs.append(model.generate(**generation_kwargs))
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, generate() did not get to end the stream
+                streamer.end()
+        
+        thread = threading.Thread(target=run_generation, daemon=True)
+        generate_start = time.perf_counter()
+        thread.start()
+        
+        first_token = True
+        try:
+            for text in streamer:
+                if cancel_event.is_set():
+                    break
+                if text:
+                    if first_token:
+                        metrics.FIRST_TOKEN_SECONDS.observe(time.perf_counter() - trace.created, genre=genre)
+                        first_token = False
+                    yield text
+        finally:
+            # Stops generate() at the next token if we are leaving early
+            cancel_event.set()
+            thread.join()
+            trace.record("generate", time.perf_counter() - generate_start)
+            if outputs:
+                trace.count_tokens("generated", outputs[0].shape[1] - input_ids.shape[1])
+            trace.log(streamed=True)
     
-    return generated_text
+    if errors:
+        raise errors[0]
+
+def check_memorization(genre, prompt, generated_text):
+    """Overlap report for the generated part of the text, None if the check is off or the genre has no index"""
+    if MEMORIZATION_MAX_OVERLAP <= 0:
+        return None
+    text = generated_text[len(prompt):] if generated_text.startswith(prompt) else generated_text
+    report = memorization_checker.check(genre, text)
+    if report is not None:
+        report['blocked'] = report['longest_overlap'] >= MEMORIZATION_MAX_OVERLAP
+        if report['blocked']:
+            MEMORIZATION_BLOCKED.inc(genre=genre)
+    return report
+
+def memorization_error(report):
+    source = report['source']
+    return f"Generated lyrics repeat {report['longest_overlap']} words of \"{source['title']}\" by {source['artist']}"
+
+STREAM_FORMATS = ('sse', 'jsonl')
+
+def format_stream_event(payload, stream_format):
+    """Serialize a streaming event as a server-sent event or a JSON line"""
+    if stream_format == 'jsonl':
+        return json.dumps(payload) + "\n"
+    return f"event: {payload['event']}\ndata: {json.dumps(payload)}\n\n"
+
+def client_id():
+    """Client identity for fair scheduling: the X-Client-Id header, else the remote address"""
+    return request.headers.get('X-Client-Id') or request.remote_addr or 'unknown'
+
+def budget_error(max_length, generations=1):
+    """Why a request exceeds the per-request caps, or None"""
+    if max_length < 1 or max_length > MAX_LENGTH_LIMIT:
+        return f"max_length must be between 1 and {MAX_LENGTH_LIMIT}"
+    if max_length * generations > REQUEST_TOKEN_BUDGET:
+        return f"Request needs {max_length * generations} tokens, the budget is {REQUEST_TOKEN_BUDGET}"
+    return None
+
+def overloaded_response(error):
+    """429 with Retry-After for work that admission control rejected or shed"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    return response, 429, {'Retry-After': str(error.retry_after)}
 
 @app.route('/api/generate', methods=['POST'])
 def api_generate():
@@ -79,34 +360,136 @@ def api_generate():
     temperature = float(data.get('temperature', 1.0))
     top_k = int(data.get('top_k', 50))
     top_p = float(data.get('top_p', 0.95))
+    seed = data.get('seed')
+    seed = int(seed) if seed is not None else None
+    try:
+        rhyme_scheme = parse_rhyme_scheme(data.get('rhyme_scheme'))
+        syllables = parse_syllables(data.get('syllables'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    error = budget_error(max_length)
+    if error is not None:
+        return jsonify({'error': error}), 400
     
-    # Generate lyrics
-    generated_text = generate_lyrics(
-        genre=genre,
-        prompt=prompt,
-        max_length=max_length,
-        temperature=temperature,
-        top_k=top_k,
-        top_p=top_p
-    )
+    # Generate lyrics once a slot is free
+    trace = Trace(genre, endpoint='generate')
+    try:
+        future = admission.submit(client_id(), genre, max_length, generate_lyrics, dict(
+            genre=genre,
+            prompt=prompt,
+            max_length=max_length,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p,
+            seed=seed,
+            trace=trace,
+            rhyme_scheme=rhyme_scheme,
+            syllables=syllables
+        ))
+        generated_text = admission.result(future)
+    except Overloaded as e:
+        return overloaded_response(e)
+    
+    # Reject lyrics copied from the training data
+    with trace.span("memorization"):
+        memorization = check_memorization(genre, prompt, generated_text)
+    if memorization is not None and memorization['blocked']:
+        return jsonify({'error': memorization_error(memorization), 'memorization': memorization}), 422
     
     # Get the writer name for this genre
     writer = GENRE_TO_WRITER.get(genre, "Unknown Writer")
     
-    return jsonify({
+    response = {
         'genre': genre,
         'writer': writer,
         'prompt': prompt,
+        'seed': seed,
+        'rhyme_scheme': rhyme_scheme,
+        'syllables': syllables,
         'generated_text': generated_text
-    })
+    }
+    if memorization is not None:
+        response['memorization'] = memorization
+    return jsonify(response)
+
+@app.route('/api/generate/stream', methods=['POST'])
+def api_generate_stream():
+    """API endpoint to stream generated lyrics token by token"""
+    data = request.json
+    
+    # Get parameters from request
+    genre = data.get('genre', 'pop')
+    prompt = data.get('prompt', '')
+    max_length = int(data.get('max_length', 200))
+    temperature = float(data.get('temperature', 1.0))
+    top_k = int(data.get('top_k', 50))
+    top_p = float(data.get('top_p', 0.95))
+    stream_format = data.get('format', 'sse')
+    if stream_format not in STREAM_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(STREAM_FORMATS)}"}), 400
+    seed = data.get('seed')
+    seed = int(seed) if seed is not None else None
+    try:
+        rhyme_scheme = parse_rhyme_scheme(data.get('rhyme_scheme'))
+        syllables = parse_syllables(data.get('syllables'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    error = budget_error(max_length)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    
+    if not model_registry.is_available(genre):
+        return jsonify({'error': f"No trained model found for genre: {genre}"}), 404
+    
+    # Hold a generation slot from before the first event until the response is closed; the model
+    # is loaded inside it, and the trace counts the time spent waiting for it as queue_wait
+    trace = Trace(genre, endpoint='generate_stream')
+    try:
+        ticket = admission.result(admission.reserve(client_id(), genre, max_length))
+    except Overloaded as e:
+        return overloaded_response(e)
+    
+    writer = GENRE_TO_WRITER.get(genre, "Unknown Writer")
+    cancel_event = threading.Event()
+    
+    def events():
+        chunks = []
+        try:
+            yield format_stream_event({'event': 'start', 'genre': genre, 'writer': writer, 'prompt': prompt}, stream_format)
+            for text in stream_lyrics(genre, prompt, max_length, temperature, top_k, top_p, seed, cancel_event, trace,
+                                      rhyme_scheme, syllables):
+                chunks.append(text)
+                yield format_stream_event({'event': 'token', 'text': text}, stream_format)
+            generated_text = prompt + ''.join(chunks)
+            # Tokens are already sent, but a client must not keep lyrics copied from the training data
+            with trace.span("memorization"):
+                memorization = check_memorization(genre, prompt, generated_text)
+            if memorization is not None and memorization['blocked']:
+                yield format_stream_event({'event': 'error', 'error': memorization_error(memorization),
+                                           'memorization': memorization}, stream_format)
+                return
+            done = {'event': 'done', 'generated_text': generated_text}
+            if memorization is not None:
+                done['memorization'] = memorization
+            yield format_stream_event(done, stream_format)
+        except Exception as e:
+            yield format_stream_event({'event': 'error', 'error': str(e)}, stream_format)
+        finally:
+            # Runs on GeneratorExit too, i.e. when the client disconnects mid-stream
+            cancel_event.set()
+    
+    mimetype = 'application/x-ndjson' if stream_format == 'jsonl' else 'text/event-stream'
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = Response(stream_with_context(events()), mimetype=mimetype, headers=headers)
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
 
 @app.route('/api/writers', methods=['GET'])
 def api_writers():
     """API endpoint to get all available writers and their genres"""
     writers = []
     for genre, writer in GENRE_TO_WRITER.items():
-        model_dir = os.path.join("trained_models", genre)
-        available = os.path.exists(model_dir)
+        available = model_registry.is_available(genre)
         writers.append({
             'genre': genre,
             'name': writer,
@@ -115,6 +498,82 @@ def api_writers():
     
     return jsonify({'writers': writers})
 
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: models are preloaded and the process is not shutting down"""
+    ready = server_state["ready"] and not server_state["draining"]
+    return jsonify({
+        'ready': ready,
+        'draining': server_state["draining"],
+        'preloaded': server_state["preloaded"],
+        'resident': [entry['genre'] for entry in model_registry.resident()]
+    }), (200 if ready else 503)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus-style metrics for requests, generation stages, the model registry and the cache"""
+    registry_stats = model_registry.stats()
+    metrics.registry.gauge("lyrics_models_resident", "Genre models resident in memory").set(registry_stats["models"])
+    metrics.registry.gauge("lyrics_models_resident_bytes", "Memory used by resident models").set(registry_stats["resident_mb"] * 1024 * 1024)
+    metrics.registry.gauge("lyrics_model_evictions", "Models evicted from the registry").set(registry_stats["evictions"])
+    cache_stats = generation_cache.stats()
+    cache_gauge = metrics.registry.gauge("lyrics_generation_cache", "Generation cache counters", ("counter",))
+    for name in ["memory_hits", "disk_hits", "misses", "stores", "evictions", "entries"]:
+        cache_gauge.set(cache_stats[name], counter=name)
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST'])
+def api_admin_profiler():
+    """Admin endpoint to start/stop the sampling profiler and fetch collapsed stacks"""
+    if request.method == 'GET':
+        if request.args.get('format') == 'collapsed':
+            return Response(profiler.collapsed(), mimetype='text/plain')
+        return jsonify(profiler.status())
+    
+    data = request.json or {}
+    action = data.get('action')
+    if action == 'start':
+        try:
+            profiler.start(interval=data.get('interval'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    elif action == 'stop':
+        profiler.stop()
+    elif action == 'reset':
+        profiler.reset()
+    else:
+        return jsonify({'error': "action must be one of: start, stop, reset"}), 400
+    return jsonify(profiler.status())
+
+@app.route('/api/admin/models', methods=['GET'])
+def api_admin_models():
+    """Admin endpoint listing the models currently resident in memory"""
+    return jsonify({
+        'models': model_registry.resident(),
+        'stats': model_registry.stats()
+    })
+
+@app.route('/api/admin/cache', methods=['GET'])
+def api_admin_cache():
+    """Admin endpoint with generation cache hit/miss counters"""
+    return jsonify(generation_cache.stats())
+
+@app.route('/api/admin/admission', methods=['GET'])
+def api_admin_admission():
+    """Admin endpoint with the generation queue and slot usage"""
+    return jsonify(admission.stats())
+
+@app.route('/api/admin/models/<genre>', methods=['DELETE'])
+def api_admin_unload_model(genre):
+    """Admin endpoint to unload an idle genre model"""
+    unloaded = model_registry.unload(genre)
+    return jsonify({'genre': genre, 'unloaded': unloaded}), (200 if unloaded else 409)
+
 @app.route('/api/collaborative', methods=['POST'])
 def api_collaborative():
     """API endpoint for collaborative writing with multiple genre specialists"""
@@ -125,28 +584,81 @@ def api_collaborative():
     genres = data.get('genres', ['pop', 'hiphop', 'rnb'])
     max_length = int(data.get('max_length', 200))
     temperature = float(data.get('temperature', 1.0))
+    seed = data.get('seed')
+    seed = int(seed) if seed is not None else None
+    # Clients may shorten the timeout, not extend it, nor cut it so short that every writer is cancelled
+    try:
+        timeout = data.get('timeout')
+        timeout = float(timeout) if timeout is not None else COLLABORATIVE_TIMEOUT
+    except (TypeError, ValueError):
+        timeout = math.nan
+    if math.isnan(timeout):
+        return jsonify({'error': "timeout must be a number of seconds"}), 400
+    timeout = min(max(timeout, MIN_COLLABORATIVE_TIMEOUT), COLLABORATIVE_TIMEOUT)
     
-    # Generate lyrics from each genre specialist
-    results = []
-    for genre in genres:
-        generated_text = generate_lyrics(
+    if not isinstance(genres, list) or not 1 <= len(genres) <= MAX_COLLABORATIVE_GENRES:
+        return jsonify({'error': f"genres must be a list of 1 to {MAX_COLLABORATIVE_GENRES} genres"}), 400
+    error = budget_error(max_length, len(genres))
+    if error is not None:
+        return jsonify({'error': error}), 400
+    
+    # Queue one generation per genre specialist; the request is admitted whole or rejected
+    start = time.monotonic()
+    cancel_events = [threading.Event() for _ in genres]
+    jobs = [
+        (genre, max_length, generate_lyrics, dict(
             genre=genre,
             prompt=prompt,
             max_length=max_length,
-            temperature=temperature
-        )
-        
+            temperature=temperature,
+            seed=seed,
+            cancel_event=cancel_event,
+            trace=Trace(genre, endpoint='collaborative')
+        ))
+        for genre, cancel_event in zip(genres, cancel_events)
+    ]
+    try:
+        futures = admission.submit_all(client_id(), jobs)
+    except Overloaded as e:
+        return overloaded_response(e)
+    wait(futures, timeout=timeout)
+    
+    # Collect results in request order, keeping whatever finished in time
+    results = []
+    for genre, future, cancel_event in zip(genres, futures, cancel_events):
         writer = GENRE_TO_WRITER.get(genre, "Unknown Writer")
-        results.append({
+        result = {
             'genre': genre,
-            'writer': writer,
-            'generated_text': generated_text
-        })
+            'writer': writer
+        }
+        if not future.done():
+            # Stop the slow writer at its next token so it frees its slot (or drop it from the queue)
+            cancel_event.set()
+            future.cancel()
+            result['generated_text'] = None
+            result['error'] = f"Timed out after {timeout} seconds"
+        elif future.exception() is not None:
+            result['generated_text'] = None
+            result['error'] = str(future.exception())
+        else:
+            generated_text = future.result()
+            memorization = check_memorization(genre, prompt, generated_text)
+            if memorization is not None:
+                result['memorization'] = memorization
+            if memorization is not None and memorization['blocked']:
+                result['generated_text'] = None
+                result['error'] = memorization_error(memorization)
+            else:
+                result['generated_text'] = generated_text
+        results.append(result)
     
     return jsonify({
         'prompt': prompt,
-        'results': results
+        'results': results,
+        'partial': any('error' in result for result in results),
+        'elapsed': round(time.monotonic() - start, 3)
     })
 
 if __name__ == '__main__':
+    preload_models()
     app.run(debug=True, host='0.0.0.0', port=5000)
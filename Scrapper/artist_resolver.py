@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+import requests
+from bs4 import BeautifulSoup
+from throttle import default_throttle
+
+ARTIST_INDEX_FILE = os.environ.get("ARTIST_INDEX_FILE", "artist_index.json")
+ARTIST_OVERRIDES_FILE = os.environ.get("ARTIST_OVERRIDES_FILE",
+                                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "artist_overrides.json"))
+# Artists that were not found are retried after this many seconds
+NEGATIVE_TTL = float(os.environ.get("ARTIST_NEGATIVE_TTL", 7 * 24 * 3600))
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+ARTIST_LINK = re.compile(r'^(?:https?://[^/]+)?/?([a-z]|19)/([^/]+)\.html$')
+
+def artist_key(artist):
+    return artist.lower().strip()
+
+def artist_slug(artist):
+    """AZLyrics slug: lowercase with spaces and special characters removed"""
+    return ''.join(c for c in artist.lower() if c.isalnum())
+
+def index_page(slug):
+    """Letter index page listing the artist; artists starting with a digit are under 19"""
+    return "19" if slug[:1].isdigit() else slug[:1]
+
+class ArtistResolver:
+    """Artist name -> AZLyrics artist page, cached on disk.
+
+    Pages that worked are remembered for good and tried alone; artists that
+    were not found are remembered for ``negative_ttl`` seconds so repeat
+    crawls skip them. The overrides file maps names whose page does not follow
+    the slug rule to a slug or a page path (e.g. ``"19/6lack.html"``). Paths
+    are stored relative to the base URL, so the index works for mirrors too.
+    """
+
+    def __init__(self, base_url, index_path=ARTIST_INDEX_FILE, overrides_path=ARTIST_OVERRIDES_FILE,
+                 negative_ttl=NEGATIVE_TTL):
+        self.base_url = base_url.rstrip('/')
+        self.index_path = index_path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.entries = {}
+        if index_path and os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self.overrides = {}
+        if overrides_path and os.path.exists(overrides_path):
+            with open(overrides_path, 'r', encoding='utf-8') as f:
+                self.overrides = {artist_key(name): value for name, value in json.load(f).items()}
+
+    def _save(self):
+        if not self.index_path:
+            return
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_path)
+
+    def url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def _override_path(self, key):
+        value = self.overrides.get(key)
+        if value is None:
+            return None
+        return value.lstrip('/') if '/' in value else f"{index_page(value)}/{value}.html"
+
+    def lookup(self, artist):
+        """Known state of an artist: ('found', url), ('missing', None) or ('unknown', None)"""
+        key = artist_key(artist)
+        override = self._override_path(key)
+        if override:
+            return 'found', self.url(override)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return 'unknown', None
+        if entry.get('path'):
+            return 'found', self.url(entry['path'])
+        if time.time() - entry.get('checked_at', 0) < self.negative_ttl:
+            return 'missing', None
+        return 'unknown', None
+
+    def candidate_urls(self, artist):
+        """Artist pages to try, most likely first; empty if the artist is known to be missing"""
+        state, url = self.lookup(artist)
+        if state == 'found':
+            return [url]
+        if state == 'missing':
+            return []
+        slug = artist_slug(artist)
+        if not slug:
+            return []
+        paths = [f"{index_page(slug)}/{slug}.html", f"19/{slug}.html"]
+        return [self.url(path) for path in dict.fromkeys(paths)]
+
+    def record_found(self, artist, url):
+        path = url[len(self.base_url):].lstrip('/') if url.startswith(self.base_url) else url
+        with self._lock:
+            self.entries[artist_key(artist)] = {'path': path, 'checked_at': time.time()}
+            self._save()
+
+    def record_missing(self, artist):
+        with self._lock:
+            self.entries[artist_key(artist)] = {'path': None, 'checked_at': time.time()}
+            self._save()
+
+    def fetch_index_page(self, page):
+        """Map normalized artist names to page paths from one letter index page"""
+        response = default_throttle().fetch(self.url(f"{page}.html"), headers=HEADERS)
+        if response.status_code != 200:
+            return None
+        names = {}
+        soup = BeautifulSoup(response.text, 'html.parser')
+        for link in soup.find_all('a'):
+            match = ARTIST_LINK.match(link.get('href') or '')
+            if match:
+                path = f"{match.group(1)}/{match.group(2)}.html"
+                names[artist_slug(link.get_text())] = path
+                # The link text can lose characters the slug keeps ("A$AP Rocky") or keep ones it drops ("Rosalía")
+                names.setdefault(match.group(2), path)
+        return names
+
+    def bulk_resolve(self, artists):
+        """Resolve every unknown artist from the letter index pages, one request per letter.
+
+        Artists not listed stay unknown: the index names are only a hint, so
+        get_artist_songs still tries their slug URLs and only a 404 there
+        records them as missing.
+        """
+        unknown = {}
+        for artist in artists:
+            if self.lookup(artist)[0] == 'unknown' and artist_slug(artist):
+                unknown.setdefault(index_page(artist_slug(artist)), []).append(artist)
+
+        resolved = 0
+        for page, page_artists in sorted(unknown.items()):
+            print(f"Resolving {len(page_artists)} artists from index page {page}...")
+            try:
+                names = self.fetch_index_page(page)
+            except requests.RequestException as e:
+                print(f"Error fetching index page {page}: {str(e)}")
+                names = None
+            if names is None:
+                continue
+            with self._lock:
+                now = time.time()
+                for artist in page_artists:
+                    path = names.get(artist_slug(artist))
+                    if path is not None:
+                        self.entries[artist_key(artist)] = {'path': path, 'checked_at': now}
+                        resolved += 1
+                self._save()
+
+        return resolved
+
+_default_resolver = None
+_default_lock = threading.Lock()
+
+def default_resolver(base_url):
+    """Process-wide resolver using ARTIST_INDEX_FILE and ARTIST_OVERRIDES_FILE"""
+    global _default_resolver
+    with _default_lock:
+        if _default_resolver is None or _default_resolver.base_url != base_url.rstrip('/'):
+            _default_resolver = ArtistResolver(base_url)
+        return _default_resolver
+
+def main():
+    from azlyrics_scraper import AZLYRICS_BASE_URL
+    from genre_scraper import genre_artists
+
+    parser = argparse.ArgumentParser(description="Resolve AZLyrics artist pages for genre_artists up front")
+    parser.add_argument("--genre", type=str, help="Only resolve this genre's artists")
+    parser.add_argument("--refresh", action="store_true", help="Forget cached misses before resolving")
+
+    args = parser.parse_args()
+
+    resolver = default_resolver(AZLYRICS_BASE_URL)
+    if args.refresh:
+        resolver.entries = {key: entry for key, entry in resolver.entries.items() if entry.get('path')}
+
+    genres = [args.genre] if args.genre else list(genre_artists)
+    artists = list(dict.fromkeys(artist for genre in genres for artist in genre_artists[genre]))
+    resolved = resolver.bulk_resolve(artists)
+
+    found = [artist for artist in artists if resolver.lookup(artist)[0] == 'found']
+    unresolved = [artist for artist in artists if artist not in found]
+    print(f"Resolved {resolved} new artists; {len(found)}/{len(artists)} known, saved to {resolver.index_path}")
+    if unresolved:
+        print(f"Not in the index pages, their slug URLs are tried when scraping "
+              f"(add them to {ARTIST_OVERRIDES_FILE} if those fail too): {', '.join(unresolved)}")
+
+if __name__ == "__main__":
+    main()
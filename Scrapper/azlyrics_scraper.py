@@ -1,39 +1,35 @@
-import requests
 from bs4 import BeautifulSoup
+import os
 import time
 import re
+from artist_resolver import default_resolver
+from throttle import default_throttle
 
-def get_artist_songs(artist):
+# Overridable so the scraper can run against a local mirror or test server
+AZLYRICS_BASE_URL = os.environ.get("AZLYRICS_BASE_URL", "https://www.azlyrics.com")
+
+def get_artist_songs(artist, resolver=None):
     """Get a list of all songs by an artist from AZLyrics"""
-    # Format artist name for URL
-    artist_formatted = artist.lower().replace(" ", "")
-    # Remove special characters
-    artist_formatted = ''.join(c for c in artist_formatted if c.isalnum())
-
-    # Handle special cases
-    if artist.lower() == "her":
-        artist_formatted = "her"
-    elif artist.lower() == "6lack":
-        artist_formatted = "6lack"
-    elif artist.lower() == "dan + shay":
-        artist_formatted = "danshay"
-
-    # Try different URL formats
-    urls_to_try = [
-        f"https://www.azlyrics.com/{artist_formatted[0]}/{artist_formatted}.html",  # Standard format
-        f"https://www.azlyrics.com/19/{artist_formatted}.html"  # For artists starting with numbers
-    ]
+    # Known pages are tried alone and known misses not at all (see artist_resolver.py)
+    if resolver is None:
+        resolver = default_resolver(AZLYRICS_BASE_URL)
+    urls_to_try = resolver.candidate_urls(artist)
+    if not urls_to_try:
+        print(f"Skipping {artist}: not found on a recent crawl")
+        return []
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
 
     song_links = []
+    # Only a definite miss on every URL is remembered; network errors are retried next time
+    definite_miss = True
 
     for url in urls_to_try:
         try:
             print(f"Trying URL: {url}")
-            response = requests.get(url, headers=headers)
+            response = default_throttle().fetch(url, headers=headers)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -47,29 +43,37 @@ def get_artist_songs(artist):
                         for link in links:
                             if link.get('href') and '/lyrics/' in link.get('href'):
                                 song_title = link.text.strip()
-                                song_url = 'https://www.azlyrics.com' + link.get('href')
+                                song_url = AZLYRICS_BASE_URL + link.get('href')
                                 song_links.append((song_title, song_url))
 
                 # If we found songs, no need to try other URLs
                 if song_links:
+                    resolver.record_found(artist, url)
                     break
+            elif response.status_code != 404:
+                definite_miss = False
         except Exception as e:
             print(f"Error trying {url}: {str(e)}")
+            definite_miss = False
             continue
 
+    if not song_links and definite_miss:
+        resolver.record_missing(artist)
+
     return song_links
 
-def scrape_lyrics_by_url(url):
+def scrape_lyrics_by_url(url, delay=None):
     """Scrape lyrics from a specific AZLyrics URL"""
-    # Add delay to respect the site's terms
-    time.sleep(2)
+    # Requests are paced by the shared adaptive throttle; a fixed delay replaces its pacing
+    if delay is not None:
+        time.sleep(delay)
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = default_throttle().fetch(url, wait=delay is None, headers=headers)
         if response.status_code != 200:
             return f"Failed to fetch lyrics: Status code {response.status_code}"
 
@@ -0,0 +1,98 @@
+import os
+import json
+import argparse
+import tempfile
+import torch
+from torch.utils.data import DataLoader
+from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from dataloader_options import dataloader_kwargs
+from training_telemetry import TrainingTelemetry, PHASES
+from benchmark_inference import build_tiny_model
+from benchmark_pipeline import synthetic_lyrics
+from train_models import LyricsDataset
+
+def write_corpus(data_dir, songs):
+    """Write `songs` processed-format JSON files"""
+    os.makedirs(data_dir, exist_ok=True)
+    for index in range(songs):
+        data = {
+            "metadata": {"title": f"Song {index:05d}", "artist": f"artist {index // 100:05d}"},
+            "lyrics": synthetic_lyrics(index // 100, index % 100)
+        }
+        with open(os.path.join(data_dir, f"song_{index:05d}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+def run_config(model_dir, data_dir, steps, batch_size, num_workers, prefetch_factor, persistent_workers):
+    """Train for `steps` steps and return the telemetry summary"""
+    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+    tokenizer.pad_token = tokenizer.eos_token
+    model = GPT2LMHeadModel.from_pretrained(model_dir)
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+
+    dataset = LyricsDataset(data_dir, tokenizer)
+    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True,
+                            **dataloader_kwargs(num_workers, prefetch_factor, persistent_workers))
+
+    telemetry = TrainingTelemetry()
+    step = 0
+    # Worker start-up is part of the first epoch, as it is in train_models.py
+    while step < steps:
+        telemetry.start_epoch()
+        for batch in dataloader:
+            if step >= steps:
+                break
+            telemetry.data_ready(step)
+            with telemetry.phase("forward"):
+                loss = model(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"],
+                             labels=batch["labels"]).loss
+            with telemetry.phase("backward"):
+                loss.backward()
+            with telemetry.phase("optimizer"):
+                optimizer.step()
+                optimizer.zero_grad()
+            telemetry.end_step(step, 0, loss.item(), batch["attention_mask"], 1e-4)
+            step += 1
+
+    return telemetry.summary()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark how DataLoader workers overlap tokenization with training steps")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="num_workers values to compare")
+    parser.add_argument("--prefetch_factor", type=int, default=2, help="Batches each worker loads ahead")
+    parser.add_argument("--persistent_workers", action="store_true", help="Keep workers alive between epochs")
+    parser.add_argument("--songs", type=int, default=2000, help="Songs in the synthetic corpus")
+    parser.add_argument("--steps", type=int, default=50, help="Training steps per configuration")
+    parser.add_argument("--batch_size", type=int, default=8, help="Training batch size")
+    parser.add_argument("--n_layer", type=int, default=2, help="Layers in the tiny model")
+    parser.add_argument("--n_embd", type=int, default=128, help="Hidden size of the tiny model")
+    parser.add_argument("--output", type=str, default="dataloader_benchmark.json", help="Output file for benchmark results")
+
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        model_dir = build_tiny_model(os.path.join(root, "model"), n_layer=args.n_layer, n_embd=args.n_embd)
+        data_dir = os.path.join(root, "train")
+        write_corpus(data_dir, args.songs)
+
+        for num_workers in args.workers:
+            print(f"num_workers={num_workers}...")
+            summary = run_config(model_dir, data_dir, args.steps, args.batch_size, num_workers,
+                                 args.prefetch_factor, args.persistent_workers)
+            summary["num_workers"] = num_workers
+            results.append(summary)
+
+    print(f"\n{'workers':>8} {'steps/s':>9} {'tokens/s':>10} " + " ".join(f"{phase:>10}" for phase in PHASES))
+    for summary in results:
+        step_seconds = sum(summary[f"{phase}_seconds"] for phase in PHASES)
+        steps_per_sec = summary["steps"] / step_seconds if step_seconds else 0.0
+        print(f"{summary['num_workers']:>8} {steps_per_sec:>9.2f} {summary['tokens_per_sec'] or 0:>10.0f} " +
+              " ".join(f"{summary[f'{phase}_fraction']:>10.1%}" for phase in PHASES))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
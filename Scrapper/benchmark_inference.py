@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import torch
+from transformers import GPT2Tokenizer, GPT2TokenizerFast, GPT2LMHeadModel, GPT2Config
+from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+import generate_lyrics
+from model_registry import load_model_mmap
+from metrics import span_overhead_seconds
+from rhyme_constraints import vocabulary_tables
+from training_telemetry import peak_rss_mb
+
+PROMPT = "Title: Benchmark Song\nArtist: AI Writer\n\nLyrics:\n"
+
+def write_tiny_tokenizer(output_dir):
+    """Write a byte-level GPT-2 tokenizer with no merges (257 tokens), so no download is needed"""
+    vocab = {token: i for i, token in enumerate(bytes_to_unicode().values())}
+    vocab["<|endoftext|>"] = len(vocab)
+    with open(os.path.join(output_dir, "vocab.json"), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(output_dir, "merges.txt"), 'w', encoding='utf-8') as f:
+        f.write("#version: 0.2\n")
+    tokenizer = GPT2Tokenizer(os.path.join(output_dir, "vocab.json"), os.path.join(output_dir, "merges.txt"))
+    tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.save_pretrained(output_dir)
+    return tokenizer
+
+def build_tiny_model(output_dir, n_layer=2, n_embd=128, n_head=4, n_positions=512, seed=0):
+    """Save a random-weight GPT-2 genre model and tokenizer to output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = write_tiny_tokenizer(output_dir)
+    torch.manual_seed(seed)
+    # No eos token, so every generation runs to its full length
+    config = GPT2Config(
+        vocab_size=len(tokenizer),
+        n_positions=n_positions,
+        n_embd=n_embd,
+        n_layer=n_layer,
+        n_head=n_head,
+        bos_token_id=None,
+        eos_token_id=None
+    )
+    model = GPT2LMHeadModel(config)
+    model.save_pretrained(output_dir)
+    return output_dir
+
+def median_seconds(fn, repeats):
+    """Run fn `repeats` times and return the median wall time"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def measure(model_dir, batch_sizes, max_lengths, repeats):
+    """Run every measurement against the model in model_dir"""
+    metrics = {}
+
+    def record(name, value, better):
+        metrics[name] = {"value": value, "better": better}
+        print(f"  {name}: {value:.6g}")
+
+    print("Load and tokenizer init...")
+    record("model_load_seconds", median_seconds(lambda: GPT2LMHeadModel.from_pretrained(model_dir), repeats), "lower")
+    if os.path.exists(os.path.join(model_dir, "model.safetensors")):
+        record("model_load_mmap_seconds", median_seconds(lambda: load_model_mmap(model_dir), repeats), "lower")
+    record("tokenizer_init_seconds", median_seconds(lambda: GPT2Tokenizer.from_pretrained(model_dir), repeats), "lower")
+    record("fast_tokenizer_init_seconds", median_seconds(lambda: GPT2TokenizerFast.from_pretrained(model_dir), repeats), "lower")
+
+    model, tokenizer = generate_lyrics.load_model(model_dir)
+    model.eval()
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    prompt_ids = tokenizer.encode(PROMPT, return_tensors="pt").to(device)
+    prompt_length = prompt_ids.shape[1]
+
+    def first_token():
+        with torch.no_grad():
+            model.generate(prompt_ids, max_new_tokens=1, do_sample=True, pad_token_id=tokenizer.eos_token_id)
+
+    # Warm up once so lazy initialisation is not counted
+    first_token()
+    print("Time to first token...")
+    first_token_seconds = median_seconds(first_token, repeats)
+    record("first_token_seconds", first_token_seconds, "lower")
+
+    # api.generate_lyrics records about six spans per request (queue_wait, cache, load,
+    # encode, generate, decode); compare that cost to the cheapest request, a single token
+    print("Instrumentation overhead...")
+    span_seconds = span_overhead_seconds()
+    record("span_overhead_seconds", span_seconds, "lower")
+    record("instrumentation_overhead_ratio", 6 * span_seconds / first_token_seconds, "lower")
+
+    print("Generation throughput (generate_lyrics path)...")
+    generation_seconds = {}
+    for max_length in max_lengths:
+        for batch_size in batch_sizes:
+            def run():
+                with torch.no_grad():
+                    generate_lyrics.generate_lyrics(model, tokenizer, PROMPT, max_length=max_length,
+                                                    num_return_sequences=batch_size)
+            seconds = median_seconds(run, repeats)
+            generation_seconds[(batch_size, max_length)] = seconds
+            new_tokens = (max_length - prompt_length) * batch_size
+            record(f"tokens_per_sec_bs{batch_size}_len{max_length}", new_tokens / seconds, "higher")
+
+    # Constraint masks are built once per tokenizer, then cost a few vocabulary-wide tensor ops per token
+    print("Rhyme-constrained generation...")
+    start = time.perf_counter()
+    vocabulary_tables(tokenizer)
+    record("constraint_tables_seconds", time.perf_counter() - start, "lower")
+    batch_size, max_length = batch_sizes[0], max_lengths[0]
+    def run_constrained():
+        with torch.no_grad():
+            generate_lyrics.generate_lyrics(model, tokenizer, PROMPT, max_length=max_length,
+                                            num_return_sequences=batch_size, rhyme_scheme="AABB", syllables=8)
+    record("constrained_generation_ratio",
+           median_seconds(run_constrained, repeats) / generation_seconds[(batch_size, max_length)], "lower")
+
+    rss = peak_rss_mb()
+    if rss is not None:
+        record("peak_rss_mb", rss, "lower")
+
+    return metrics
+
+def compare_to_baseline(metrics, baseline, threshold):
+    """Return the metrics that regressed by more than `threshold` relative to the baseline"""
+    regressions = []
+    for name, metric in metrics.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["value"]
+        new = metric["value"]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        status = "REGRESSION" if worse else "ok"
+        print(f"  {name}: {old:.6g} -> {new:.6g} ({change:+.1%}) {status}")
+        if worse:
+            regressions.append({"metric": name, "baseline": old, "value": new, "change": change})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline inference microbenchmarks on tiny random-weight models")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 4, 8], help="Batch sizes (num_return_sequences) to measure")
+    parser.add_argument("--max_lengths", type=int, nargs="+", default=[64, 128, 256], help="Sequence lengths (max_length) to measure")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions per measurement (the median is reported)")
+    parser.add_argument("--n_layer", type=int, default=2, help="Layers in the tiny model")
+    parser.add_argument("--n_embd", type=int, default=128, help="Hidden size of the tiny model")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="Output file for benchmark results")
+    parser.add_argument("--baseline", type=str, help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument("--save_baseline", action="store_true", help="Also write the results to the --baseline file")
+
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    with tempfile.TemporaryDirectory() as root:
+        # Same layout as the real models so the loaders are exercised unchanged
+        model_dir = build_tiny_model(os.path.join(root, "trained_models", "benchmark"),
+                                     n_layer=args.n_layer, n_embd=args.n_embd)
+        metrics = measure(model_dir, args.batch_sizes, args.max_lengths, args.repeats)
+
+    results = {
+        "config": {
+            "batch_sizes": args.batch_sizes,
+            "max_lengths": args.max_lengths,
+            "repeats": args.repeats,
+            "n_layer": args.n_layer,
+            "n_embd": args.n_embd,
+            "threads": torch.get_num_threads(),
+            "torch": torch.__version__
+        },
+        "metrics": metrics
+    }
+
+    exit_code = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["metrics"]
+        print(f"\nComparing against {args.baseline} (threshold {args.threshold:.0%})...")
+        results["regressions"] = compare_to_baseline(metrics, baseline, args.threshold)
+        if results["regressions"]:
+            print(f"{len(results['regressions'])} metric(s) regressed")
+            exit_code = 1
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
+
+    if args.save_baseline and args.baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
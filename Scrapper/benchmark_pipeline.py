@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import traceback
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from training_telemetry import peak_rss_mb
+
+GENRE = "hiphop"
+SONGS_PER_ARTIST = 100
+SONGS_PER_ALBUM = 10
+WORDS = ("love night city money dream fire heart road rain gold light street "
+         "time girl baby home ride high low cold sun moon real talk").split()
+
+def artist_name(index):
+    return f"artist {index:05d}"
+
+def artist_slug(index):
+    # Matches get_artist_songs: lowercase, spaces and non-alphanumerics removed
+    return f"artist{index:05d}"
+
+def synthetic_lyrics(artist_index, song_index):
+    """Deterministic pseudo-lyrics for a song"""
+    rng = random.Random(artist_index * 100003 + song_index)
+    lines = []
+    for verse in range(rng.randint(3, 5)):
+        lines.append(f"[Verse {verse + 1}]")
+        for _ in range(rng.randint(4, 8)):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 10))))
+    return "\n".join(lines)
+
+class AZLyricsFixtureHandler(BaseHTTPRequestHandler):
+    """Serve generated AZLyrics-like artist and song pages"""
+    songs_per_artist = SONGS_PER_ARTIST
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        try:
+            if len(parts) == 2 and parts[1].startswith("artist"):
+                body = self.artist_page(int(parts[1][len("artist"):-len(".html")]))
+            elif len(parts) == 3 and parts[0] == "lyrics":
+                artist_index = int(parts[1][len("artist"):])
+                song_index = int(parts[2][len("song"):-len(".html")])
+                body = self.song_page(artist_index, song_index)
+            else:
+                raise ValueError(self.path)
+        except ValueError:
+            self.send_error(404)
+            return
+
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def artist_page(self, artist_index):
+        slug = artist_slug(artist_index)
+        html = ["<html><body><div id='listAlbum'>"]
+        for album_start in range(0, self.songs_per_artist, SONGS_PER_ALBUM):
+            html.append(f"<div class='album'>album: <b>\"Album {album_start // SONGS_PER_ALBUM}\"</b></div>")
+            html.append("<div class='listalbum-item'>")
+            for song_index in range(album_start, min(album_start + SONGS_PER_ALBUM, self.songs_per_artist)):
+                html.append(f"<a href='/lyrics/{slug}/song{song_index:03d}.html'>Song {song_index:03d}</a><br>")
+            html.append("</div>")
+        html.append("</div></body></html>")
+        return "".join(html)
+
+    def song_page(self, artist_index, song_index):
+        lyrics = synthetic_lyrics(artist_index, song_index).replace("\n", "<br>\n")
+        return ("<html><body><div class='main-page'><div class='col-xs-12 col-lg-8 text-center'>"
+                "<div class='ringtone'></div>"
+                f"<div>\n{lyrics}\n</div>"
+                "</div></div></body></html>")
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server(songs_per_artist):
+    AZLyricsFixtureHandler.songs_per_artist = songs_per_artist
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AZLyricsFixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def stage_scrape(work_dir, base_url, artists):
+    """azlyrics_scraper.get_artist_songs / scrape_lyrics_by_url -> genre_scraper.save_lyrics_to_file"""
+    os.environ["AZLYRICS_BASE_URL"] = base_url
+    # Keep the artist page index with the corpus so every run starts cold
+    os.environ["ARTIST_INDEX_FILE"] = os.path.join(work_dir, "artist_index.json")
+    # Measure the pipeline itself, not the scraper's request pacing
+    os.environ["AZLYRICS_THROTTLE"] = "0"
+    import azlyrics_scraper
+    from genre_scraper import save_lyrics_to_file
+
+    fetch_seconds = 0.0
+    save_seconds = 0.0
+    pages = 0
+    files = 0
+    for index in range(artists):
+        start = time.perf_counter()
+        songs = azlyrics_scraper.get_artist_songs(artist_name(index))
+        fetch_seconds += time.perf_counter() - start
+        pages += 1
+        for song_title, song_url in songs:
+            start = time.perf_counter()
+            lyrics = azlyrics_scraper.scrape_lyrics_by_url(song_url, delay=0)
+            fetch_seconds += time.perf_counter() - start
+            pages += 1
+
+            start = time.perf_counter()
+            save_lyrics_to_file(artist_name(index), song_title, lyrics, GENRE, os.path.join(work_dir, "lyrics_data"))
+            save_seconds += time.perf_counter() - start
+            files += 1
+
+    return {
+        "pages": pages,
+        "files": files,
+        "pages_per_sec": pages / fetch_seconds if fetch_seconds else None,
+        "save_files_per_sec": files / save_seconds if save_seconds else None
+    }
+
+def stage_preprocess(work_dir):
+    """preprocess_lyrics.process_genre_folder"""
+    from preprocess_lyrics import process_genre_folder
+
+    random.seed(0)
+    stats = process_genre_folder(os.path.join(work_dir, "lyrics_data", GENRE), os.path.join(work_dir, "processed_lyrics_data"))
+    return {"files": stats["total_songs"], "train_files": stats["train_count"], "test_files": stats["test_count"]}
+
+def stage_train(work_dir, max_steps, batch_size):
+    """train_models.train_genre_model on a tiny base model for a few steps"""
+    from benchmark_inference import build_tiny_model
+    from train_models import train_genre_model
+
+    base_model = build_tiny_model(os.path.join(work_dir, "tiny_base"))
+    train_genre_model(
+        genre=GENRE,
+        data_dir=os.path.join(work_dir, "processed_lyrics_data"),
+        output_dir=os.path.join(work_dir, "trained_models"),
+        epochs=1,
+        batch_size=batch_size,
+        learning_rate=1e-3,
+        base_model=base_model,
+        max_steps=max_steps
+    )
+    # Sequences are padded to max_length=512, which is what the model processes
+    return {"steps": max_steps, "tokens": max_steps * batch_size * 512}
+
+def stage_evaluate(work_dir, batch_size):
+    """evaluate_models.evaluate_genre_model"""
+    from evaluate_models import evaluate_genre_model
+
+    test_dir = os.path.join(work_dir, "processed_lyrics_data", "test", GENRE)
+    songs = len([f for f in os.listdir(test_dir) if f.endswith(".json")])
+    result = evaluate_genre_model(
+        genre=GENRE,
+        models_dir=os.path.join(work_dir, "trained_models"),
+        data_dir=os.path.join(work_dir, "processed_lyrics_data"),
+        batch_size=batch_size
+    )
+    return {"files": songs, "tokens": songs * 512, "perplexity": result["perplexity"] if result else None}
+
+def run_stage_child(queue, stage, args):
+    """Child process entry: run one stage and report its timing and peak memory"""
+    stage_functions = {
+        "scrape": stage_scrape,
+        "preprocess": stage_preprocess,
+        "train": stage_train,
+        "evaluate": stage_evaluate
+    }
+    try:
+        # Keep stage output out of the benchmark report
+        sys.stdout = open(os.devnull, "w")
+        start = time.perf_counter()
+        result = stage_functions[stage](*args)
+        result["seconds"] = time.perf_counter() - start
+        result["peak_rss_mb"] = peak_rss_mb()
+        queue.put(result)
+    except Exception:
+        queue.put({"error": traceback.format_exc()})
+
+def run_stage(stage, args, timeout):
+    """Run a stage in a fresh process so its peak RSS is measured on its own"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_stage_child, args=(queue, stage, args))
+    process.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        process.terminate()
+        result = {"error": f"Timed out after {timeout} seconds"}
+    process.join()
+    return result
+
+def add_rates(stage, result):
+    """Derive the throughput figure reported for each stage"""
+    seconds = result.get("seconds")
+    if not seconds:
+        return
+    if stage == "preprocess":
+        result["files_per_sec"] = result["files"] / seconds
+    elif stage in ("train", "evaluate"):
+        result["tokens_per_sec"] = result["tokens"] / seconds
+
+def benchmark_size(songs, work_root, args):
+    """Run the whole pipeline for a corpus of `songs` songs"""
+    artists = max(1, songs // SONGS_PER_ARTIST)
+    server = start_fixture_server(min(songs, SONGS_PER_ARTIST))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    work_dir = os.path.join(work_root, f"corpus_{songs}")
+    os.makedirs(work_dir, exist_ok=True)
+
+    stages = [
+        ("scrape", (work_dir, base_url, artists)),
+        ("preprocess", (work_dir,)),
+        ("train", (work_dir, args.train_steps, args.batch_size)),
+        ("evaluate", (work_dir, args.batch_size))
+    ]
+
+    results = {"songs": artists * min(songs, SONGS_PER_ARTIST), "stages": {}}
+    try:
+        for stage, stage_args in stages:
+            print(f"  {stage}...", flush=True)
+            result = run_stage(stage, stage_args, args.stage_timeout)
+            add_rates(stage, result)
+            results["stages"][stage] = result
+            if "error" in result:
+                print(f"  {stage} failed, skipping the remaining stages")
+                print(result["error"])
+                results["failed_stage"] = stage
+                break
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+def print_summary(all_results):
+    print(f"\n{'songs':>8} {'stage':>11} {'seconds':>9} {'throughput':>24} {'peak MB':>9}")
+    for result in all_results:
+        for stage, stats in result["stages"].items():
+            if "error" in stats:
+                print(f"{result['songs']:>8} {stage:>11} {'FAILED':>9}")
+                continue
+            if stage == "scrape":
+                throughput = f"{stats['pages_per_sec']:.1f} pages/s"
+            elif stage == "preprocess":
+                throughput = f"{stats['files_per_sec']:.1f} files/s"
+            else:
+                throughput = f"{stats['tokens_per_sec']:.0f} tokens/s"
+            peak = f"{stats['peak_rss_mb']:.0f}" if stats.get("peak_rss_mb") is not None else "-"
+            print(f"{result['songs']:>8} {stage:>11} {stats['seconds']:>9.1f} {throughput:>24} {peak:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark from scrape fixtures to a trained model")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes (songs) to benchmark")
+    parser.add_argument("--train_steps", type=int, default=20, help="Training steps on the tiny model")
+    parser.add_argument("--batch_size", type=int, default=4, help="Batch size for training and evaluation")
+    parser.add_argument("--stage_timeout", type=float, default=6 * 3600, help="Seconds before a stage is considered broken")
+    parser.add_argument("--work_dir", type=str, help="Directory for the generated corpora (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpora")
+    parser.add_argument("--output", type=str, default="pipeline_benchmark.json", help="Output file for benchmark results")
+
+    args = parser.parse_args()
+
+    work_root = args.work_dir or tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    os.makedirs(work_root, exist_ok=True)
+
+    all_results = []
+    for songs in args.sizes:
+        print(f"\nBenchmarking corpus of {songs} songs...")
+        all_results.append(benchmark_size(songs, work_root, args))
+
+        # Save after every size so a long run still leaves partial results
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=2)
+
+    print_summary(all_results)
+    print(f"\nBenchmark results saved to {args.output}")
+
+    if not args.work_dir and not args.keep:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
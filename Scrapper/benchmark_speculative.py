@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import argparse
+import torch
+from transformers import GPT2Tokenizer, GPT2LMHeadModel
+
+PROMPTS = [
+    "Title: Midnight Drive\nArtist: AI Writer\n\nLyrics:\n",
+    "Title: Hometown\nArtist: AI Writer\n\nLyrics:\n",
+    "Title: Summer Rain\nArtist: AI Writer\n\nLyrics:\n",
+    "Title: No Sleep\nArtist: AI Writer\n\nLyrics:\n"
+]
+
+class ForwardCounter:
+    """Count forward passes of a model with a forward pre-hook"""
+    def __init__(self, model):
+        self.calls = 0
+        self.handle = model.register_forward_pre_hook(self.hook)
+
+    def hook(self, module, args):
+        self.calls += 1
+
+    def reset(self):
+        self.calls = 0
+
+    def remove(self):
+        self.handle.remove()
+
+def timed_generate(model, tokenizer, prompt, new_tokens, draft_model=None, do_sample=True):
+    """Generate exactly `new_tokens` tokens and return (seconds, generated token count)"""
+    input_ids = tokenizer.encode(prompt, return_tensors="pt").to(model.device)
+    generation_kwargs = {}
+    if draft_model is not None:
+        generation_kwargs["assistant_model"] = draft_model
+
+    with torch.no_grad():
+        start = time.perf_counter()
+        output = model.generate(
+            input_ids,
+            max_new_tokens=new_tokens,
+            min_new_tokens=new_tokens,
+            do_sample=do_sample,
+            top_k=50 if do_sample else None,
+            top_p=0.95 if do_sample else None,
+            pad_token_id=tokenizer.eos_token_id,
+            **generation_kwargs
+        )
+        elapsed = time.perf_counter() - start
+
+    return elapsed, output.shape[1] - input_ids.shape[1]
+
+def benchmark_genre(genre, models_dir, new_tokens=128, repeats=3, do_sample=True):
+    """Compare plain and speculative generation for one genre"""
+    model_dir = os.path.join(models_dir, genre)
+    draft_dir = os.path.join(model_dir, "draft")
+    if not os.path.exists(draft_dir):
+        print(f"No draft model for genre: {genre}, run train_models.py --distill_draft first")
+        return None
+
+    print(f"Benchmarking speculative decoding for {genre} genre...")
+    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+    model = GPT2LMHeadModel.from_pretrained(model_dir)
+    draft = GPT2LMHeadModel.from_pretrained(draft_dir)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device).eval()
+    draft.to(device).eval()
+
+    target_counter = ForwardCounter(model)
+    draft_counter = ForwardCounter(draft)
+
+    # Warm up both paths so first-call overheads are not measured
+    timed_generate(model, tokenizer, PROMPTS[0], 8, do_sample=do_sample)
+    timed_generate(model, tokenizer, PROMPTS[0], 8, draft_model=draft, do_sample=do_sample)
+
+    totals = {
+        "baseline": {"seconds": 0.0, "tokens": 0, "target_forwards": 0},
+        "speculative": {"seconds": 0.0, "tokens": 0, "target_forwards": 0, "draft_forwards": 0}
+    }
+
+    for repeat in range(repeats):
+        for prompt in PROMPTS:
+            for mode, draft_model in [("baseline", None), ("speculative", draft)]:
+                torch.manual_seed(repeat)
+                target_counter.reset()
+                draft_counter.reset()
+                elapsed, tokens = timed_generate(model, tokenizer, prompt, new_tokens, draft_model, do_sample)
+                totals[mode]["seconds"] += elapsed
+                totals[mode]["tokens"] += tokens
+                totals[mode]["target_forwards"] += target_counter.calls
+                if draft_model is not None:
+                    totals[mode]["draft_forwards"] += draft_counter.calls
+
+    target_counter.remove()
+    draft_counter.remove()
+
+    baseline = totals["baseline"]
+    speculative = totals["speculative"]
+    result = {
+        "genre": genre,
+        "new_tokens": new_tokens,
+        "runs": repeats * len(PROMPTS),
+        "do_sample": do_sample,
+        "baseline_tokens_per_sec": baseline["tokens"] / baseline["seconds"],
+        "speculative_tokens_per_sec": speculative["tokens"] / speculative["seconds"],
+        # Each verification step is one forward pass of the genre model
+        "tokens_per_target_step": speculative["tokens"] / max(speculative["target_forwards"], 1),
+        "draft_forwards_per_token": speculative["draft_forwards"] / max(speculative["tokens"], 1),
+        "speedup": baseline["seconds"] / speculative["seconds"]
+    }
+
+    print(f"  Baseline:    {result['baseline_tokens_per_sec']:.1f} tok/s")
+    print(f"  Speculative: {result['speculative_tokens_per_sec']:.1f} tok/s")
+    print(f"  Accepted tokens per verification step: {result['tokens_per_target_step']:.2f}")
+    print(f"  Wall-clock speedup: {result['speedup']:.2f}x")
+
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding with distilled draft models")
+    parser.add_argument("--models_dir", type=str, default="trained_models", help="Directory with trained models")
+    parser.add_argument("--genre", type=str, help="Specific genre to benchmark (if not specified, benchmark all genres with a draft)")
+    parser.add_argument("--new_tokens", type=int, default=128, help="Number of tokens to generate per run")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of passes over the benchmark prompts")
+    parser.add_argument("--greedy", action="store_true", help="Benchmark greedy decoding instead of sampling")
+    parser.add_argument("--output", type=str, default="speculative_benchmark.json", help="Output file for benchmark results")
+
+    args = parser.parse_args()
+
+    # Get list of genres
+    if args.genre:
+        genres = [args.genre]
+    else:
+        genres = [d for d in os.listdir(args.models_dir)
+                 if os.path.isdir(os.path.join(args.models_dir, d, "draft"))]
+
+    results = {}
+    for genre in genres:
+        result = benchmark_genre(genre, args.models_dir, args.new_tokens, args.repeats, not args.greedy)
+        if result:
+            results[genre] = result
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Benchmark results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
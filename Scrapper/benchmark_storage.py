@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from benchmark_pipeline import synthetic_lyrics
+from lyrics_records import LyricsRecords
+from lyrics_store import DEFAULT_DICT_SIZE, DEFAULT_LEVEL, encode_record, train_dictionary, write_shard
+
+def write_json_corpus(data_dir, songs):
+    """Write `songs` records the way preprocess_lyrics.py does: one pretty-printed JSON file each"""
+    os.makedirs(data_dir, exist_ok=True)
+    for index in range(songs):
+        data = {
+            "metadata": {"title": f"Song {index:05d}", "artist": f"artist {index // 100:05d}",
+                         "original_file": f"lyrics_data/hiphop/artist_{index // 100:05d}/Song {index:05d}.txt"},
+            "lyrics": synthetic_lyrics(index // 100, index % 100)
+        }
+        with open(os.path.join(data_dir, f"song_{index:05d}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def directory_bytes(data_dir):
+    """Apparent size and allocated disk size of the files in a directory"""
+    size = 0
+    allocated = 0
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                size += stat.st_size
+                allocated += getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+    return size, allocated
+
+def read_throughput(data_dir, order, repeats):
+    """Best records/sec and decoded MB/s over `repeats` passes reading records in `order`"""
+    best = None
+    for _ in range(repeats):
+        # A fresh reader per pass, as a new DataLoader worker would have
+        start = time.perf_counter()
+        records = LyricsRecords(data_dir)
+        decoded = 0
+        for idx in order:
+            decoded += len(records[idx]['lyrics'])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"records_per_sec": len(order) / best, "mb_per_sec": decoded / best / 1e6, "seconds": best}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compressed lyrics shards with the one-JSON-file-per-song layout")
+    parser.add_argument("--data_dir", type=str, help="Processed split directory to benchmark, e.g. processed_lyrics_data/train/hiphop (default: a synthetic corpus)")
+    parser.add_argument("--songs", type=int, default=5000, help="Songs in the synthetic corpus")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, help="zstd compression level")
+    parser.add_argument("--dict_size", type=int, default=DEFAULT_DICT_SIZE, help="Dictionary size in bytes")
+    parser.add_argument("--repeats", type=int, default=3, help="Read passes per layout (best is reported)")
+    parser.add_argument("--output", type=str, default="storage_benchmark.json", help="Output file for benchmark results")
+
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="storage_benchmark_")
+    try:
+        json_dir = args.data_dir
+        if json_dir is None:
+            json_dir = os.path.join(root, "json")
+            write_json_corpus(json_dir, args.songs)
+        records = LyricsRecords(json_dir)
+        if records.shard is not None:
+            raise SystemExit(f"{json_dir} is already packed; point --data_dir at a directory of JSON records")
+        pairs = [(name, records[idx]) for idx, name in enumerate(records.filenames)]
+        samples = [encode_record(data) for _, data in pairs]
+
+        start = time.perf_counter()
+        dictionary = train_dictionary(samples, args.dict_size)
+        train_seconds = time.perf_counter() - start
+
+        shard_dir = os.path.join(root, "shard")
+        start = time.perf_counter()
+        shard_bytes = write_shard(shard_dir, pairs, dictionary, args.level)
+        compress_seconds = time.perf_counter() - start
+        plain_bytes = write_shard(os.path.join(root, "shard_no_dictionary"), pairs, None, args.level)
+
+        json_bytes, json_allocated = directory_bytes(json_dir)
+        shard_total, shard_allocated = directory_bytes(shard_dir)
+        sequential = list(range(len(pairs)))
+        shuffled = sequential[:]
+        random.Random(0).shuffle(shuffled)
+
+        results = {
+            "songs": len(pairs),
+            "level": args.level,
+            "dict_size": args.dict_size,
+            "json_bytes": json_bytes,
+            "json_disk_bytes": json_allocated,
+            "compact_json_bytes": sum(len(sample) for sample in samples),
+            "shard_bytes": shard_bytes,
+            "shard_disk_bytes": shard_allocated,
+            "shard_index_bytes": shard_total - shard_bytes,
+            "shard_without_dictionary_bytes": plain_bytes,
+            "compression_ratio": json_bytes / max(shard_total, 1),
+            "disk_ratio": json_allocated / max(shard_allocated, 1),
+            "dictionary_gain": plain_bytes / max(shard_bytes, 1),
+            "dictionary_train_seconds": train_seconds,
+            "compress_seconds": compress_seconds,
+            "json_sequential": read_throughput(json_dir, sequential, args.repeats),
+            "json_random": read_throughput(json_dir, shuffled, args.repeats),
+            "shard_sequential": read_throughput(shard_dir, sequential, args.repeats),
+            "shard_random": read_throughput(shard_dir, shuffled, args.repeats)
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{results['songs']} songs: JSON {results['json_bytes'] / 1e6:.2f} MB "
+          f"({results['json_disk_bytes'] / 1e6:.2f} MB on disk) -> shard {(results['shard_bytes'] + results['shard_index_bytes']) / 1e6:.2f} MB, "
+          f"{results['compression_ratio']:.1f}x ({results['disk_ratio']:.1f}x on disk); "
+          f"the dictionary makes it {results['dictionary_gain']:.2f}x smaller than plain zstd")
+    print(f"\n{'layout':>18} {'records/s':>10} {'MB/s':>8}")
+    for layout in ("json_sequential", "json_random", "shard_sequential", "shard_random"):
+        print(f"{layout:>18} {results[layout]['records_per_sec']:>10.0f} {results[layout]['mb_per_sec']:>8.1f}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
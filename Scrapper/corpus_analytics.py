@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import argparse
+import numpy as np
+from transformers import GPT2TokenizerFast
+from lyrics_records import LyricsRecords, format_training_text
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+SPLITS = ("train", "val", "test")
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+# Token count histogram bins: 32-token buckets up to 2048, then everything longer
+TOKEN_BINS = np.append(np.arange(0, 2049, 32), np.inf)
+LINE_BINS = np.append(np.arange(0, 31), np.inf)
+
+class ColumnBuilder:
+    """Append-only numeric columns, converted to numpy arrays once at the end"""
+
+    def __init__(self, names):
+        self.columns = {name: [] for name in names}
+
+    def append(self, **values):
+        for name, value in values.items():
+            self.columns[name].append(value)
+
+    def extend(self, **values):
+        for name, value in values.items():
+            self.columns[name].extend(value)
+
+    def arrays(self):
+        return {name: np.asarray(values) for name, values in self.columns.items()}
+
+class Codes:
+    """Map strings (genres, artists) to dense integer codes"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __call__(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+def percentiles(values):
+    if len(values) == 0:
+        return {}
+    points = np.percentile(values, [50, 90, 95, 99])
+    return {"p50": float(points[0]), "p90": float(points[1]), "p95": float(points[2]), "p99": float(points[3]),
+            "mean": float(np.mean(values)), "max": float(np.max(values))}
+
+def length_stats(tokens, max_length):
+    """Truncation, padding and packing figures for one group of songs"""
+    if len(tokens) == 0:
+        return {}
+    kept = np.minimum(tokens, max_length)
+    return {
+        "songs": int(len(tokens)),
+        "tokens": int(tokens.sum()),
+        "truncation_rate": float((tokens > max_length).mean()),
+        "truncated_token_fraction": float((tokens - kept).sum() / max(tokens.sum(), 1)),
+        # Share of each padded max_length batch row that is padding
+        "padding_fraction": float(1 - kept.sum() / (len(tokens) * max_length)),
+        # Rows needed if songs were packed back to back instead of padded one per row
+        "packed_rows": int(np.ceil(tokens.sum() / max_length)),
+        "token_percentiles": percentiles(tokens)
+    }
+
+def grouped_histogram(codes, values, bins, groups):
+    """Histogram of `values` for every group code, computed in one bincount"""
+    bin_index = np.clip(np.searchsorted(bins, values, side='right') - 1, 0, len(bins) - 2)
+    counts = np.bincount(codes * (len(bins) - 1) + bin_index, minlength=groups * (len(bins) - 1))
+    return counts.reshape(groups, len(bins) - 1)
+
+def suggest_max_length(tokens, n_positions=1024, quantile=95):
+    """Smallest multiple of 64 covering `quantile`% of songs, capped at the model's context"""
+    if len(tokens) == 0:
+        return None
+    return int(min(n_positions, np.ceil(np.percentile(tokens, quantile) / 64) * 64))
+
+def analyze_corpus(data_dir, tokenizer, genres=None, max_length=512, batch_size=256):
+    """Stream every processed song once and compute the corpus distributions"""
+    genre_codes = Codes()
+    artist_codes = Codes()
+    split_codes = Codes()
+    songs = ColumnBuilder(["genre", "artist", "split", "tokens", "words", "lines", "types", "max_line_words"])
+    lines = ColumnBuilder(["genre", "words"])
+    genre_vocab = {}
+    artist_vocab = {}
+
+    def flush(batch):
+        texts = [format_training_text(data) for data, _, _ in batch]
+        token_counts = [len(ids) for ids in tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+        for (data, genre, split), token_count in zip(batch, token_counts):
+            artist = data['metadata']['artist']
+            line_words = [len(WORD_PATTERN.findall(line.lower())) for line in data['lyrics'].split("\n") if line.strip()]
+            words = WORD_PATTERN.findall(data['lyrics'].lower())
+            genre_code = genre_codes(genre)
+            artist_code = artist_codes(f"{genre}/{artist}")
+            genre_vocab.setdefault(genre_code, set()).update(words)
+            artist_vocab.setdefault(artist_code, set()).update(words)
+            songs.append(genre=genre_code, artist=artist_code, split=split_codes(split), tokens=token_count,
+                         words=len(words), lines=len(line_words), types=len(set(words)),
+                         max_line_words=max(line_words, default=0))
+            lines.extend(genre=[genre_code] * len(line_words), words=line_words)
+
+    for split in SPLITS:
+        split_dir = os.path.join(data_dir, split)
+        if not os.path.isdir(split_dir):
+            continue
+        for genre in sorted(os.listdir(split_dir)):
+            if genres and genre not in genres or not os.path.isdir(os.path.join(split_dir, genre)):
+                continue
+            batch = []
+            for data in LyricsRecords(os.path.join(split_dir, genre)):
+                batch.append((data, genre, split))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+
+    return {
+        "songs": songs.arrays(),
+        "lines": lines.arrays(),
+        "genres": genre_codes.values,
+        "artists": artist_codes.values,
+        "splits": split_codes.values,
+        "genre_vocab": {code: len(vocab) for code, vocab in genre_vocab.items()},
+        "artist_vocab": {code: len(vocab) for code, vocab in artist_vocab.items()},
+        "max_length": max_length
+    }
+
+def summarize(analysis, n_positions=1024):
+    """Per-genre and per-artist statistics and histograms from the song columns"""
+    songs = analysis["songs"]
+    lines = analysis["lines"]
+    max_length = analysis["max_length"]
+    if len(songs["tokens"]) == 0:
+        return {"max_length": max_length, "genres": {}, "artists": {}}
+
+    genre_histograms = grouped_histogram(songs["genre"], songs["tokens"], TOKEN_BINS, len(analysis["genres"]))
+    artist_histograms = grouped_histogram(songs["artist"], songs["tokens"], TOKEN_BINS, len(analysis["artists"]))
+    line_histograms = grouped_histogram(lines["genre"], lines["words"], LINE_BINS, len(analysis["genres"]))
+
+    summary = {
+        "max_length": max_length,
+        "token_bins": TOKEN_BINS[:-1].tolist(),
+        "line_word_bins": LINE_BINS[:-1].tolist(),
+        "overall": length_stats(songs["tokens"], max_length),
+        "genres": {},
+        "artists": {}
+    }
+    summary["overall"]["suggested_max_length"] = suggest_max_length(songs["tokens"], n_positions)
+
+    for code, genre in enumerate(analysis["genres"]):
+        mask = songs["genre"] == code
+        tokens = songs["tokens"][mask]
+        stats = length_stats(tokens, max_length)
+        stats.update({
+            "artists": int(len(np.unique(songs["artist"][mask]))),
+            "splits": {split: int((songs["split"][mask] == split_code).sum())
+                       for split_code, split in enumerate(analysis["splits"])},
+            "words": int(songs["words"][mask].sum()),
+            "vocabulary": analysis["genre_vocab"].get(code, 0),
+            "type_token_ratio": analysis["genre_vocab"].get(code, 0) / max(int(songs["words"][mask].sum()), 1),
+            "line_words": percentiles(lines["words"][lines["genre"] == code]),
+            "suggested_max_length": suggest_max_length(tokens, n_positions),
+            "token_histogram": genre_histograms[code].tolist(),
+            "line_word_histogram": line_histograms[code].tolist()
+        })
+        summary["genres"][genre] = stats
+
+    # Group songs by artist once (sort plus bincount) instead of masking the columns per artist
+    artist_count = len(analysis["artists"])
+    order = np.argsort(songs["artist"], kind="stable")
+    artist_songs = np.bincount(songs["artist"], minlength=artist_count)
+    bounds = np.concatenate([[0], np.cumsum(artist_songs)])
+    artist_tokens = songs["tokens"][order]
+    artist_words = np.bincount(songs["artist"], weights=songs["words"], minlength=artist_count)
+    song_ratios = np.bincount(songs["artist"], weights=songs["types"] / np.maximum(songs["words"], 1),
+                              minlength=artist_count)
+    for code, artist in enumerate(analysis["artists"]):
+        words = int(artist_words[code])
+        stats = length_stats(artist_tokens[bounds[code]:bounds[code + 1]], max_length)
+        stats.update({
+            "words": words,
+            "vocabulary": analysis["artist_vocab"].get(code, 0),
+            "type_token_ratio": analysis["artist_vocab"].get(code, 0) / max(words, 1),
+            # Mean of per-song ratios; comparable between artists with different song counts
+            "song_type_token_ratio": float(song_ratios[code] / max(artist_songs[code], 1)),
+            "token_histogram": artist_histograms[code].tolist()
+        })
+        summary["artists"][artist] = stats
+
+    return summary
+
+def write_columns(analysis, output_dir):
+    """Per-song columns as .npz (always) and Parquet (when pyarrow is installed)"""
+    songs = analysis["songs"]
+    lookups = {"genre": analysis["genres"], "artist": analysis["artists"], "split": analysis["splits"]}
+    codes = {name: songs[name].astype(np.int64) for name in lookups}
+    numeric = {name: values.astype(np.int64) for name, values in songs.items() if name not in lookups}
+
+    # Codes plus lookup tables keep the .npz free of pickled objects
+    np.savez_compressed(os.path.join(output_dir, "songs.npz"),
+                        **{f"{name}s": np.asarray(values, dtype=str) for name, values in lookups.items()},
+                        **{f"{name}_code": values for name, values in codes.items()},
+                        **numeric)
+    written = ["songs.npz"]
+    if pyarrow is not None:
+        table = pyarrow.table({
+            **{name: [lookups[name][code] for code in codes[name]] for name in lookups},
+            **numeric
+        })
+        pyarrow.parquet.write_table(table, os.path.join(output_dir, "songs.parquet"))
+        written.append("songs.parquet")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Token, line and vocabulary statistics of the processed lyrics corpus")
+    parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
+    parser.add_argument("--output_dir", type=str, default="corpus_analytics", help="Directory for the analytics output")
+    parser.add_argument("--genre", type=str, nargs="+", help="Genres to analyze (if not specified, analyze all genres)")
+    parser.add_argument("--tokenizer", type=str, default="gpt2", help="Tokenizer name or directory used to count tokens")
+    parser.add_argument("--max_length", type=int, default=512, help="Training sequence length to report truncation and padding for")
+    parser.add_argument("--batch_size", type=int, default=256, help="Songs tokenized per batch")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tokenizer = GPT2TokenizerFast.from_pretrained(args.tokenizer)
+    analysis = analyze_corpus(args.data_dir, tokenizer, args.genre, args.max_length, args.batch_size)
+    summary = summarize(analysis, getattr(tokenizer, "model_max_length", 1024))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    written = write_columns(analysis, args.output_dir)
+
+    print(f"Analyzed {len(analysis['songs']['tokens'])} songs in {time.perf_counter() - start:.1f}s")
+    for genre, stats in summary["genres"].items():
+        print(f"{genre}: {stats['songs']} songs, median {stats['token_percentiles']['p50']:.0f} tokens, "
+              f"p95 {stats['token_percentiles']['p95']:.0f}, truncated at {args.max_length}: {stats['truncation_rate']:.1%}, "
+              f"padding: {stats['padding_fraction']:.1%}, vocabulary {stats['vocabulary']} "
+              f"(type/token {stats['type_token_ratio']:.3f}), suggested max_length {stats['suggested_max_length']}")
+    print(f"Results saved to {args.output_dir} (summary.json, {', '.join(written)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import torch
+
+# Fast tokenizers run their own thread pool, which deadlocks if a DataLoader
+# forks while it is in use; workers already give us parallelism.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+def add_dataloader_args(parser):
+    """Add the DataLoader worker options shared by training and evaluation"""
+    parser.add_argument("--num_workers", type=int, default=0, help="DataLoader worker processes for tokenization and collation (0 = main process)")
+    parser.add_argument("--prefetch_factor", type=int, default=2, help="Batches each worker loads ahead (needs --num_workers > 0)")
+    parser.add_argument("--persistent_workers", action="store_true", help="Keep DataLoader workers alive between epochs")
+    parser.add_argument("--pin_memory", action="store_true", help="Copy batches into pinned memory for faster host-to-GPU transfer")
+
+def dataloader_kwargs(num_workers=0, prefetch_factor=2, persistent_workers=False, pin_memory=False):
+    """Keyword arguments for DataLoader, dropping options torch rejects without workers"""
+    kwargs = {
+        "num_workers": num_workers,
+        # Pinning only helps when batches are copied to a GPU
+        "pin_memory": pin_memory and torch.cuda.is_available()
+    }
+    if num_workers > 0:
+        kwargs["prefetch_factor"] = prefetch_factor
+        kwargs["persistent_workers"] = persistent_workers
+    return kwargs
+
+def dataloader_kwargs_from_args(args):
+    return dataloader_kwargs(args.num_workers, args.prefetch_factor, args.persistent_workers, args.pin_memory)
@@ -0,0 +1,55 @@
+import os
+from contextlib import contextmanager
+import torch
+import torch.distributed as dist
+
+def init_distributed(backend="gloo"):
+    """Join the process group described by the launcher's environment variables.
+
+    launch_distributed.py (or torchrun) sets RANK, WORLD_SIZE, MASTER_ADDR and
+    MASTER_PORT. Returns (rank, world_size); (0, 1) when not launched that way.
+    """
+    world_size = int(os.environ.get("WORLD_SIZE", "1"))
+    if world_size <= 1:
+        return 0, 1
+    if not dist.is_initialized():
+        dist.init_process_group(backend=backend)
+    return dist.get_rank(), dist.get_world_size()
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+def is_main_process():
+    return not is_distributed() or dist.get_rank() == 0
+
+def barrier():
+    if is_distributed():
+        dist.barrier()
+
+@contextmanager
+def main_process_first():
+    """Let rank 0 run the block (e.g. a model download) before the other ranks"""
+    if not is_main_process():
+        barrier()
+    try:
+        yield
+    finally:
+        if is_main_process():
+            barrier()
+
+def all_reduce_sum(*values):
+    """Sum each value over all ranks and return them as floats"""
+    if not is_distributed():
+        return tuple(float(value) for value in values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tuple(tensor.tolist())
+
+def all_reduce_mean(total, count):
+    """Mean of per-rank totals over the summed counts of all ranks"""
+    total, count = all_reduce_sum(total, count)
+    return total / max(count, 1)
+
+def cleanup():
+    if is_distributed():
+        dist.destroy_process_group()
@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+import threading
+from model_registry import model_fingerprint, tokenizer_fingerprint, file_sha256, load_file_hashes, save_file_hashes
+from quantize_models import quantized_dir
+from lyrics_store import SHARD_INDEX
+
+CACHE_DIR = "evaluation_cache"
+# Bump when evaluate_genre_model changes what it computes, so old results are not reused
+EVALUATION_VERSION = 1
+
+def test_set_manifest(test_dir):
+    """Content hash of a test split: every record file, plus the dictionary of a compressed shard"""
+    sha = hashlib.sha256()
+    for name in sorted(os.listdir(test_dir)):
+        path = os.path.join(test_dir, name)
+        if os.path.isfile(path):
+            sha.update(name.encode("utf-8"))
+            sha.update(file_sha256(path).encode("ascii"))
+    index_path = os.path.join(test_dir, SHARD_INDEX)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            dictionary = json.load(f).get("dictionary")
+        if dictionary:
+            sha.update(file_sha256(os.path.join(test_dir, dictionary)).encode("ascii"))
+    return sha.hexdigest()
+
+def evaluation_key(model_dir, test_dir, settings, quantized=False, index_dir=None):
+    """Cache key for evaluating one model on one test split with the given settings"""
+    payload = {
+        "version": EVALUATION_VERSION,
+        "model": model_fingerprint(model_dir),
+        "quantized": model_fingerprint(quantized_dir(model_dir)) if quantized else None,
+        "tokenizer": tokenizer_fingerprint(model_dir),
+        "test_set": test_set_manifest(test_dir),
+        # The memorization check also depends on the index it searches
+        "index": model_fingerprint(index_dir) if index_dir and os.path.isdir(index_dir) else None,
+        "settings": settings
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+class EvaluationCache:
+    """Evaluation results on disk, keyed by evaluation_key.
+
+    File hashes are memoized in the cache directory by path, size and mtime, so
+    a rerun over unchanged models only stats their files instead of re-reading
+    gigabytes of weights.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hashes_path = os.path.join(cache_dir, "file_hashes.json")
+        load_file_hashes(self.hashes_path)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached result for a key, or None"""
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                self.hits += 1
+                return result
+            except (OSError, ValueError):
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        path = self._path(key)
+        # Write then rename so an interrupted run never leaves a partial result
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        os.replace(temp_path, path)
+        self.save_hashes()
+
+    def save_hashes(self):
+        save_file_hashes(self.hashes_path)
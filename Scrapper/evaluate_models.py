@@ -6,37 +6,30 @@ import numpy as np
 from transformers import GPT2Tokenizer, GPT2LMHeadModel
 from torch.utils.data import Dataset, DataLoader
 from tqdm import tqdm
+from lyrics_records import LyricsRecords
+from dataloader_options import add_dataloader_args, dataloader_kwargs_from_args
+from quantize_models import has_quantized_model, load_quantized_model
+from eval_cache import CACHE_DIR, EvaluationCache, evaluation_key
 
 class TestDataset(Dataset):
-    def __init__(self, data_dir, tokenizer, max_length=512):
+    def __init__(self, data_dir, tokenizer, max_length=512, cache_size=0):
         self.tokenizer = tokenizer
         self.max_length = max_length
-        self.examples = []
-        self.metadata = []
         
-        # Load all JSON files in the directory
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(data_dir, filename)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Store the lyrics text
-                    self.examples.append(data['lyrics'])
-                    
-                    # Store metadata
-                    self.metadata.append({
-                        'title': data['metadata']['title'],
-                        'artist': data['metadata']['artist'],
-                        'file': file_path
-                    })
+        # Index the JSON files in the directory; records are read on demand
+        self.records = LyricsRecords(data_dir, cache_size=cache_size)
     
     def __len__(self):
-        return len(self.examples)
+        return len(self.records)
     
     def __getitem__(self, idx):
-        text = self.examples[idx]
-        meta = self.metadata[idx]
+        data = self.records[idx]
+        text = data['lyrics']
+        meta = {
+            'title': data['metadata']['title'],
+            'artist': data['metadata']['artist'],
+            'file': self.records.path(idx)
+        }
         
         # Tokenize the text
         encodings = self.tokenizer(text, 
@@ -85,8 +78,45 @@ def calculate_perplexity(model, dataloader, device):
     
     return perplexity
 
-def evaluate_genre_model(genre, models_dir, data_dir, batch_size=4):
-    """Evaluate a model for a specific genre"""
+def memorization_rate(model, tokenizer, checker, genre, device, samples=20, threshold=12, max_length=200):
+    """Share of sampled generations that copy `threshold` or more words verbatim from the training lyrics"""
+    prompt = f"Title: Sample Song\nArtist: AI Writer\n\nLyrics:\n"
+    input_ids = tokenizer.encode(prompt, return_tensors="pt").to(device)
+    
+    reports = []
+    with torch.no_grad():
+        for start in tqdm(range(0, samples, 4), desc="Memorization"):
+            output = model.generate(
+                input_ids,
+                max_length=max_length,
+                top_k=50,
+                top_p=0.95,
+                do_sample=True,
+                num_return_sequences=min(4, samples - start),
+                pad_token_id=tokenizer.eos_token_id
+            )
+            for sequence in output:
+                text = tokenizer.decode(sequence[input_ids.shape[1]:], skip_special_tokens=True)
+                reports.append(checker.check(genre, text))
+    
+    overlaps = [report["longest_overlap"] for report in reports]
+    return {
+        "samples": len(reports),
+        "threshold": threshold,
+        "rate": sum(overlap >= threshold for overlap in overlaps) / len(reports),
+        "mean_longest_overlap": float(np.mean(overlaps)),
+        "max_longest_overlap": max(overlaps),
+        "mean_covered_fraction": float(np.mean([report["covered_fraction"] for report in reports]))
+    }
+
+def evaluate_genre_model(genre, models_dir, data_dir, batch_size=4, quantized=False, dataloader_options=None,
+                         memorization_samples=0, memorization_threshold=12, index_dir="memorization_index",
+                         cache=None, force=False):
+    """Evaluate a model for a specific genre
+
+    With an EvaluationCache, a stored result is returned without loading the model as long as
+    the model weights, tokenizer, test set and settings are unchanged (force re-evaluates).
+    """
     print(f"Evaluating model for {genre} genre...")
     
     # Load model and tokenizer
@@ -95,27 +125,61 @@ def evaluate_genre_model(genre, models_dir, data_dir, batch_size=4):
         print(f"No trained model found for genre: {genre}")
         return None
     
-    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
-    model = GPT2LMHeadModel.from_pretrained(model_dir)
-    
-    # Check if GPU is available
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model.to(device)
-    
-    # Prepare test dataset
     test_dir = os.path.join(data_dir, "test", genre)
     if not os.path.exists(test_dir) or len(os.listdir(test_dir)) == 0:
         print(f"No test data found for genre: {genre}")
         return None
     
+    cache_key = None
+    if cache is not None and (not quantized or has_quantized_model(model_dir)):
+        settings = {
+            "batch_size": batch_size,
+            "quantized": quantized,
+            "memorization_samples": memorization_samples,
+            "memorization_threshold": memorization_threshold if memorization_samples else None
+        }
+        cache_key = evaluation_key(model_dir, test_dir, settings, quantized,
+                                   os.path.join(index_dir, genre) if memorization_samples else None)
+        cached = None if force else cache.get(cache_key)
+        if cached is not None:
+            print(f"Perplexity for {genre} model: {cached['perplexity']:.4f} (cached)")
+            return cached
+    
+    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+    if quantized:
+        if not has_quantized_model(model_dir):
+            print(f"No quantized model found for genre: {genre}")
+            return None
+        model = load_quantized_model(model_dir)
+        device = torch.device("cpu")
+    else:
+        model = GPT2LMHeadModel.from_pretrained(model_dir)
+        # Check if GPU is available
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    
+    # Prepare test dataset
     test_dataset = TestDataset(test_dir, tokenizer)
-    test_dataloader = DataLoader(test_dataset, batch_size=batch_size)
+    test_dataloader = DataLoader(test_dataset, batch_size=batch_size, **(dataloader_options or {}))
     
     # Calculate perplexity
     perplexity = calculate_perplexity(model, test_dataloader, device)
     
     print(f"Perplexity for {genre} model: {perplexity:.4f}")
     
+    # Verbatim copies of the training lyrics, using the index built by memorization_index.py
+    memorization = None
+    if memorization_samples:
+        from memorization_index import MemorizationChecker
+        checker = MemorizationChecker(index_dir)
+        if checker.is_available(genre):
+            memorization = memorization_rate(model, tokenizer, checker, genre, device,
+                                             memorization_samples, memorization_threshold)
+            print(f"Memorization rate for {genre} model: {memorization['rate']:.1%} "
+                  f"(longest overlap {memorization['max_longest_overlap']} words)")
+        else:
+            print(f"No memorization index found for genre: {genre}, skipping memorization check")
+    
     # Generate sample lyrics
     print("\nGenerating sample lyrics...")
     prompt = f"Title: Sample Song\nArtist: AI Writer\n\nLyrics:\n"
@@ -134,11 +198,16 @@ def evaluate_genre_model(genre, models_dir, data_dir, batch_size=4):
     generated_text = tokenizer.decode(output[0], skip_special_tokens=True)
     print(generated_text)
     
-    return {
+    result = {
         "genre": genre,
+        "quantized": quantized,
         "perplexity": perplexity,
+        "memorization": memorization,
         "sample": generated_text
     }
+    if cache_key is not None:
+        cache.put(cache_key, result)
+    return result
 
 def main():
     parser = argparse.ArgumentParser(description="Evaluate trained lyrics generation models")
@@ -147,6 +216,13 @@ def main():
     parser.add_argument("--batch_size", type=int, default=4, help="Batch size for evaluation")
     parser.add_argument("--genre", type=str, help="Specific genre to evaluate (if not specified, evaluate all genres)")
     parser.add_argument("--output", type=str, default="evaluation_results.json", help="Output file for evaluation results")
+    parser.add_argument("--quantized", action="store_true", help="Evaluate the int8 models exported by quantize_models.py")
+    parser.add_argument("--memorization_samples", type=int, default=0, help="Generations to check for verbatim copies of the training lyrics (0 = skip)")
+    parser.add_argument("--memorization_threshold", type=int, default=12, help="Overlap in words that counts as memorized")
+    parser.add_argument("--index_dir", type=str, default="memorization_index", help="Directory with indexes built by memorization_index.py")
+    parser.add_argument("--cache_dir", type=str, default=CACHE_DIR, help="Directory with cached evaluation results (empty string disables the cache)")
+    parser.add_argument("--force", action="store_true", help="Re-evaluate every genre even if a cached result matches")
+    add_dataloader_args(parser)
     
     args = parser.parse_args()
     
@@ -157,6 +233,9 @@ def main():
         genres = [d for d in os.listdir(args.models_dir) 
                  if os.path.isdir(os.path.join(args.models_dir, d))]
     
+    # Unchanged model / test set pairs are answered from the cache
+    cache = EvaluationCache(args.cache_dir) if args.cache_dir else None
+    
     # Evaluate models for each genre
     results = {}
     for genre in genres:
@@ -164,11 +243,22 @@ def main():
             genre=genre,
             models_dir=args.models_dir,
             data_dir=args.data_dir,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            quantized=args.quantized,
+            dataloader_options=dataloader_kwargs_from_args(args),
+            memorization_samples=args.memorization_samples,
+            memorization_threshold=args.memorization_threshold,
+            index_dir=args.index_dir,
+            cache=cache,
+            force=args.force
         )
         if result:
             results[genre] = result
     
+    if cache is not None:
+        cache.save_hashes()
+        print(f"Evaluation cache: {cache.hits} cached, {len(results) - cache.hits} evaluated")
+    
     # Save results to file
     with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2)
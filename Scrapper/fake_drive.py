@@ -0,0 +1,128 @@
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    """Just enough of the Drive v3 API for google_drive_uploader: generateIds and multipart file creation"""
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_drive_error(self, status, message):
+        self.send_json(status, {"error": {"code": status, "message": message, "errors": [{"message": message}]}})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        drive = self.server.drive
+
+        if url.path == "/drive/v3/files/generateIds":
+            drive.record("generateIds")
+            count = int(query.get("count", ["10"])[0])
+            self.send_json(200, {"kind": "drive#generatedIds", "space": "drive",
+                                 "ids": [uuid.uuid4().hex for _ in range(count)]})
+        elif url.path.startswith("/drive/v3/files/"):
+            file_id = url.path[len("/drive/v3/files/"):]
+            stored = drive.files.get(file_id)
+            if stored is None:
+                self.send_drive_error(404, f"File not found: {file_id}")
+            else:
+                self.send_json(200, {"id": file_id, **stored["metadata"], "size": len(stored["content"])})
+        else:
+            self.send_drive_error(404, f"Unknown path: {url.path}")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        drive = self.server.drive
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if url.path != "/upload/drive/v3/files":
+            self.send_drive_error(404, f"Unknown path: {url.path}")
+            return
+
+        drive.record("create")
+        if drive.latency:
+            time.sleep(drive.latency)
+        if drive.error_rate and random.random() < drive.error_rate:
+            self.send_drive_error(503, "Simulated backend error")
+            return
+
+        # multipart/related: JSON metadata, then the file content
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+        parts = list(message.iter_parts())
+        metadata = json.loads(parts[0].get_payload(decode=True))
+        content = parts[1].get_payload(decode=True) if len(parts) > 1 else b""
+
+        file_id = metadata.pop("id", None) or uuid.uuid4().hex
+        with drive.lock:
+            if file_id in drive.files:
+                self.send_drive_error(409, "A file already exists with the provided ID.")
+                return
+            drive.files[file_id] = {"metadata": metadata, "content": content}
+        self.send_json(200, {"id": file_id})
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeDrive:
+    """In-memory Drive served over HTTP on localhost"""
+
+    def __init__(self, port=0, latency=0.0, error_rate=0.0):
+        self.files = {}
+        self.calls = {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), FakeDriveHandler)
+        self.server.drive = self
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def record(self, call):
+        with self.lock:
+            self.calls[call] = self.calls.get(call, 0) + 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Google Drive endpoint for testing google_drive_uploader.py")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay added to every upload")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of uploads that fail with 503")
+
+    args = parser.parse_args()
+
+    drive = FakeDrive(args.port, args.latency, args.error_rate)
+    print(f"Fake Drive listening on {drive.endpoint} (use --api_endpoint {drive.endpoint})")
+    try:
+        drive.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Calls: {drive.calls}, files stored: {len(drive.files)}")
+
+if __name__ == "__main__":
+    main()
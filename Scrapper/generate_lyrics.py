@@ -1,39 +1,77 @@
 import os
 import argparse
 import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from transformers import GPT2Tokenizer, GPT2LMHeadModel, LogitsProcessorList
+from quantize_models import has_quantized_model, load_quantized_model, is_quantized
+from rhyme_constraints import constraint_processors
 
-def load_model(model_dir):
+def load_model(model_dir, quantized=False):
     """Load a trained model and tokenizer"""
     tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
-    model = GPT2LMHeadModel.from_pretrained(model_dir)
+    if quantized:
+        if not has_quantized_model(model_dir):
+            raise FileNotFoundError(f"No quantized model in {model_dir}, run quantize_models.py first")
+        model = load_quantized_model(model_dir)
+    else:
+        model = GPT2LMHeadModel.from_pretrained(model_dir)
     return model, tokenizer
 
-def generate_lyrics(model, tokenizer, prompt, max_length=200, temperature=1.0, top_k=50, top_p=0.95, num_return_sequences=1):
-    """Generate lyrics using the trained model"""
+def load_draft_model(model_dir):
+    """Load the draft model distilled by train_models.py --distill_draft"""
+    draft_dir = os.path.join(model_dir, "draft")
+    if not os.path.exists(draft_dir):
+        raise FileNotFoundError(f"No draft model in {draft_dir}, run train_models.py --distill_draft first")
+    return GPT2LMHeadModel.from_pretrained(draft_dir)
+
+def generate_lyrics(model, tokenizer, prompt, max_length=200, temperature=1.0, top_k=50, top_p=0.95, num_return_sequences=1, draft_model=None,
+                    rhyme_scheme=None, syllables=None):
+    """Generate lyrics using the trained model, optionally constrained to a rhyme scheme and syllables per line"""
     # Encode the prompt
     input_ids = tokenizer.encode(prompt, return_tensors="pt")
     
-    # Check if GPU is available
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # Check if GPU is available (quantized models only run on CPU)
+    if is_quantized(model):
+        device = torch.device("cpu")
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model.to(device)
     input_ids = input_ids.to(device)
     
-    # Generate text
-    output = model.generate(
-        input_ids,
-        max_length=max_length,
-        temperature=temperature,
-        top_k=top_k,
-        top_p=top_p,
-        num_return_sequences=num_return_sequences,
-        do_sample=True,
-        pad_token_id=tokenizer.eos_token_id
-    )
+    # Speculative decoding: the draft proposes tokens, the genre model verifies them
+    generation_kwargs = {}
+    constraints = constraint_processors(tokenizer, rhyme_scheme, syllables)
+    if constraints and draft_model is not None:
+        print("Rhyme and syllable constraints do not work with speculative decoding, generating without the draft model")
+        draft_model = None
+    if draft_model is not None:
+        draft_model.to(device)
+        generation_kwargs["assistant_model"] = draft_model
+    
+    # Assisted generation handles one sequence at a time
+    sequence_count = 1 if draft_model is not None else num_return_sequences
+    outputs = []
+    for _ in range(num_return_sequences // sequence_count):
+        # Constraint processors keep per-sequence line state, so each generate() call needs fresh ones
+        if constraints:
+            generation_kwargs["logits_processor"] = LogitsProcessorList(
+                constraint_processors(tokenizer, rhyme_scheme, syllables))
+        # Generate text
+        output = model.generate(
+            input_ids,
+            max_length=max_length,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p,
+            num_return_sequences=sequence_count,
+            do_sample=True,
+            pad_token_id=tokenizer.eos_token_id,
+            **generation_kwargs
+        )
+        outputs.extend(output)
     
     # Decode the generated text
     generated_texts = []
-    for i, generated_sequence in enumerate(output):
+    for i, generated_sequence in enumerate(outputs):
         text = tokenizer.decode(generated_sequence, skip_special_tokens=True)
         generated_texts.append(text)
     
@@ -49,6 +87,12 @@ def main():
     parser.add_argument("--top_k", type=int, default=50, help="Top-k sampling parameter")
     parser.add_argument("--top_p", type=float, default=0.95, help="Top-p sampling parameter")
     parser.add_argument("--num_sequences", type=int, default=1, help="Number of sequences to generate")
+    parser.add_argument("--quantized", action="store_true", help="Use the int8 model exported by quantize_models.py")
+    parser.add_argument("--speculative", action="store_true", help="Use the genre's distilled draft model for speculative decoding")
+    parser.add_argument("--rhyme_scheme", type=str, help="Rhyme scheme for the generated lines, e.g. AABB or ABAB (X = unrhymed line)")
+    parser.add_argument("--syllables", type=str, help="Syllables per line, e.g. 8 or 8,6 (repeated over the lines)")
+    parser.add_argument("--check_memorization", action="store_true", help="Report the longest verbatim overlap with the genre's training lyrics")
+    parser.add_argument("--index_dir", type=str, default="memorization_index", help="Directory with indexes built by memorization_index.py")
     
     args = parser.parse_args()
     
@@ -59,7 +103,8 @@ def main():
         print(f"Available genres: {os.listdir(args.models_dir)}")
         return
     
-    model, tokenizer = load_model(model_dir)
+    model, tokenizer = load_model(model_dir, quantized=args.quantized)
+    draft_model = load_draft_model(model_dir) if args.speculative else None
     
     # Generate lyrics
     generated_texts = generate_lyrics(
@@ -70,15 +115,33 @@ def main():
         temperature=args.temperature,
         top_k=args.top_k,
         top_p=args.top_p,
-        num_return_sequences=args.num_sequences
+        num_return_sequences=args.num_sequences,
+        draft_model=draft_model,
+        rhyme_scheme=args.rhyme_scheme,
+        syllables=args.syllables
     )
     
+    checker = None
+    if args.check_memorization:
+        from memorization_index import MemorizationChecker
+        checker = MemorizationChecker(args.index_dir)
+        if not checker.is_available(args.genre):
+            print(f"No memorization index found for genre: {args.genre}, run memorization_index.py first")
+            checker = None
+    
     # Print the generated lyrics
     print(f"\nGenerated lyrics for genre: {args.genre}")
     print("=" * 50)
     for i, text in enumerate(generated_texts):
         print(f"Sequence {i+1}:")
         print(text)
+        if checker is not None:
+            report = checker.check(args.genre, text[len(args.prompt):] if text.startswith(args.prompt) else text)
+            if report["source"]:
+                print(f"Longest verbatim overlap: {report['longest_overlap']} words from "
+                      f"\"{report['source']['title']}\" by {report['source']['artist']}")
+            else:
+                print("No verbatim overlap with the training lyrics")
         print("-" * 50)
 
 if __name__ == "__main__":
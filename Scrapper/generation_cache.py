@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+def generation_key(model_hash, prompt, params, seed):
+    """Cache key for a deterministic generation request"""
+    payload = json.dumps({
+        "model": model_hash,
+        "prompt": prompt,
+        "params": params,
+        "seed": seed
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class GenerationCache:
+    """Bounded in-process LRU of generated texts with an optional on-disk tier.
+
+    Only seeded requests are cached: with a fixed seed the same model, prompt and
+    sampling parameters always produce the same text.
+    """
+
+    def __init__(self, max_entries=1024, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0
+        }
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key, value):
+        """Insert into the memory tier, evicting the least recently used entries (lock held)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get(self, key):
+        """Return the cached text for a key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        value = json.load(f)["generated_text"]
+                except (OSError, ValueError, KeyError):
+                    value = None
+                if value is not None:
+                    with self._lock:
+                        self._remember(key, value)
+                        self.counters["disk_hits"] += 1
+                    return value
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key, value):
+        """Store a generated text in memory and, if enabled, on disk"""
+        with self._lock:
+            self._remember(key, value)
+            self.counters["stores"] += 1
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"generated_text": value}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+
+    def stats(self):
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_dir": self.disk_dir,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
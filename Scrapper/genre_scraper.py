@@ -1,6 +1,7 @@
-from azlyrics_scraper import get_artist_songs, scrape_lyrics_by_url
+from azlyrics_scraper import AZLYRICS_BASE_URL, get_artist_songs, scrape_lyrics_by_url
+from artist_resolver import default_resolver
+from throttle import default_throttle
 import os
-import time
 import json
 
 # Define top artists by genre (matching your AI writers)
@@ -54,10 +55,10 @@ def ensure_directory(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-def save_lyrics_to_file(artist, song_title, lyrics, genre):
+def save_lyrics_to_file(artist, song_title, lyrics, genre, data_dir="lyrics_data"):
     """Save lyrics to a local file organized by genre and artist"""
     # Create directories
-    base_dir = os.path.join("lyrics_data", genre)
+    base_dir = os.path.join(data_dir, genre)
     artist_dir = os.path.join(base_dir, artist.replace(" ", "_"))
     ensure_directory(artist_dir)
     
@@ -80,6 +81,9 @@ def scrape_genre(genre, max_artists=20, max_songs_per_artist=10):
     artists = genre_artists[genre][:max_artists]
     print(f"Starting to scrape {len(artists)} artists for genre: {genre}")
     
+    # Look up unknown artist pages from the letter index pages instead of guessing URLs one by one
+    default_resolver(AZLYRICS_BASE_URL).bulk_resolve(artists)
+    
     # Create base directory for genre
     base_dir = os.path.join("lyrics_data", genre)
     ensure_directory(base_dir)
@@ -116,7 +120,7 @@ def scrape_genre(genre, max_artists=20, max_songs_per_artist=10):
             print(f"[{i+1}/{len(songs_to_scrape)}] Scraping lyrics for '{song_title}'...")
             lyrics = scrape_lyrics_by_url(song_url)
             
-            if lyrics.startswith("Failed") or lyrics == "Lyrics not found on page":
+            if lyrics.startswith("Failed") or lyrics == "Lyrics not found on page" or lyrics.startswith("Error"):
                 print(f"  Error: {lyrics}")
                 progress["errors"].append(f"Error with {artist} - {song_title}: {lyrics}")
                 continue
@@ -125,20 +129,18 @@ def scrape_genre(genre, max_artists=20, max_songs_per_artist=10):
             file_path = save_lyrics_to_file(artist, song_title, lyrics, genre)
             print(f"  Saved to: {file_path}")
             progress["songs_scraped"] += 1
-            
-            # Be nice to the server
-            time.sleep(3)
         
+        # Requests are paced by the adaptive throttle in throttle.py
         progress["artists_completed"] += 1
+        progress["throttle"] = default_throttle().status()
         save_progress()
-        
-        # Be extra nice between artists
-        time.sleep(5)
     
     print(f"\nFinished scraping for genre: {genre}")
     print(f"Total artists processed: {progress['artists_completed']}")
     print(f"Total songs scraped: {progress['songs_scraped']}")
     print(f"Total errors: {len(progress['errors'])}")
+    throttle_status = default_throttle().status()
+    print(f"Request rate: {throttle_status['rate']:.2f}/s, block events: {len(throttle_status['block_events'])}")
     
     return progress
 
@@ -157,9 +159,6 @@ def scrape_all_genres(max_artists_per_genre=5, max_songs_per_artist=5):
         # Save overall progress
         with open("overall_progress.json", "w") as f:
             json.dump(overall_progress, f, indent=2)
-        
-        # Be very nice between genres
-        time.sleep(10)
     
     print("\nAll genres have been scraped!")
     return overall_progress
@@ -1,22 +1,35 @@
 from google.oauth2.credentials import Credentials
+from google.auth.credentials import AnonymousCredentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaIoBaseUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit, urlunsplit
+import httplib2
+import hashlib
+import argparse
+import threading
+import io
 import os
 import json
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
-def get_drive_service():
-    """Get authenticated Google Drive service"""
+# generateIds returns at most 1000 ids per call
+MAX_GENERATED_IDS = 1000
+
+def get_credentials():
+    """Load (and refresh or obtain) the user's Drive credentials"""
     creds = None
     # The file token.json stores the user's access and refresh tokens
     if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_info(
-            json.loads(open('token.json').read()), SCOPES)
-    
+        with open('token.json') as token:
+            creds = Credentials.from_authorized_user_info(json.loads(token.read()), SCOPES)
+
     # If credentials don't exist or are invalid, let the user log in
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -28,35 +41,192 @@ def get_drive_service():
         # Save the credentials for the next run
         with open('token.json', 'w') as token:
             token.write(creds.to_json())
-    
-    # Create Drive API client
-    return build('drive', 'v3', credentials=creds)
 
-def save_as_note(title, content, folder_id):
-    """Save content as a text file (note) in Google Drive"""
-    service = get_drive_service()
-    
-    # Create file metadata
+    return creds
+
+class DriveClient:
+    """One Drive API client shared by all threads.
+
+    The discovery client is built once; httplib2 connections are not thread
+    safe, so every thread sends its requests over its own authorized
+    connection. ``api_endpoint`` points the client at another server (e.g.
+    fake_drive.py), including media uploads.
+    """
+
+    def __init__(self, credentials, api_endpoint=None):
+        self.credentials = credentials
+        self.api_endpoint = api_endpoint.rstrip('/') + '/' if api_endpoint else None
+        self._local = threading.local()
+        client_options = {'api_endpoint': self.api_endpoint + 'drive/v3/'} if self.api_endpoint else None
+        self.service = build('drive', 'v3', http=self._http(), client_options=client_options,
+                             requestBuilder=self._build_request)
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=60))
+        return http
+
+    def _build_request(self, http, postproc, uri, **kwargs):
+        if self.api_endpoint:
+            # Media upload URLs keep the https scheme of the discovery document
+            endpoint = urlsplit(self.api_endpoint)
+            uri = urlunsplit(urlsplit(uri)._replace(scheme=endpoint.scheme, netloc=endpoint.netloc))
+        return HttpRequest(self._http(), postproc, uri, **kwargs)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_drive_client(api_endpoint=None):
+    """Authenticated Drive client, created once per endpoint and reused"""
+    with _clients_lock:
+        client = _clients.get(api_endpoint)
+        if client is None:
+            credentials = AnonymousCredentials() if api_endpoint else get_credentials()
+            client = _clients[api_endpoint] = DriveClient(credentials, api_endpoint)
+        return client
+
+def get_drive_service(api_endpoint=None):
+    """Get authenticated Google Drive service"""
+    return get_drive_client(api_endpoint).service
+
+def note_metadata(title, folder_id, file_id=None):
     file_metadata = {
         'name': f"{title}.txt",
         'mimeType': 'text/plain'
     }
-    
     if folder_id:
         file_metadata['parents'] = [folder_id]
-    
-    # Create temporary file
-    temp_filename = f"temp_{title.replace(' ', '_')}.txt"
-    with open(temp_filename, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    # Upload file
-    media = MediaFileUpload(temp_filename, mimetype='text/plain')
-    file = service.files().create(body=file_metadata,
+    if file_id:
+        file_metadata['id'] = file_id
+    return file_metadata
+
+def save_as_note(title, content, folder_id, api_endpoint=None):
+    """Save content as a text file (note) in Google Drive"""
+    service = get_drive_service(api_endpoint)
+
+    # Upload straight from memory
+    media = MediaIoBaseUpload(io.BytesIO(content.encode('utf-8')), mimetype='text/plain')
+    file = service.files().create(body=note_metadata(title, folder_id),
                                  media_body=media,
-                                 fields='id').execute()
-    
-    # Clean up temporary file
-    os.remove(temp_filename)
-    
-    return file.get('id')
\ No newline at end of file
+                                 fields='id').execute(num_retries=3)
+
+    return file.get('id')
+
+def note_key(title, content, folder_id):
+    """Content key of a note, so an edited song is uploaded again"""
+    digest = hashlib.sha256()
+    for part in (folder_id or '', title, content):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class DriveUploader:
+    """Upload many notes concurrently, resuming from a manifest.
+
+    File ids are reserved in bulk with files.generateIds and written to the
+    manifest before any content is sent, so a retried or resumed upload
+    reuses its id: Drive rejects the duplicate with 409 instead of creating
+    a second copy, and that is recorded as done.
+    """
+
+    def __init__(self, folder_id=None, manifest_path="drive_manifest.json", max_workers=8, api_endpoint=None):
+        self.folder_id = folder_id
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.client = get_drive_client(api_endpoint)
+        self._lock = threading.Lock()
+        self.manifest = {}
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def _save_manifest(self):
+        if not self.manifest_path:
+            return
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _reserve_ids(self, count):
+        ids = []
+        while len(ids) < count:
+            response = self.client.service.files().generateIds(
+                count=min(count - len(ids), MAX_GENERATED_IDS), space='drive').execute(num_retries=3)
+            ids.extend(response['ids'])
+        return ids
+
+    def _upload(self, key, title, content):
+        entry = self.manifest[key]
+        media = MediaIoBaseUpload(io.BytesIO(content.encode('utf-8')), mimetype='text/plain')
+        try:
+            self.client.service.files().create(body=note_metadata(title, self.folder_id, entry['id']),
+                                               media_body=media,
+                                               fields='id').execute(num_retries=3)
+        except HttpError as e:
+            # An earlier attempt already created the file with this id
+            if e.resp.status != 409:
+                raise
+        return key
+
+    def upload_notes(self, notes):
+        """Upload (title, content) pairs; returns {title: file id} for every note, uploaded now or before"""
+        notes = [(note_key(title, content, self.folder_id), title, content) for title, content in notes]
+        pending = [(key, title, content) for key, title, content in notes
+                   if self.manifest.get(key, {}).get('status') != 'done']
+
+        # Reserve ids for notes that have none yet, in as few calls as possible
+        new_keys = list(dict.fromkeys(key for key, _, _ in pending if key not in self.manifest))
+        if new_keys:
+            titles = {key: title for key, title, _ in pending}
+            for key, file_id in zip(new_keys, self._reserve_ids(len(new_keys))):
+                self.manifest[key] = {'title': titles[key], 'id': file_id, 'status': 'pending'}
+            self._save_manifest()
+
+        unique = {key: (title, content) for key, title, content in pending}
+        if unique:
+            print(f"Uploading {len(unique)} notes ({len(notes) - len(pending)} already uploaded)...")
+        failures = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._upload, key, title, content): key
+                       for key, (title, content) in unique.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"Error uploading {self.manifest[key]['title']}: {e}")
+                    continue
+                with self._lock:
+                    self.manifest[key]['status'] = 'done'
+                    self._save_manifest()
+
+        if failures:
+            print(f"{failures} uploads failed; run again to resume")
+        return {title: self.manifest[key]['id'] for key, title, _ in notes
+                if self.manifest.get(key, {}).get('status') == 'done'}
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload generated lyrics (.txt files) to Google Drive")
+    parser.add_argument("input_dir", type=str, help="Directory with .txt files to upload")
+    parser.add_argument("--folder_id", type=str, help="Drive folder to upload into")
+    parser.add_argument("--manifest", type=str, default="drive_manifest.json", help="Manifest of uploaded notes, used to resume")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument("--api_endpoint", type=str, help="Drive API endpoint override, e.g. http://127.0.0.1:8765 for fake_drive.py")
+
+    args = parser.parse_args()
+
+    notes = []
+    for filename in sorted(os.listdir(args.input_dir)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(args.input_dir, filename), 'r', encoding='utf-8') as f:
+                notes.append((filename[:-len('.txt')], f.read()))
+
+    uploader = DriveUploader(args.folder_id, args.manifest, args.workers, args.api_endpoint)
+    uploaded = uploader.upload_notes(notes)
+    print(f"{len(uploaded)}/{len(notes)} notes uploaded, manifest saved to {args.manifest}")
+
+if __name__ == "__main__":
+    main()
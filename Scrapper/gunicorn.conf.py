@@ -0,0 +1,54 @@
+import os
+import signal
+import multiprocessing
+
+# Production gunicorn settings for api.py, see wsgi.py
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# Request threads mostly wait in api.py's generation queue, so by default there
+# is one per slot and queue entry, plus a few for health checks and metrics.
+# With fewer, excess requests wait inside gunicorn instead of getting a 429
+generation_workers = int(os.environ.get("GENERATION_WORKERS", os.environ.get("COLLABORATIVE_WORKERS", 4)))
+threads = int(os.environ.get("WORKER_THREADS", generation_workers + int(os.environ.get("GENERATION_QUEUE_SIZE", 32)) + 4))
+worker_class = "gthread"
+
+# Import the app (and preload models) in the master so workers share its pages
+preload_app = True
+
+# Generation can take a while on CPU; finish in-flight requests on SIGTERM
+timeout = int(os.environ.get("WORKER_TIMEOUT", 300))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 60))
+keepalive = 5
+
+def intra_op_threads():
+    """Split the cores between workers so their torch thread pools do not oversubscribe"""
+    if os.environ.get("TORCH_THREADS"):
+        return int(os.environ["TORCH_THREADS"])
+    return max(1, multiprocessing.cpu_count() // workers)
+
+def post_fork(server, worker):
+    import torch
+
+    torch_threads = intra_op_threads()
+    torch.set_num_threads(torch_threads)
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    server.log.info(f"Worker {worker.pid} using {torch_threads} torch threads")
+
+def post_worker_init(worker):
+    import api
+
+    # Gunicorn installs its own handlers in init_process; chain ours in front so
+    # /readyz starts failing as soon as the worker begins a graceful shutdown
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        api.begin_shutdown()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+def worker_exit(server, worker):
+    import api
+
+    api.shutdown()
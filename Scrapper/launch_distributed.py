@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+def worker_environment(args, local_rank, threads):
+    """Environment for one training process (read by torch.distributed's env:// init)"""
+    env = dict(os.environ)
+    env.update({
+        "MASTER_ADDR": args.master_addr,
+        "MASTER_PORT": str(args.master_port),
+        "WORLD_SIZE": str(args.nnodes * args.nproc_per_node),
+        "RANK": str(args.node_rank * args.nproc_per_node + local_rank),
+        "LOCAL_RANK": str(local_rank),
+        # Split the cores between local processes instead of oversubscribing them
+        "OMP_NUM_THREADS": str(threads),
+        "MKL_NUM_THREADS": str(threads),
+        "TOKENIZERS_PARALLELISM": "false"
+    })
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Launch train_models.py as a DistributedDataParallel job (gloo backend, CPU)",
+        usage="%(prog)s [launcher options] -- [train_models.py options]"
+    )
+    parser.add_argument("--nproc_per_node", type=int, default=2, help="Training processes on this machine")
+    parser.add_argument("--nnodes", type=int, default=1, help="Number of machines in the job")
+    parser.add_argument("--node_rank", type=int, default=0, help="Index of this machine (0 runs the rendezvous)")
+    parser.add_argument("--master_addr", type=str, default="127.0.0.1", help="Address of the node with node_rank 0")
+    parser.add_argument("--master_port", type=int, default=29500, help="Free port on the node with node_rank 0")
+    parser.add_argument("--threads_per_proc", type=int, help="torch threads per process (default: cores / nproc_per_node)")
+    parser.add_argument("--script", type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "train_models.py"),
+                        help="Training script to run")
+
+    argv = sys.argv[1:]
+    script_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, script_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    threads = args.threads_per_proc or max(1, (os.cpu_count() or 1) // args.nproc_per_node)
+    command = [sys.executable, args.script, "--distributed"] + script_args
+
+    print(f"Starting {args.nproc_per_node} processes on node {args.node_rank} "
+          f"(world size {args.nnodes * args.nproc_per_node}, {threads} threads each)")
+    processes = [subprocess.Popen(command, env=worker_environment(args, local_rank, threads))
+                 for local_rank in range(args.nproc_per_node)]
+
+    # If one process fails the others would block in a collective forever, so stop them all
+    exit_code = 0
+    try:
+        while processes:
+            for process in list(processes):
+                code = process.poll()
+                if code is None:
+                    continue
+                processes.remove(process)
+                if code != 0:
+                    print(f"Training process {process.pid} exited with code {code}, stopping the others")
+                    exit_code = code
+                    for other in processes:
+                        other.send_signal(signal.SIGTERM)
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+        exit_code = 1
+    finally:
+        for process in processes:
+            process.wait()
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import threading
+import urllib.request
+import urllib.error
+import numpy as np
+
+def wait_until_ready(base_url, timeout=300):
+    """Poll /readyz until the server reports ready"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/readyz", timeout=5) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(1)
+    return False
+
+def post_json(url, payload, timeout=600):
+    """POST a JSON payload and return the HTTP status"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def run_load(base_url, payload, concurrency, duration, warmup_requests=2):
+    """Send requests from `concurrency` clients for `duration` seconds and collect latencies"""
+    url = f"{base_url}/api/generate"
+
+    # Warm up so one-time costs (first forward pass, allocator growth) are not measured
+    for _ in range(warmup_requests):
+        post_json(url, payload)
+
+    latencies = []
+    errors = []
+    shed = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        while time.time() < deadline:
+            start = time.perf_counter()
+            status = post_json(url, payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                elif status == 429:
+                    shed.append(elapsed)
+                else:
+                    errors.append(status)
+            if status == 429:
+                # Rejected by admission control; back off briefly instead of spinning
+                time.sleep(0.1)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    result = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "shed": len(shed),
+        "seconds": round(wall, 3),
+        "requests_per_sec": round(len(latencies) / wall, 3)
+    }
+    if latencies:
+        result["p50_ms"] = round(float(np.percentile(latencies, 50)) * 1000, 1)
+        result["p99_ms"] = round(float(np.percentile(latencies, 99)) * 1000, 1)
+    return result
+
+def start_server(workers, port, torch_threads=None):
+    """Start gunicorn with the production config and the given number of workers"""
+    env = dict(os.environ)
+    env["WEB_CONCURRENCY"] = str(workers)
+    env["BIND"] = f"127.0.0.1:{port}"
+    if torch_threads:
+        env["TORCH_THREADS"] = str(torch_threads)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        env=env
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the lyrics API at several worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--genre", type=str, default="pop", help="Genre to request")
+    parser.add_argument("--prompt", type=str, default="Title: Load Test\nArtist: AI Writer\n\nLyrics:\n", help="Prompt to send")
+    parser.add_argument("--max_length", type=int, default=64, help="max_length for each request")
+    parser.add_argument("--concurrency", type=int, default=0, help="Concurrent clients (default: 2 per worker)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run each profile")
+    parser.add_argument("--port", type=int, default=5055, help="Port for the gunicorn server")
+    parser.add_argument("--url", type=str, help="Test an already running server instead of starting gunicorn")
+    parser.add_argument("--output", type=str, default="load_test_results.json", help="Output file for the results")
+
+    args = parser.parse_args()
+
+    payload = {
+        "genre": args.genre,
+        "prompt": args.prompt,
+        "max_length": args.max_length
+    }
+
+    results = []
+    if args.url:
+        concurrency = args.concurrency or 2
+        if not wait_until_ready(args.url):
+            print(f"Server at {args.url} is not ready")
+            return
+        result = run_load(args.url, payload, concurrency, args.duration)
+        results.append(result)
+    else:
+        for workers in args.workers:
+            print(f"\nStarting gunicorn with {workers} worker(s)...")
+            server = start_server(workers, args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                if not wait_until_ready(base_url):
+                    print("Server did not become ready, skipping")
+                    continue
+                concurrency = args.concurrency or 2 * workers
+                result = run_load(base_url, payload, concurrency, args.duration)
+                result["workers"] = workers
+                results.append(result)
+            finally:
+                server.terminate()
+                server.wait()
+
+    # Print summary
+    print(f"\n{'workers':>8} {'clients':>8} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'shed':>6}")
+    for result in results:
+        print(f"{result.get('workers', '-'):>8} {result['concurrency']:>8} {result['requests_per_sec']:>8} "
+              f"{result.get('p50_ms', '-'):>9} {result.get('p99_ms', '-'):>9} {result['errors']:>7} {result['shed']:>6}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"payload": payload, "duration": args.duration, "results": results}, f, indent=2)
+
+    print(f"\nLoad test results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
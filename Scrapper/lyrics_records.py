@@ -0,0 +1,70 @@
+import os
+import json
+from collections import OrderedDict
+from lyrics_store import SHARD_DATA, ShardReader, is_shard
+
+def format_training_text(data):
+    """Format a processed song record the way the genre models are trained on it"""
+    return f"Title: {data['metadata']['title']}\nArtist: {data['metadata']['artist']}\n\nLyrics:\n{data['lyrics']}"
+
+class LyricsRecords:
+    """Lazy, index-backed access to the processed song records of one split directory.
+
+    Only file names are collected at construction; each record is read and
+    decoded when it is first requested. Up to ``cache_size`` decoded records are
+    kept in an LRU cache (0 disables caching), so resident memory follows what
+    is actually used rather than the size of the corpus. Directories packed by
+    lyrics_store.py are read from their compressed shard instead of JSON files.
+    """
+
+    def __init__(self, data_dir, cache_size=0):
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.shard = ShardReader(data_dir) if is_shard(data_dir) else None
+        if self.shard is not None:
+            self.filenames = self.shard.names
+        else:
+            with os.scandir(data_dir) as entries:
+                self.filenames = [entry.name for entry in entries
+                                  if entry.name.endswith('.json') and entry.is_file()]
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def path(self, idx):
+        """Where record idx is stored: its JSON file, or "<shard data file>#<index>" for a shard"""
+        if self.shard is not None:
+            return f"{os.path.join(self.data_dir, SHARD_DATA)}#{idx}"
+        return os.path.join(self.data_dir, self.filenames[idx])
+
+    def _read(self, idx):
+        if self.shard is not None:
+            return self.shard.read(idx)
+        with open(os.path.join(self.data_dir, self.filenames[idx]), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if self.cache_size <= 0:
+            return self._read(idx)
+
+        record = self._cache.get(idx)
+        if record is not None:
+            self._cache.move_to_end(idx)
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        record = self._read(idx)
+        self._cache[idx] = record
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return record
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
@@ -0,0 +1,186 @@
+import os
+import json
+import mmap
+import time
+import argparse
+import threading
+
+try:
+    import zstandard
+except ImportError:  # Compressed shards are optional
+    zstandard = None
+
+SHARD_INDEX = "records.json"
+SHARD_DATA = "records.zst"
+SHARD_DICTIONARY = "dictionary.zdict"
+DEFAULT_DICT_SIZE = 112640
+DEFAULT_LEVEL = 19
+
+def require_zstandard():
+    if zstandard is None:
+        raise ImportError("Compressed lyrics shards need the zstandard package: pip install zstandard")
+
+def is_shard(data_dir):
+    return os.path.exists(os.path.join(data_dir, SHARD_INDEX))
+
+def encode_record(data):
+    """Compact JSON bytes of a processed song record"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def train_dictionary(samples, dict_size=DEFAULT_DICT_SIZE):
+    """zstd dictionary trained on encoded records, or None if there are too few to train on"""
+    require_zstandard()
+    # Past ~1% of the training data a bigger dictionary costs more than it saves
+    dict_size = min(dict_size, max(sum(len(sample) for sample in samples) // 100, 4096))
+    try:
+        return zstandard.train_dictionary(dict_size, samples)
+    except zstandard.ZstdError as e:
+        print(f"Not enough records to train a zstd dictionary ({len(samples)} samples: {str(e)}), compressing without one")
+        return None
+
+def write_shard(output_dir, records, dictionary=None, level=DEFAULT_LEVEL, shared_dictionary=None):
+    """Write (filename, record) pairs as one shard of independently compressed zstd frames.
+
+    ``shared_dictionary`` is the path, relative to ``output_dir``, of the same
+    dictionary already written with another shard (val/test reuse the train
+    split's); otherwise the dictionary is stored with this shard. Returns the
+    shard size in bytes, including a dictionary stored with it. The index is
+    written last, so readers never see a half-written shard.
+    """
+    require_zstandard()
+    os.makedirs(output_dir, exist_ok=True)
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    entries = []
+    offset = 0
+    with open(os.path.join(output_dir, SHARD_DATA), 'wb') as f:
+        for name, data in records:
+            frame = compressor.compress(encode_record(data))
+            f.write(frame)
+            entries.append([name, offset, len(frame)])
+            offset += len(frame)
+
+    size = offset
+    dictionary_path = os.path.join(output_dir, SHARD_DICTIONARY)
+    if dictionary is not None and shared_dictionary is None:
+        dictionary_bytes = dictionary.as_bytes()
+        with open(dictionary_path, 'wb') as f:
+            f.write(dictionary_bytes)
+        size += len(dictionary_bytes)
+    elif os.path.exists(dictionary_path):
+        os.remove(dictionary_path)
+
+    if dictionary is None:
+        dictionary_file = None
+    else:
+        dictionary_file = shared_dictionary or SHARD_DICTIONARY
+    index = {"format": 1, "level": level, "dictionary": dictionary_file, "records": entries}
+    with open(os.path.join(output_dir, SHARD_INDEX), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    return size
+
+class ShardReader:
+    """Random access to the records of one compressed shard"""
+
+    def __init__(self, data_dir):
+        require_zstandard()
+        self.data_dir = data_dir
+        with open(os.path.join(data_dir, SHARD_INDEX), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.names = [name for name, _, _ in index["records"]]
+        self._frames = [(offset, length) for _, offset, length in index["records"]]
+        self._dictionary = None
+        if index.get("dictionary"):
+            with open(os.path.join(data_dir, index["dictionary"]), 'rb') as f:
+                self._dictionary = zstandard.ZstdCompressionDict(f.read())
+        self._data = None
+        self._lock = threading.Lock()
+        # Decompression contexts are not thread-safe; one per thread
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _mapped(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    with open(os.path.join(self.data_dir, SHARD_DATA), 'rb') as f:
+                        # mmap cannot map an empty file
+                        self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._frames else b""
+        return self._data
+
+    def _decompressor(self):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary)
+        return decompressor
+
+    def read_bytes(self, idx):
+        offset, length = self._frames[idx]
+        return self._decompressor().decompress(self._mapped()[offset:offset + length])
+
+    def read(self, idx):
+        return json.loads(self.read_bytes(idx))
+
+def shared_dictionary_path(split_dir, dictionary_dir):
+    """Path of the dictionary stored with `dictionary_dir`'s shard, relative to `split_dir`"""
+    if os.path.abspath(split_dir) == os.path.abspath(dictionary_dir):
+        return None
+    return os.path.relpath(os.path.join(dictionary_dir, SHARD_DICTIONARY), split_dir).replace(os.sep, '/')
+
+def pack_directory(data_dir, dictionary=None, level=DEFAULT_LEVEL, remove=False, shared_dictionary=None):
+    """Convert a directory of processed JSON records into a shard; returns (raw bytes, shard bytes)"""
+    from lyrics_records import LyricsRecords
+
+    records = LyricsRecords(data_dir)
+    pairs = [(name, records[idx]) for idx, name in enumerate(records.filenames)]
+    # An existing shard is repacked from its own records
+    json_files = [] if records.shard is not None else [records.path(idx) for idx in range(len(records))]
+    raw_bytes = sum(os.path.getsize(path) for path in json_files) if json_files else \
+        sum(len(encode_record(data)) for _, data in pairs)
+    size = write_shard(data_dir, pairs, dictionary, level, shared_dictionary)
+    if remove:
+        for path in json_files:
+            os.remove(path)
+    return raw_bytes, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack processed lyrics into zstd dictionary-compressed shards")
+    parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
+    parser.add_argument("--genre", type=str, help="Specific genre to pack (if not specified, pack all genres)")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, help="zstd compression level")
+    parser.add_argument("--dict_size", type=int, default=DEFAULT_DICT_SIZE, help="Dictionary size in bytes (trained per genre on the train split)")
+    parser.add_argument("--remove", action="store_true", help="Delete the JSON files once they are packed")
+
+    args = parser.parse_args()
+
+    from lyrics_records import LyricsRecords
+
+    # Get list of genres
+    if args.genre:
+        genres = [args.genre]
+    else:
+        genres = [d for d in os.listdir(os.path.join(args.data_dir, "train"))
+                 if os.path.isdir(os.path.join(args.data_dir, "train", d))]
+
+    for genre in genres:
+        start = time.perf_counter()
+        train_dir = os.path.join(args.data_dir, "train", genre)
+        train_records = LyricsRecords(train_dir)
+        dictionary = train_dictionary([encode_record(data) for data in train_records], args.dict_size)
+        total_raw = 0
+        total_packed = 0
+        # Train last: already packed val/test shards are still read with its old dictionary
+        for split in ("val", "test", "train"):
+            split_dir = os.path.join(args.data_dir, split, genre)
+            if not os.path.isdir(split_dir):
+                continue
+            raw_bytes, size = pack_directory(split_dir, dictionary, args.level, args.remove,
+                                             shared_dictionary_path(split_dir, train_dir))
+            total_raw += raw_bytes
+            total_packed += size
+        print(f"{genre}: {total_raw / 1e6:.1f} MB -> {total_packed / 1e6:.2f} MB "
+              f"({total_raw / max(total_packed, 1):.1f}x) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from azlyrics_scraper import get_artist_songs, scrape_lyrics_by_url
-import time
+from throttle import default_throttle
 import os
 import json
 
@@ -89,7 +89,7 @@ def scrape_artist(artist, genre, max_songs=10):
         print(f"[{i+1}/{min(len(songs), max_songs)}] Scraping lyrics for '{song_title}'...")
         lyrics = scrape_lyrics_by_url(song_url)
 
-        if lyrics.startswith("Failed") or lyrics == "Lyrics not found on page":
+        if lyrics.startswith("Failed") or lyrics == "Lyrics not found on page" or lyrics.startswith("Error"):
             print(f"  Error: {lyrics}")
             continue
 
@@ -98,9 +98,6 @@ def scrape_artist(artist, genre, max_songs=10):
         print(f"  Saved to: {file_path}")
         songs_scraped += 1
 
-        # Be nice to the server
-        time.sleep(3)
-
     print(f"Finished saving {songs_scraped} songs by {artist}.")
     return songs_scraped
 
@@ -139,11 +136,10 @@ def scrape_genre(genre, max_artists=20, max_songs_per_artist=10):
 
         progress["artists_completed"] += 1
         progress["songs_scraped"] += songs_scraped
+        # Requests are paced by the adaptive throttle in throttle.py
+        progress["throttle"] = default_throttle().status()
         save_progress()
 
-        # Be extra nice between artists
-        time.sleep(5)
-
     print(f"\nFinished scraping for genre: {genre}")
     print(f"Total artists processed: {progress['artists_completed']}")
     print(f"Total songs scraped: {progress['songs_scraped']}")
@@ -196,9 +192,6 @@ def main():
 
             scrape_genre(genre, max_artists, max_songs)
 
-            # Be very nice between genres
-            time.sleep(10)
-
         print("\nAll genres have been scraped!")
 
     else:
@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+import numpy as np
+from lyrics_records import LyricsRecords
+
+INDEX_DIR = "memorization_index"
+DEFAULT_NGRAM = 8
+# Very common n-grams (repeated hooks) are only followed up to this many times per query position
+MAX_CANDIDATES = 64
+HASH_BASE = np.uint64(1099511628211)
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+def tokenize(text):
+    """Lowercased words; punctuation and line breaks do not hide a verbatim copy"""
+    return WORD_PATTERN.findall(text.lower())
+
+@lru_cache(maxsize=262144)
+def word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def word_hashes(words):
+    return np.fromiter((word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+
+def ngram_hashes(tokens, n):
+    """Polynomial hash of every window of n consecutive word hashes (wrapping uint64 arithmetic)"""
+    count = len(tokens) - n + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(n):
+        hashes = hashes * HASH_BASE + tokens[offset:offset + count]
+    return hashes
+
+def build_index(data_dir, genre, output_dir=INDEX_DIR, n=DEFAULT_NGRAM):
+    """Build the n-gram index of a genre's training split"""
+    train_dir = os.path.join(data_dir, "train", genre)
+    if not os.path.exists(train_dir):
+        print(f"No training data found for genre: {genre}")
+        return None
+
+    print(f"Building memorization index for {genre} genre...")
+    start = time.perf_counter()
+    records = LyricsRecords(train_dir)
+    documents = []
+    token_chunks = []
+    offsets = [0]
+    for idx, data in enumerate(records):
+        tokens = word_hashes(tokenize(data['lyrics']))
+        token_chunks.append(tokens)
+        offsets.append(offsets[-1] + len(tokens))
+        documents.append({
+            "title": data['metadata']['title'],
+            "artist": data['metadata']['artist'],
+            "file": records.filenames[idx]
+        })
+
+    tokens = np.concatenate(token_chunks) if token_chunks else np.empty(0, dtype=np.uint64)
+    doc_offsets = np.array(offsets, dtype=np.int64)
+
+    # Only windows that start and end in the same song
+    hashes = ngram_hashes(tokens, n)
+    starts = np.arange(len(hashes), dtype=np.int64)
+    doc_of_start = np.searchsorted(doc_offsets, starts, side='right')
+    doc_of_end = np.searchsorted(doc_offsets, starts + n - 1, side='right')
+    valid = doc_of_start == doc_of_end
+    hashes = hashes[valid]
+    positions = starts[valid]
+
+    order = np.argsort(hashes, kind='stable')
+
+    index_dir = os.path.join(output_dir, genre)
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "tokens.npy"), tokens)
+    np.save(os.path.join(index_dir, "doc_offsets.npy"), doc_offsets)
+    np.save(os.path.join(index_dir, "ngram_hashes.npy"), hashes[order])
+    np.save(os.path.join(index_dir, "ngram_positions.npy"), positions[order])
+    with open(os.path.join(index_dir, "documents.json"), 'w', encoding='utf-8') as f:
+        json.dump(documents, f, ensure_ascii=False)
+    info = {
+        "genre": genre,
+        "n": n,
+        "songs": len(documents),
+        "words": int(len(tokens)),
+        "ngrams": int(len(hashes)),
+        "train_dir": train_dir
+    }
+    with open(os.path.join(index_dir, "index.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    print(f"Indexed {info['songs']} songs ({info['words']} words) in {time.perf_counter() - start:.1f}s")
+    return index_dir
+
+class MemorizationIndex:
+    """Memory-mapped n-gram index of one genre's training lyrics"""
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, "index.json"), 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        with open(os.path.join(index_dir, "documents.json"), 'r', encoding='utf-8') as f:
+            self.documents = json.load(f)
+        self.n = self.info["n"]
+        self.tokens = np.load(os.path.join(index_dir, "tokens.npy"), mmap_mode='r')
+        self.doc_offsets = np.load(os.path.join(index_dir, "doc_offsets.npy"), mmap_mode='r')
+        self.hashes = np.load(os.path.join(index_dir, "ngram_hashes.npy"), mmap_mode='r')
+        self.positions = np.load(os.path.join(index_dir, "ngram_positions.npy"), mmap_mode='r')
+
+    def check(self, text):
+        """Longest run of words in `text` copied verbatim from one training song.
+
+        Returns the overlap length in words, the overlapping words, the source
+        song and the fraction of the text's words covered by any indexed n-gram.
+        """
+        words = tokenize(text)
+        result = {"words": len(words), "longest_overlap": 0, "overlap_text": "", "source": None, "covered_fraction": 0.0}
+        query = word_hashes(words)
+        query_hashes = ngram_hashes(query, self.n)
+        if len(query_hashes) == 0 or len(self.hashes) == 0:
+            return result
+
+        # Candidate corpus positions for every query n-gram
+        left = np.searchsorted(self.hashes, query_hashes, side='left')
+        right = np.searchsorted(self.hashes, query_hashes, side='right')
+        counts = np.minimum(right - left, MAX_CANDIDATES)
+        total = int(counts.sum())
+        if total == 0:
+            return result
+        query_pos = np.repeat(np.arange(len(query_hashes)), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        corpus_pos = np.asarray(self.positions[np.repeat(left, counts) + within])
+
+        # Rule out hash collisions by comparing the word hashes themselves
+        same = np.ones(total, dtype=bool)
+        for offset in range(self.n):
+            same &= self.tokens[corpus_pos + offset] == query[query_pos + offset]
+        query_pos = query_pos[same]
+        corpus_pos = corpus_pos[same]
+        if len(query_pos) == 0:
+            return result
+
+        coverage = np.zeros(len(words) + 1, dtype=np.int64)
+        np.add.at(coverage, query_pos, 1)
+        np.add.at(coverage, query_pos + self.n, -1)
+        result["covered_fraction"] = float((np.cumsum(coverage[:-1]) > 0).mean())
+
+        # Overlapping n-grams of one copied passage share the offset between corpus and query
+        diagonal = corpus_pos - query_pos
+        order = np.lexsort((query_pos, diagonal))
+        diagonal = diagonal[order]
+        query_pos = query_pos[order]
+        breaks = np.ones(len(order), dtype=bool)
+        breaks[1:] = (diagonal[1:] != diagonal[:-1]) | (query_pos[1:] != query_pos[:-1] + 1)
+        run_starts = np.flatnonzero(breaks)
+        run_lengths = np.diff(np.append(run_starts, len(order)))
+        best = int(np.argmax(run_lengths))
+        start = run_starts[best]
+
+        overlap = int(run_lengths[best]) + self.n - 1
+        query_start = int(query_pos[start])
+        corpus_start = int(diagonal[start]) + query_start
+        doc = int(np.searchsorted(self.doc_offsets, corpus_start, side='right')) - 1
+        result.update({
+            "longest_overlap": overlap,
+            "overlap_text": " ".join(words[query_start:query_start + overlap]),
+            "source": self.documents[doc]
+        })
+        return result
+
+class MemorizationChecker:
+    """Lazily opened indexes for every genre under index_root"""
+
+    def __init__(self, index_root=INDEX_DIR):
+        self.index_root = index_root
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def is_available(self, genre):
+        return os.path.exists(os.path.join(self.index_root, genre, "index.json"))
+
+    def index(self, genre):
+        with self._lock:
+            index = self._indexes.get(genre)
+            if index is None and self.is_available(genre):
+                index = self._indexes[genre] = MemorizationIndex(os.path.join(self.index_root, genre))
+            return index
+
+    def check(self, genre, text):
+        """Overlap report for `text`, or None if the genre has no index"""
+        index = self.index(genre)
+        return index.check(text) if index is not None else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Build n-gram indexes of the training lyrics for memorization checks")
+    parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
+    parser.add_argument("--output_dir", type=str, default=INDEX_DIR, help="Directory to save the indexes")
+    parser.add_argument("--genre", type=str, help="Specific genre to index (if not specified, index all genres)")
+    parser.add_argument("--n", type=int, default=DEFAULT_NGRAM, help="Words per indexed n-gram (shortest overlap that can be detected)")
+    parser.add_argument("--check", type=str, help="Check this text against the index instead of building it (requires --genre)")
+
+    args = parser.parse_args()
+
+    if args.check:
+        start = time.perf_counter()
+        result = MemorizationChecker(args.output_dir).check(args.genre, args.check)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"Checked in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return
+
+    # Get list of genres
+    if args.genre:
+        genres = [args.genre]
+    else:
+        genres = [d for d in os.listdir(os.path.join(args.data_dir, "train"))
+                 if os.path.isdir(os.path.join(args.data_dir, "train", d))]
+
+    for genre in genres:
+        build_index(args.data_dir, genre, args.output_dir, args.n)
+
+if __name__ == "__main__":
+    main()
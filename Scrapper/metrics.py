@@ -0,0 +1,190 @@
+import time
+import json
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond stages to long CPU generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, rendered the Prometheus way"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, ("le", repr(float(bound)))), cumulative))
+            cumulative += series[len(self.buckets)]
+            samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, ("le", "+Inf")), cumulative))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), series[-1]))
+        return samples
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "lyrics_stage_seconds", "Time spent in each generation stage", ("stage", "genre"))
+REQUEST_SECONDS = registry.histogram(
+    "lyrics_request_seconds", "End-to-end request latency", ("endpoint",))
+FIRST_TOKEN_SECONDS = registry.histogram(
+    "lyrics_first_token_seconds", "Time from request start to the first streamed token", ("genre",))
+TOKENS = registry.counter(
+    "lyrics_tokens_total", "Prompt and generated tokens processed", ("kind", "genre"))
+REQUESTS = registry.counter(
+    "lyrics_requests_total", "Requests handled", ("endpoint", "status"))
+
+request_logger = logging.getLogger("lyrics.requests")
+
+class Trace:
+    """Per-generation timing spans and token counts, fed into the metrics above"""
+
+    def __init__(self, genre, endpoint=None):
+        self.genre = genre
+        self.endpoint = endpoint
+        self.created = time.perf_counter()
+        self.start = self.created
+        self.spans = {}
+        self.tokens = {}
+
+    def begin(self):
+        """Mark the start of work; the time since creation is recorded as queue wait"""
+        self.start = time.perf_counter()
+        self.record("queue_wait", self.start - self.created)
+
+    def record(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=stage, genre=self.genre)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def count_tokens(self, kind, count):
+        self.tokens[kind] = self.tokens.get(kind, 0) + count
+        TOKENS.inc(count, kind=kind, genre=self.genre)
+
+    def log(self, **extra):
+        """Emit one structured log line summarising this trace"""
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info(json.dumps({
+                "genre": self.genre,
+                "endpoint": self.endpoint,
+                "total": round(time.perf_counter() - self.created, 6),
+                "spans": {stage: round(seconds, 6) for stage, seconds in self.spans.items()},
+                "tokens": self.tokens,
+                **extra
+            }))
+
+def span_overhead_seconds(iterations=100000):
+    """Average cost of one empty span (timing plus histogram update)"""
+    trace = Trace("overhead")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with trace.span("overhead"):
+            pass
+    return (time.perf_counter() - start) / iterations
@@ -0,0 +1,409 @@
+import os
+import gc
+import json
+import mmap
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import torch
+from transformers import GPT2TokenizerFast, GPT2LMHeadModel, GPT2Config
+from transformers.modeling_utils import no_init_weights
+from quantize_models import has_quantized_model, load_quantized_model, quantized_dir
+
+# Files that define a tokenizer; genres whose files hash the same share one instance
+TOKENIZER_FILES = [
+    "vocab.json",
+    "merges.txt",
+    "tokenizer.json",
+    "added_tokens.json",
+    "special_tokens_map.json",
+    "tokenizer_config.json"
+]
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+def model_memory_bytes(model):
+    """Approximate resident size of a model's parameters and buffers in bytes"""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    # Dynamically quantized layers keep their int8 weights in packed params
+    for module in model.modules():
+        if hasattr(module, "_packed_params"):
+            total += module.weight().numel()
+    return total
+
+def tokenizer_fingerprint(model_dir):
+    """Hash the tokenizer files in a model directory"""
+    sha = hashlib.sha256()
+    for name in TOKENIZER_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            sha.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                sha.update(f.read())
+    return sha.hexdigest()
+
+# (path, size, mtime) -> sha256, so unchanged files are only hashed once per process
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file's contents, reusing the previous hash while its size and mtime are unchanged"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        digest = _file_hashes.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with _file_hashes_lock:
+            _file_hashes[memo_key] = digest
+    return digest
+
+def load_file_hashes(path):
+    """Seed the file hash memo from a file written by save_file_hashes (entries for changed files never match)"""
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    with _file_hashes_lock:
+        for file_path, size, mtime_ns, digest in entries:
+            _file_hashes[(file_path, size, mtime_ns)] = digest
+    return len(entries)
+
+def save_file_hashes(path):
+    """Persist the file hash memo so later processes skip re-hashing unchanged files"""
+    with _file_hashes_lock:
+        entries = [[file_path, size, mtime_ns, digest]
+                   for (file_path, size, mtime_ns), digest in _file_hashes.items() if os.path.exists(file_path)]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    os.replace(temp_path, path)
+
+def model_fingerprint(model_dir):
+    """Content hash of everything in a model directory that affects its outputs"""
+    sha = hashlib.sha256()
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if os.path.isfile(path):
+            sha.update(name.encode("utf-8"))
+            sha.update(file_sha256(path).encode("ascii"))
+    return sha.hexdigest()
+
+def load_safetensors_mmap(path):
+    """Map a .safetensors file copy-on-write and return tensors that view the mapping.
+
+    Pages stay shared with the OS page cache (and across forked workers) until a
+    tensor is written to, so repeated loads of the same checkpoint cost almost
+    no extra resident memory.
+    """
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    state_dict = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        if begin == end:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + begin)
+        state_dict[name] = tensor.reshape(info["shape"])
+    return state_dict
+
+def load_model_mmap(model_dir):
+    """Build a GPT-2 model whose weights are memory-mapped from model.safetensors"""
+    config = GPT2Config.from_pretrained(model_dir)
+    # Skip random initialisation, every weight is replaced by the mapped tensors
+    with no_init_weights():
+        model = GPT2LMHeadModel(config)
+
+    state_dict = load_safetensors_mmap(os.path.join(model_dir, "model.safetensors"))
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+
+    # lm_head is tied to the token embeddings and non-persistent buffers are not saved
+    missing = [k for k in missing if k != "lm_head.weight" and not k.endswith(("attn.bias", "attn.masked_bias"))]
+    if missing or unexpected:
+        raise ValueError(f"Checkpoint in {model_dir} does not match its config "
+                         f"(missing: {missing}, unexpected: {unexpected})")
+    model.tie_weights()
+    return model
+
+class ModelRegistry:
+    """Thread-safe cache of genre models with a memory budget and LRU eviction.
+
+    Each genre is loaded at most once at a time (concurrent first requests wait
+    for the same load). When the resident models exceed ``memory_budget_mb``
+    the least recently used genres that are not currently generating are
+    unloaded. Genres with identical tokenizer files share one fast tokenizer,
+    and on CPU safetensors checkpoints are memory-mapped instead of copied.
+    With ``quantized`` set, genres that have an exported int8 variant (see
+    quantize_models.py) are served from it on CPU. With ``speculative`` set,
+    the distilled draft model in ``<genre>/draft`` is loaded alongside.
+    """
+
+    def __init__(self, models_dir="trained_models", memory_budget_mb=0, device=None, mmap_weights=True,
+                 quantized=False, speculative=False):
+        self.models_dir = models_dir
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.mmap_weights = mmap_weights
+        self.quantized = quantized
+        self.speculative = speculative
+
+        # tokenizer fingerprint -> shared tokenizer instance
+        self._tokenizers = {}
+
+        # genre -> entry dict, ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.evictions = 0
+
+    def model_dir(self, genre):
+        return os.path.join(self.models_dir, genre)
+
+    def is_available(self, genre):
+        return os.path.exists(self.model_dir(genre))
+
+    def draft_dir(self, genre):
+        return os.path.join(self.model_dir(genre), "draft")
+
+    def uses_quantized(self, genre):
+        return self.quantized and self.device.type == "cpu" and has_quantized_model(self.model_dir(genre))
+
+    def fingerprint(self, genre, speculative=False):
+        """Content hash of the model variant served for a genre, or None if it has no trained model"""
+        if not self.is_available(genre):
+            return None
+        fingerprint = model_fingerprint(self.model_dir(genre))
+        if self.uses_quantized(genre):
+            fingerprint += model_fingerprint(quantized_dir(self.model_dir(genre)))
+        # Seeded output under assisted decoding depends on which draft tokens are accepted
+        if speculative and os.path.isdir(self.draft_dir(genre)):
+            fingerprint += model_fingerprint(self.draft_dir(genre))
+        return fingerprint
+
+    def _touch(self, genre):
+        """Mark a resident genre as most recently used and return its entry"""
+        entry = self._entries.get(genre)
+        if entry is not None:
+            self._entries.move_to_end(genre)
+            entry["last_used"] = time.time()
+            entry["hits"] += 1
+        return entry
+
+    def _load_tokenizer(self, model_dir):
+        """Return the shared tokenizer for a model directory, creating it on first use"""
+        fingerprint = tokenizer_fingerprint(model_dir)
+        with self._lock:
+            tokenizer = self._tokenizers.get(fingerprint)
+        if tokenizer is None:
+            tokenizer = GPT2TokenizerFast.from_pretrained(model_dir)
+            with self._lock:
+                tokenizer = self._tokenizers.setdefault(fingerprint, tokenizer)
+        return tokenizer, fingerprint
+
+    def _load_model(self, genre):
+        """Load the model and tokenizer for a genre from disk"""
+        model_dir = self.model_dir(genre)
+        tokenizer, fingerprint = self._load_tokenizer(model_dir)
+
+        quantized = self.uses_quantized(genre)
+        mapped = (not quantized and self.mmap_weights and self.device.type == "cpu"
+                  and os.path.exists(os.path.join(model_dir, "model.safetensors")))
+        if quantized:
+            model = load_quantized_model(model_dir)
+        elif mapped:
+            model = load_model_mmap(model_dir)
+        else:
+            model = GPT2LMHeadModel.from_pretrained(model_dir)
+            model.to(self.device)
+        model.eval()
+
+        # Small draft model that proposes tokens for speculative decoding
+        draft = None
+        if self.speculative and os.path.exists(self.draft_dir(genre)):
+            draft = GPT2LMHeadModel.from_pretrained(self.draft_dir(genre))
+            draft.to(self.device if not quantized else torch.device("cpu"))
+            draft.eval()
+
+        details = {"tokenizer": fingerprint[:12], "mmap": mapped, "quantized": quantized, "draft": draft is not None}
+        return model, tokenizer, draft, details
+
+    def _acquire(self, genre, pin):
+        """Return the entry for a genre, loading it first if needed"""
+        # Checked before a load lock is created, so unknown genre names leave nothing behind
+        if not self.is_available(genre):
+            return None
+
+        with self._lock:
+            entry = self._touch(genre)
+            if entry is not None:
+                entry["in_use"] += pin
+                return entry
+            load_lock = self._load_locks.setdefault(genre, threading.Lock())
+
+        # Single flight: only one thread loads a genre, the others wait for it
+        with load_lock:
+            with self._lock:
+                entry = self._touch(genre)
+                if entry is not None:
+                    entry["in_use"] += pin
+                    return entry
+
+            start = time.time()
+            try:
+                model, tokenizer, draft, details = self._load_model(genre)
+            except Exception:
+                with self._lock:
+                    if self._load_locks.get(genre) is load_lock:
+                        del self._load_locks[genre]
+                raise
+            entry = {
+                "model": model,
+                "tokenizer": tokenizer,
+                "draft": draft,
+                "details": details,
+                "bytes": model_memory_bytes(model) + (model_memory_bytes(draft) if draft is not None else 0),
+                "load_seconds": time.time() - start,
+                "loaded_at": time.time(),
+                "last_used": time.time(),
+                "hits": 1,
+                "in_use": pin
+            }
+
+            with self._lock:
+                self._entries[genre] = entry
+                self._evict()
+
+        return entry
+
+    def _evict(self):
+        """Unload idle genres, least recently used first, until within budget (lock held)"""
+        if not self.memory_budget:
+            return
+
+        evicted = False
+        for genre in list(self._entries):
+            if self.resident_bytes() <= self.memory_budget:
+                break
+            entry = self._entries[genre]
+            # Never evict a model that is mid-generation or the one just loaded
+            if entry["in_use"] or genre == next(reversed(self._entries)):
+                continue
+            del self._entries[genre]
+            self.evictions += 1
+            evicted = True
+
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def draft(self, genre):
+        """Return the resident draft model for a genre, or None"""
+        with self._lock:
+            entry = self._entries.get(genre)
+            return entry["draft"] if entry is not None else None
+
+    def get(self, genre):
+        """Return (model, tokenizer) for a genre, or (None, None) if it has no trained model"""
+        entry = self._acquire(genre, pin=0)
+        if entry is None:
+            return None, None
+        return entry["model"], entry["tokenizer"]
+
+    @contextmanager
+    def use(self, genre):
+        """Pin a genre's model for the duration of a generation so it cannot be evicted"""
+        entry = self._acquire(genre, pin=1)
+        try:
+            if entry is None:
+                yield None, None
+            else:
+                yield entry["model"], entry["tokenizer"]
+        finally:
+            if entry is not None:
+                with self._lock:
+                    entry["in_use"] -= 1
+                    self._evict()
+
+    def preload(self, genres):
+        """Load the given genres ahead of traffic, skipping any without a trained model"""
+        loaded = []
+        for genre in genres:
+            model, tokenizer = self.get(genre)
+            if model is not None:
+                loaded.append(genre)
+            else:
+                print(f"Cannot preload {genre}: no trained model in {self.model_dir(genre)}")
+        return loaded
+
+    def unload(self, genre):
+        """Drop a genre from memory unless it is currently generating"""
+        with self._lock:
+            entry = self._entries.get(genre)
+            if entry is None or entry["in_use"]:
+                return False
+            del self._entries[genre]
+        gc.collect()
+        return True
+
+    def resident_bytes(self):
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def resident(self):
+        """Describe the resident genres, least recently used first"""
+        with self._lock:
+            return [
+                {
+                    "genre": genre,
+                    "memory_mb": round(entry["bytes"] / (1024 * 1024), 1),
+                    "load_seconds": round(entry["load_seconds"], 3),
+                    "loaded_at": entry["loaded_at"],
+                    "last_used": entry["last_used"],
+                    "hits": entry["hits"],
+                    "in_use": entry["in_use"],
+                    **entry["details"]
+                }
+                for genre, entry in self._entries.items()
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident_mb": round(self.resident_bytes() / (1024 * 1024), 1),
+                "memory_budget_mb": round(self.memory_budget / (1024 * 1024), 1),
+                "evictions": self.evictions,
+                "models": len(self._entries),
+                "shared_tokenizers": len(self._tokenizers)
+            }
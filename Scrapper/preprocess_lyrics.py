@@ -2,7 +2,9 @@ import os
 import re
 import random
 import json
+import argparse
 from pathlib import Path
+from lyrics_store import DEFAULT_DICT_SIZE, DEFAULT_LEVEL, encode_record, shared_dictionary_path, train_dictionary, write_shard
 
 def clean_lyrics(text):
     """Clean lyrics text by removing headers, footers, and normalizing text"""
@@ -16,8 +18,13 @@ def clean_lyrics(text):
     
     return text
 
-def process_genre_folder(genre_path, output_dir):
-    """Process all lyrics in a genre folder"""
+def process_genre_folder(genre_path, output_dir, compress=False, level=DEFAULT_LEVEL, dict_size=DEFAULT_DICT_SIZE):
+    """Process all lyrics in a genre folder.
+
+    With ``compress`` each split is written as one zstd shard (see lyrics_store.py)
+    using a dictionary trained on the genre's training songs, instead of one JSON
+    file per song.
+    """
     genre = os.path.basename(genre_path)
     print(f"Processing {genre} genre...")
     
@@ -44,6 +51,9 @@ def process_genre_folder(genre_path, output_dir):
         "test_count": 0
     }
     
+    # Records of each split, kept in memory until the dictionary is trained
+    shards = {"train": [], "val": [], "test": []}
+    
     # Process each artist
     for artist_folder in artist_folders:
         artist_path = os.path.join(genre_path, artist_folder)
@@ -83,40 +93,69 @@ def process_genre_folder(genre_path, output_dir):
         
         # Process train files
         for file in train_files:
-            process_file(os.path.join(artist_path, file), os.path.join(train_dir, file), artist_name)
+            if compress:
+                collect_record(shards["train"], os.path.join(artist_path, file), artist_name)
+            else:
+                process_file(os.path.join(artist_path, file), os.path.join(train_dir, file), artist_name)
         
         # Process validation files
         for file in val_files:
-            process_file(os.path.join(artist_path, file), os.path.join(val_dir, file), artist_name)
+            if compress:
+                collect_record(shards["val"], os.path.join(artist_path, file), artist_name)
+            else:
+                process_file(os.path.join(artist_path, file), os.path.join(val_dir, file), artist_name)
         
         # Process test files
         for file in test_files:
-            process_file(os.path.join(artist_path, file), os.path.join(test_dir, file), artist_name)
+            if compress:
+                collect_record(shards["test"], os.path.join(artist_path, file), artist_name)
+            else:
+                process_file(os.path.join(artist_path, file), os.path.join(test_dir, file), artist_name)
+    
+    if compress:
+        dictionary = train_dictionary([encode_record(data) for _, data in shards["train"]], dict_size)
+        raw_bytes = sum(len(encode_record(data)) for records in shards.values() for _, data in records)
+        compressed_bytes = 0
+        for split, split_dir in (("train", train_dir), ("val", val_dir), ("test", test_dir)):
+            compressed_bytes += write_shard(split_dir, shards[split], dictionary, level,
+                                            shared_dictionary_path(split_dir, train_dir))
+        stats["storage"] = {"format": "zstd", "raw_bytes": raw_bytes, "compressed_bytes": compressed_bytes}
     
     return stats
 
+def load_song(input_path, artist_name):
+    """Read and clean a lyrics file into a processed record"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        lyrics = f.read()
+    
+    # Clean the lyrics
+    cleaned_lyrics = clean_lyrics(lyrics)
+    
+    # Add metadata
+    song_title = os.path.basename(input_path).replace('.txt', '')
+    metadata = {
+        "title": song_title,
+        "artist": artist_name,
+        "original_file": input_path
+    }
+    
+    return {
+        "metadata": metadata,
+        "lyrics": cleaned_lyrics
+    }
+
+def collect_record(records, input_path, artist_name):
+    """Process a single lyrics file into an in-memory (filename, record) list"""
+    try:
+        records.append((os.path.basename(input_path).replace('.txt', '.json'), load_song(input_path, artist_name)))
+    except Exception as e:
+        print(f"Error processing {input_path}: {str(e)}")
+
 def process_file(input_path, output_path, artist_name):
     """Process a single lyrics file"""
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            lyrics = f.read()
-        
-        # Clean the lyrics
-        cleaned_lyrics = clean_lyrics(lyrics)
-        
-        # Add metadata
-        song_title = os.path.basename(input_path).replace('.txt', '')
-        metadata = {
-            "title": song_title,
-            "artist": artist_name,
-            "original_file": input_path
-        }
-        
         # Save as JSON with metadata and cleaned lyrics
-        output_data = {
-            "metadata": metadata,
-            "lyrics": cleaned_lyrics
-        }
+        output_data = load_song(input_path, artist_name)
         
         with open(output_path.replace('.txt', '.json'), 'w', encoding='utf-8') as f:
             json.dump(output_data, f, indent=2, ensure_ascii=False)
@@ -125,9 +164,18 @@ def process_file(input_path, output_path, artist_name):
         print(f"Error processing {input_path}: {str(e)}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Clean the scraped lyrics and split them into train/val/test")
+    parser.add_argument("--input_dir", type=str, default="lyrics_data", help="Directory with scraped lyrics")
+    parser.add_argument("--output_dir", type=str, default="processed_lyrics_data", help="Directory for the processed data")
+    parser.add_argument("--compress", action="store_true", help="Write zstd dictionary-compressed shards instead of JSON files (needs zstandard)")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, help="zstd compression level")
+    parser.add_argument("--dict_size", type=int, default=DEFAULT_DICT_SIZE, help="Dictionary size in bytes")
+    
+    args = parser.parse_args()
+    
     # Base directories
-    lyrics_data_dir = "lyrics_data"
-    processed_data_dir = "processed_lyrics_data"
+    lyrics_data_dir = args.input_dir
+    processed_data_dir = args.output_dir
     
     # Create output directory
     os.makedirs(processed_data_dir, exist_ok=True)
@@ -139,7 +187,7 @@ def main():
     all_stats = {}
     for genre_folder in genre_folders:
         genre_path = os.path.join(lyrics_data_dir, genre_folder)
-        stats = process_genre_folder(genre_path, processed_data_dir)
+        stats = process_genre_folder(genre_path, processed_data_dir, args.compress, args.level, args.dict_size)
         all_stats[genre_folder] = stats
     
     # Save statistics
@@ -156,6 +204,9 @@ def main():
         print(f"  Train: {stats['train_count']} songs")
         print(f"  Validation: {stats['val_count']} songs")
         print(f"  Test: {stats['test_count']} songs")
+        if "storage" in stats:
+            storage = stats["storage"]
+            print(f"  Compressed: {storage['raw_bytes'] / 1e6:.1f} MB -> {storage['compressed_bytes'] / 1e6:.2f} MB")
         print()
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import argparse
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+from transformers import GPT2Tokenizer, GPT2LMHeadModel, GPT2Config
+
+try:
+    from transformers.pytorch_utils import Conv1D
+except ImportError:
+    from transformers.modeling_utils import Conv1D
+
+# Quantized variants are written next to the fp32 checkpoint: trained_models/<genre>/int8/
+QUANTIZED_SUBDIR = "int8"
+QUANTIZED_WEIGHTS = "quantized_model.pt"
+QUANTIZED_INFO = "quantization.json"
+
+def conv1d_to_linear(model):
+    """Replace GPT-2's Conv1D layers with equivalent nn.Linear layers.
+
+    Dynamic quantization only handles nn.Linear, while GPT-2 implements its
+    attention and MLP projections as Conv1D (a linear layer with a transposed
+    weight).
+    """
+    for name, module in list(model.named_children()):
+        if isinstance(module, Conv1D):
+            n_in, n_out = module.weight.shape
+            linear = nn.Linear(n_in, n_out)
+            with torch.no_grad():
+                linear.weight.copy_(module.weight.t())
+                linear.bias.copy_(module.bias)
+            setattr(model, name, linear)
+        else:
+            conv1d_to_linear(module)
+    return model
+
+def quantize_model(model):
+    """Return a dynamically int8-quantized version of an fp32 GPT-2 model (CPU only)"""
+    model.to("cpu")
+    model.eval()
+    conv1d_to_linear(model)
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def is_quantized(model):
+    """True if a model contains dynamically quantized layers (these must stay on CPU)"""
+    return any(hasattr(module, "_packed_params") for module in model.modules())
+
+def quantized_dir(model_dir):
+    return os.path.join(model_dir, QUANTIZED_SUBDIR)
+
+def has_quantized_model(model_dir):
+    return os.path.exists(os.path.join(quantized_dir(model_dir), QUANTIZED_WEIGHTS))
+
+def load_quantized_model(model_dir):
+    """Load the int8 variant exported for a genre checkpoint"""
+    config = GPT2Config.from_pretrained(model_dir)
+    model = quantize_model(GPT2LMHeadModel(config))
+
+    # Trusted local export; quantized packed params need the full unpickler
+    state_dict = torch.load(os.path.join(quantized_dir(model_dir), QUANTIZED_WEIGHTS),
+                            map_location="cpu", weights_only=False)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model
+
+def file_size_mb(path):
+    return os.path.getsize(path) / (1024 * 1024)
+
+def generation_tokens_per_sec(model, tokenizer, prompt, new_tokens=64):
+    """Greedy-decode a fixed number of tokens and return the throughput"""
+    input_ids = tokenizer.encode(prompt, return_tensors="pt")
+    with torch.no_grad():
+        start = time.perf_counter()
+        model.generate(
+            input_ids,
+            max_new_tokens=new_tokens,
+            min_new_tokens=new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+        elapsed = time.perf_counter() - start
+    return new_tokens / elapsed
+
+def export_quantized(genre, models_dir, data_dir, tolerance=0.02, max_eval_samples=200, batch_size=4):
+    """Quantize a genre model, check perplexity parity against fp32 and save the int8 variant"""
+    from evaluate_models import TestDataset, calculate_perplexity
+
+    model_dir = os.path.join(models_dir, genre)
+    if not os.path.exists(model_dir):
+        print(f"No trained model found for genre: {genre}")
+        return None
+
+    print(f"Quantizing model for {genre} genre...")
+    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    fp32_model = GPT2LMHeadModel.from_pretrained(model_dir)
+    fp32_model.eval()
+
+    int8_model = quantize_model(GPT2LMHeadModel.from_pretrained(model_dir))
+
+    output_dir = quantized_dir(model_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    weights_path = os.path.join(output_dir, QUANTIZED_WEIGHTS)
+    torch.save(int8_model.state_dict(), weights_path)
+
+    info = {
+        "genre": genre,
+        "method": "dynamic-int8",
+        "int8_size_mb": round(file_size_mb(weights_path), 1),
+        "fp32_size_mb": round(sum(
+            file_size_mb(os.path.join(model_dir, f)) for f in os.listdir(model_dir)
+            if f.endswith((".safetensors", ".bin"))
+        ), 1)
+    }
+
+    # Perplexity parity on the test split (falls back to validation)
+    device = torch.device("cpu")
+    eval_dir = None
+    for split in ["test", "val"]:
+        split_dir = os.path.join(data_dir, split, genre)
+        if os.path.exists(split_dir) and os.listdir(split_dir):
+            eval_dir = split_dir
+            break
+
+    if eval_dir is None:
+        print(f"No test or validation data found for genre: {genre}, skipping parity check")
+        info["parity_checked"] = False
+    else:
+        dataset = TestDataset(eval_dir, tokenizer)
+        if len(dataset) > max_eval_samples:
+            dataset = Subset(dataset, range(max_eval_samples))
+        dataloader = DataLoader(dataset, batch_size=batch_size)
+
+        fp32_perplexity = calculate_perplexity(fp32_model, dataloader, device)
+        int8_perplexity = calculate_perplexity(int8_model, dataloader, device)
+        relative_change = (int8_perplexity - fp32_perplexity) / fp32_perplexity
+
+        info.update({
+            "parity_checked": True,
+            "eval_dir": eval_dir,
+            "eval_samples": len(dataset),
+            "fp32_perplexity": fp32_perplexity,
+            "int8_perplexity": int8_perplexity,
+            "relative_change": relative_change,
+            "tolerance": tolerance,
+            "passed": relative_change <= tolerance
+        })
+        print(f"Perplexity fp32: {fp32_perplexity:.4f}  int8: {int8_perplexity:.4f}  ({relative_change:+.2%})")
+
+    # Rough CPU generation speed comparison
+    prompt = "Title: Sample Song\nArtist: AI Writer\n\nLyrics:\n"
+    info["fp32_tokens_per_sec"] = generation_tokens_per_sec(fp32_model, tokenizer, prompt)
+    info["int8_tokens_per_sec"] = generation_tokens_per_sec(int8_model, tokenizer, prompt)
+    info["speedup"] = info["int8_tokens_per_sec"] / info["fp32_tokens_per_sec"]
+    print(f"Generation fp32: {info['fp32_tokens_per_sec']:.1f} tok/s  int8: {info['int8_tokens_per_sec']:.1f} tok/s  "
+          f"({info['speedup']:.2f}x)")
+    print(f"Weights fp32: {info['fp32_size_mb']} MB  int8: {info['int8_size_mb']} MB")
+
+    with open(os.path.join(output_dir, QUANTIZED_INFO), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    if info.get("parity_checked") and not info["passed"]:
+        print(f"WARNING: int8 perplexity for {genre} is {info['relative_change']:.2%} worse than fp32 "
+              f"(tolerance {tolerance:.2%}); loaders will still use it if asked to")
+
+    return info
+
+def main():
+    parser = argparse.ArgumentParser(description="Export dynamically int8-quantized versions of the genre models")
+    parser.add_argument("--models_dir", type=str, default="trained_models", help="Directory with trained models")
+    parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
+    parser.add_argument("--genre", type=str, help="Specific genre to quantize (if not specified, quantize all genres)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Maximum relative perplexity increase allowed")
+    parser.add_argument("--max_eval_samples", type=int, default=200, help="Number of songs used for the perplexity check")
+    parser.add_argument("--batch_size", type=int, default=4, help="Batch size for the perplexity check")
+
+    args = parser.parse_args()
+
+    # Get list of genres
+    if args.genre:
+        genres = [args.genre]
+    else:
+        genres = [d for d in os.listdir(args.models_dir)
+                 if os.path.isdir(os.path.join(args.models_dir, d))]
+
+    results = {}
+    for genre in genres:
+        info = export_quantized(
+            genre=genre,
+            models_dir=args.models_dir,
+            data_dir=args.data_dir,
+            tolerance=args.tolerance,
+            max_eval_samples=args.max_eval_samples,
+            batch_size=args.batch_size
+        )
+        if info:
+            results[genre] = info
+
+    failed = [genre for genre, info in results.items() if info.get("parity_checked") and not info["passed"]]
+    print(f"Quantized {len(results)} model(s)")
+    if failed:
+        print(f"Perplexity parity failed for: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import re
+import string
+import threading
+import weakref
+import torch
+from transformers import LogitsProcessor
+
+VOWELS = "aeiouyáéíóúàèìòùâêîôûäëïöüã"
+VOWEL_GROUPS = re.compile(f"[{VOWELS}]+")
+MAX_SCHEME_LENGTH = 16
+MAX_SYLLABLES = 32
+
+# Token kinds in the rhyme class table
+CONTINUATION = -1  # letters continuing a word; the word's ending is not known from the token alone
+NO_LETTERS = -2    # punctuation, spaces, digits: do not change the line's last word
+
+def count_syllables(word, whole_word=True):
+    """Vowel-group estimate of a word's (or word piece's) syllables"""
+    groups = len(VOWEL_GROUPS.findall(word))
+    # Silent final e: "time", "love" (but not "be", "free" or "little")
+    if whole_word and groups > 1 and word.endswith("e") and not word.endswith(("le", "ee")):
+        groups -= 1
+    return max(groups, 1) if whole_word and word else groups
+
+def rhyme_ending(word):
+    """Spelling-based rhyme key: the last vowel group and what follows ("night" -> "ight", "time" -> "ime")"""
+    stem = word[:-1] if len(word) > 2 and word.endswith("e") and word[-2] not in VOWELS else word
+    matches = list(VOWEL_GROUPS.finditer(stem))
+    return word[matches[-1].start():] if matches else word
+
+def parse_syllables(value):
+    """Syllables per line from an int, a list or a comma-separated string like "8,6" (None passes through)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = [part for part in value.split(",") if part.strip()]
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    counts = [int(count) for count in value]
+    if not counts or any(count < 1 or count > MAX_SYLLABLES for count in counts):
+        raise ValueError(f"syllables must be between 1 and {MAX_SYLLABLES} per line")
+    return counts
+
+def parse_rhyme_scheme(value):
+    """Normalized rhyme scheme such as "AABB" or "ABAB" (None passes through); X marks an unrhymed line"""
+    if value is None or value == "":
+        return None
+    scheme = str(value).strip().upper()
+    if not scheme.isalpha() or not scheme.isascii() or len(scheme) > MAX_SCHEME_LENGTH:
+        raise ValueError(f"rhyme_scheme must be up to {MAX_SCHEME_LENGTH} letters, e.g. AABB or ABAB")
+    return scheme
+
+class VocabularyTables:
+    """Per-token syllable estimates, rhyme classes and token kinds for one tokenizer, built once"""
+
+    def __init__(self, tokenizer):
+        size = len(tokenizer)
+        texts = tokenizer.batch_decode([[token_id] for token_id in range(size)])
+        endings = {}
+        syllables = []
+        classes = []
+        newline = []
+        punctuation = []
+        broken = []
+        for text in texts:
+            letters = "".join(ch for ch in text.lower() if ch.isalpha())
+            has_newline = "\n" in text
+            if letters:
+                word_start = text[:1].isspace()
+                syllables.append(count_syllables(letters, whole_word=word_start))
+                classes.append(endings.setdefault(rhyme_ending(letters), len(endings)) if word_start else CONTINUATION)
+            else:
+                syllables.append(0)
+                classes.append(NO_LETTERS)
+            newline.append(has_newline and not letters and "\ufffd" not in text)
+            punctuation.append(not letters and not has_newline and any(ch in string.punctuation for ch in text)
+                               and all(ch in string.punctuation or ch == " " for ch in text))
+            # Tokens mixing a line break with letters would end and start a line at once
+            broken.append(has_newline and bool(letters))
+
+        self.size = size
+        self.syllables = torch.tensor(syllables, dtype=torch.int32)
+        self.classes = torch.tensor(classes, dtype=torch.int32)
+        self.newline = torch.tensor(newline, dtype=torch.bool)
+        self.punctuation = torch.tensor(punctuation, dtype=torch.bool)
+        self.broken = torch.tensor(broken, dtype=torch.bool)
+        self.eos_token_id = tokenizer.eos_token_id
+        self._on_device = {}
+        self._lock = threading.Lock()
+
+    def on(self, device, vocab_size):
+        """Tables on `device`, padded to the model's vocabulary size (padding tokens are never allowed)"""
+        key = (str(device), vocab_size)
+        with self._lock:
+            tables = self._on_device.get(key)
+            if tables is None:
+                pad = max(vocab_size - self.size, 0)
+                def fit(tensor, fill):
+                    tensor = tensor[:vocab_size]
+                    if pad:
+                        tensor = torch.cat([tensor, torch.full((pad,), fill, dtype=tensor.dtype)])
+                    return tensor.to(device)
+                tables = self._on_device[key] = {
+                    "syllables": fit(self.syllables, MAX_SYLLABLES + 1),
+                    "classes": fit(self.classes, CONTINUATION),
+                    "newline": fit(self.newline, False),
+                    "punctuation": fit(self.punctuation, False),
+                    "blocked": fit(self.broken, True)
+                }
+            return tables
+
+_tables = weakref.WeakKeyDictionary()
+_tables_lock = threading.Lock()
+
+def vocabulary_tables(tokenizer):
+    with _tables_lock:
+        tables = _tables.get(tokenizer)
+        if tables is None:
+            tables = _tables[tokenizer] = VocabularyTables(tokenizer)
+        return tables
+
+class RhymeConstraintProcessor(LogitsProcessor):
+    """Mask tokens so generated lines hit a syllable count and end on rhyming words.
+
+    Per sequence it tracks the current line, its syllables so far and the rhyme
+    class of its last word. With a syllable target, a token may not overshoot the
+    line's budget, a token that completes the line must be a whole word that
+    rhymes with the earlier lines of the same scheme letter, and a completed line
+    may only be followed by punctuation or a line break. Without a syllable
+    target, a line break is only allowed once the last word rhymes. Rhymes are
+    judged by spelling (see rhyme_ending) and syllables by vowel groups, both
+    estimates. All masks are tensor operations over the whole vocabulary; if a
+    sequence has no allowed token the rhyme and then all constraints are relaxed
+    for that step. Sequences must keep their rows between steps (sampling or
+    greedy, not beam search or assisted decoding).
+    """
+
+    def __init__(self, tokenizer, rhyme_scheme=None, syllables=None):
+        self.tables = vocabulary_tables(tokenizer)
+        self.rhyme_scheme = parse_rhyme_scheme(rhyme_scheme)
+        self.syllables = parse_syllables(syllables)
+        letters = sorted(set(self.rhyme_scheme or "X"))
+        # "X" lines never rhyme; other letters map to slots of the per-sequence rhyme class table
+        self._scheme = torch.tensor([letters.index(letter) if letter != "X" else -1
+                                     for letter in (self.rhyme_scheme or "X")], dtype=torch.long)
+        self._letters = len(letters)
+        self._targets = torch.tensor(self.syllables or [0], dtype=torch.int32)
+        self._length = None
+
+    def _start(self, input_ids):
+        batch, device = input_ids.shape[0], input_ids.device
+        self._scheme = self._scheme.to(device)
+        self._targets = self._targets.to(device)
+        self._length = input_ids.shape[1]
+        self.line = torch.zeros(batch, dtype=torch.long, device=device)
+        self.line_syllables = torch.zeros(batch, dtype=torch.int32, device=device)
+        self.last_class = torch.full((batch,), CONTINUATION, dtype=torch.int32, device=device)
+        self.rhyme_classes = torch.full((batch, self._letters), -1, dtype=torch.int32, device=device)
+
+    def _advance(self, tokens, tables):
+        """Update the line state with the token each sequence just generated"""
+        ended = tables["newline"][tokens]
+        slot = self._scheme[self.line % len(self._scheme)]
+        rhymed = slot >= 0
+        safe_slot = slot.clamp(min=0).unsqueeze(1)
+        current = self.rhyme_classes.gather(1, safe_slot).squeeze(1)
+        # The first line of a scheme letter sets the class the later ones must rhyme with
+        record = ended & rhymed & (current < 0)
+        self.rhyme_classes.scatter_(1, safe_slot, torch.where(record, self.last_class, current).unsqueeze(1))
+
+        token_class = tables["classes"][tokens]
+        self.last_class = torch.where(ended, torch.full_like(self.last_class, CONTINUATION),
+                                      torch.where(token_class == NO_LETTERS, self.last_class, token_class))
+        self.line_syllables = torch.where(ended, torch.zeros_like(self.line_syllables),
+                                          self.line_syllables + tables["syllables"][tokens])
+        self.line = self.line + ended.long()
+
+    def _allowed(self, tables, rhyme_target):
+        syllables = tables["syllables"].unsqueeze(0)
+        classes = tables["classes"].unsqueeze(0)
+        newline = tables["newline"].unsqueeze(0)
+        rhymes = (classes == rhyme_target.unsqueeze(1)) | (rhyme_target.unsqueeze(1) < 0)
+        if self.syllables is None:
+            line_rhymes = (rhyme_target < 0) | (self.last_class == rhyme_target)
+            return ~newline | line_rhymes.unsqueeze(1)
+
+        remaining = (self._targets[self.line % len(self._targets)] - self.line_syllables).unsqueeze(1)
+        finishing = (syllables == remaining) & (syllables > 0)
+        within_line = (syllables <= remaining) & ~newline & ~(finishing & ~((classes >= 0) & rhymes))
+        line_end = newline | tables["punctuation"].unsqueeze(0)
+        return torch.where(remaining <= 0, line_end, within_line)
+
+    def __call__(self, input_ids, scores):
+        tables = self.tables.on(scores.device, scores.shape[-1])
+        if self._length is None:
+            self._start(input_ids)
+        elif input_ids.shape[1] > self._length:
+            self._length = input_ids.shape[1]
+            self._advance(input_ids[:, -1], tables)
+
+        slot = self._scheme[self.line % len(self._scheme)]
+        rhyme_target = torch.where(slot >= 0, self.rhyme_classes.gather(1, slot.clamp(min=0).unsqueeze(1)).squeeze(1),
+                                   torch.full_like(self.last_class, -1))
+        allowed = self._allowed(tables, rhyme_target) & ~tables["blocked"].unsqueeze(0)
+        if self.tables.eos_token_id is not None and self.tables.eos_token_id < scores.shape[-1]:
+            allowed[:, self.tables.eos_token_id] = True
+
+        # Relax the rhyme, then everything, for sequences the constraints leave without a candidate
+        viable = (allowed & (scores > float("-inf"))).any(dim=1, keepdim=True)
+        if not bool(viable.all()):
+            relaxed = self._allowed(tables, torch.full_like(rhyme_target, -1)) & ~tables["blocked"].unsqueeze(0)
+            allowed = torch.where(viable, allowed, relaxed)
+            viable = (allowed & (scores > float("-inf"))).any(dim=1, keepdim=True)
+            allowed = torch.where(viable, allowed, torch.ones_like(allowed))
+        return scores.masked_fill(~allowed, float("-inf"))
+
+def constraint_processors(tokenizer, rhyme_scheme=None, syllables=None):
+    """Logits processors for the requested constraints (empty if none)"""
+    if parse_rhyme_scheme(rhyme_scheme) is None and parse_syllables(syllables) is None:
+        return []
+    return [RhymeConstraintProcessor(tokenizer, rhyme_scheme, syllables)]
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+def check_interval(interval):
+    """Validated sampling interval in seconds; zero or less would make the sampler spin"""
+    interval = float(interval)
+    if not interval > 0:
+        raise ValueError(f"interval must be a positive number of seconds, got {interval}")
+    return interval
+
+class SamplingProfiler:
+    """Low-overhead wall-clock profiler that samples every thread's stack.
+
+    A background thread wakes up every ``interval`` seconds and records the
+    current Python stack of every other thread. Results are returned in the
+    collapsed-stack format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = check_interval(interval)
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None):
+        """Start sampling (no-op if already running)"""
+        if interval is not None:
+            interval = check_interval(interval)
+        with self._lock:
+            if self.running:
+                return False
+            if interval is not None:
+                self.interval = interval
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling; collected samples are kept until reset()"""
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            thread = self._thread
+        thread.join()
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.samples = Counter()
+            self.sample_count = 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    self.samples[self._collapse(frame)] += 1
+                self.sample_count += 1
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def collapsed(self):
+        """Samples as 'frame;frame;frame count' lines, most frequent first"""
+        with self._lock:
+            items = self.samples.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in items) + "\n"
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval": self.interval,
+                "started_at": self.started_at,
+                "sample_count": self.sample_count,
+                "distinct_stacks": len(self.samples)
+            }
@@ -1,6 +1,5 @@
 from azlyrics_scraper import get_artist_songs, scrape_lyrics_by_url
 import os
-import time
 
 def ensure_directory(path):
     """Create directory if it doesn't exist"""
@@ -50,9 +49,6 @@ def scrape_artist(artist, genre, max_songs=10):
         file_path = save_lyrics_to_file(artist, song_title, lyrics, genre)
         print(f"  Saved to: {file_path}")
         songs_scraped += 1
-        
-        # Be nice to the server
-        time.sleep(3)
     
     print(f"Finished saving {songs_scraped} songs by {artist}.")
     return songs_scraped
@@ -1,9 +1,8 @@
-from azlyrics_scraper import scrape_lyrics_by_url
+from azlyrics_scraper import scrape_lyrics_by_url, AZLYRICS_BASE_URL
+from throttle import default_throttle
 import os
-import time
 import re
 from bs4 import BeautifulSoup
-import requests
 
 def ensure_directory(path):
     """Create directory if it doesn't exist"""
@@ -34,7 +33,7 @@ def get_songs_from_url(url):
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = default_throttle().fetch(url, headers=headers)
         if response.status_code != 200:
             return []
         
@@ -51,7 +50,7 @@ def get_songs_from_url(url):
                 for link in links:
                     if link.get('href') and '/lyrics/' in link.get('href'):
                         song_title = link.text.strip()
-                        song_url = 'https://www.azlyrics.com' + link.get('href')
+                        song_url = AZLYRICS_BASE_URL + link.get('href')
                         song_links.append((song_title, song_url))
         
         return song_links
@@ -85,9 +84,6 @@ def scrape_artist_from_url(url, artist_name, genre, max_songs=10):
         file_path = save_lyrics_to_file(artist_name, song_title, lyrics, genre)
         print(f"  Saved to: {file_path}")
         songs_scraped += 1
-        
-        # Be nice to the server
-        time.sleep(3)
     
     print(f"Finished saving {songs_scraped} songs by {artist_name}.")
     return songs_scraped
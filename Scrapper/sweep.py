@@ -0,0 +1,237 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+RESULT_FIELDS = ["trial", "learning_rate", "batch_size", "status", "steps", "val_loss", "best_val_loss",
+                 "seconds", "cpu_seconds"]
+
+def rung_steps(min_steps, max_steps, eta):
+    """Step budgets at which trials are compared: min_steps * eta^k, ending at max_steps"""
+    rungs = []
+    steps = min_steps
+    while steps < max_steps:
+        rungs.append(steps)
+        steps *= eta
+    rungs.append(max_steps)
+    return rungs
+
+def sample_trials(count, learning_rate_range, batch_sizes, seed):
+    """Random configurations: log-uniform learning rate, batch size from the given choices"""
+    rng = random.Random(seed)
+    low, high = (math.log(value) for value in learning_rate_range)
+    return [{"trial": index, "learning_rate": math.exp(rng.uniform(low, high)), "batch_size": rng.choice(batch_sizes)}
+            for index in range(count)]
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+class AsyncSuccessiveHalving:
+    """Asynchronous successive halving (ASHA) over validation loss at each rung.
+
+    A trial reaching a rung continues only if its loss is in the best 1/eta of
+    all losses recorded at that rung so far; trials are never held back waiting
+    for others, so every process slot stays busy.
+    """
+
+    def __init__(self, rungs, eta):
+        self.rungs = rungs
+        self.eta = eta
+        self.losses = {steps: [] for steps in rungs}
+
+    def report(self, steps, loss):
+        """Record a loss; returns whether the trial should keep training"""
+        recorded = self.losses.setdefault(steps, [])
+        recorded.append(loss)
+        if steps >= self.rungs[-1]:
+            return False
+        if len(recorded) < self.eta:
+            return True
+        cutoff = sorted(recorded)[math.ceil(len(recorded) / self.eta) - 1]
+        return loss <= cutoff
+
+def run_trial(trial, options, rungs, cores, log_path, conn):
+    """Train one configuration in this (spawned) process, reporting each rung's loss to the sweep"""
+    # Pin the process and its torch threads to its own cores before torch is imported
+    threads = str(len(cores))
+    os.environ.update({"OMP_NUM_THREADS": threads, "MKL_NUM_THREADS": threads, "TOKENIZERS_PARALLELISM": "false"})
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    log = open(log_path, 'w', encoding='utf-8', buffering=1)
+    sys.stdout = sys.stderr = log
+
+    import torch
+    from train_models import train_genre_model, set_seed
+    torch.set_num_threads(len(cores))
+    set_seed(options["seed"])
+
+    def on_eval(steps, loss):
+        conn.send(("report", steps, loss))
+        return conn.recv()
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        train_genre_model(
+            genre=options["genre"],
+            data_dir=options["data_dir"],
+            output_dir=options["output_dir"],
+            # Every trial runs until its step budget, however small the dataset
+            epochs=rungs[-1],
+            batch_size=trial["batch_size"],
+            learning_rate=trial["learning_rate"],
+            base_model=options["base_model"],
+            max_steps=rungs[-1],
+            record_cache_size=options["record_cache_size"],
+            seed=options["seed"],
+            eval_steps=set(rungs),
+            eval_batches=options["eval_batches"],
+            on_eval=on_eval,
+            save_model=False
+        )
+        conn.send(("done", time.perf_counter() - start, time.process_time() - cpu_start))
+    except Exception:
+        traceback.print_exc()
+        conn.send(("failed", time.perf_counter() - start, time.process_time() - cpu_start))
+    finally:
+        log.close()
+        conn.close()
+
+def run_sweep(genre, trials, options, rungs, eta, parallel, threads_per_trial, sweep_dir):
+    """Run the trials `parallel` at a time on disjoint cores; returns one result row per trial"""
+    os.makedirs(sweep_dir, exist_ok=True)
+    scheduler = AsyncSuccessiveHalving(rungs, eta)
+    cores = available_cores()
+    slots = [cores[slot * threads_per_trial:(slot + 1) * threads_per_trial] or cores for slot in range(parallel)]
+    free_slots = list(range(parallel))
+    pending = list(trials)
+    running = {}
+    results = {trial["trial"]: dict(trial, status="pending", steps=0, val_loss=None, best_val_loss=None,
+                                     seconds=None, cpu_seconds=None) for trial in trials}
+    context = multiprocessing.get_context("spawn")
+
+    with open(os.path.join(sweep_dir, "reports.jsonl"), 'w', encoding='utf-8') as reports:
+        while pending or running:
+            while pending and free_slots:
+                trial = pending.pop(0)
+                slot = free_slots.pop(0)
+                parent_conn, child_conn = context.Pipe()
+                log_path = os.path.join(sweep_dir, f"trial_{trial['trial']:03d}.log")
+                process = context.Process(target=run_trial,
+                                          args=(trial, dict(options, genre=genre), rungs, slots[slot], log_path, child_conn))
+                process.start()
+                child_conn.close()
+                running[parent_conn] = (trial["trial"], process, slot)
+                results[trial["trial"]]["status"] = "running"
+                print(f"Trial {trial['trial']}: learning_rate={trial['learning_rate']:.2e}, "
+                      f"batch_size={trial['batch_size']} on cores {slots[slot]}")
+
+            for conn in wait(list(running)):
+                trial_id, process, slot = running[conn]
+                result = results[trial_id]
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    message = ("failed", None, None)
+
+                if message[0] == "report":
+                    _, steps, loss = message
+                    keep_going = scheduler.report(steps, loss)
+                    result.update(steps=steps, val_loss=loss,
+                                  best_val_loss=min(loss, result["best_val_loss"] or float('inf')))
+                    if not keep_going and steps < rungs[-1]:
+                        result["status"] = "pruned"
+                    reports.write(json.dumps({"trial": trial_id, "steps": steps, "val_loss": loss,
+                                              "continue": keep_going}) + "\n")
+                    reports.flush()
+                    print(f"Trial {trial_id} step {steps}: val loss {loss:.4f}" +
+                          ("" if keep_going or steps >= rungs[-1] else " -> pruned"))
+                    conn.send(keep_going)
+                    continue
+
+                _, seconds, cpu_seconds = message
+                if message[0] == "failed":
+                    result["status"] = "failed"
+                    print(f"Trial {trial_id} failed, see {os.path.join(sweep_dir, f'trial_{trial_id:03d}.log')}")
+                elif result["status"] == "running":
+                    result["status"] = "completed"
+                result.update(seconds=seconds, cpu_seconds=cpu_seconds)
+                process.join()
+                conn.close()
+                del running[conn]
+                free_slots.append(slot)
+
+    rows = sorted(results.values(), key=lambda row: (row["status"] != "completed", -row["steps"],
+                                                     row["val_loss"] if row["val_loss"] is not None else float('inf')))
+    with open(os.path.join(sweep_dir, "trials.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for train_models.py with successive-halving pruning")
+    parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
+    parser.add_argument("--output_dir", type=str, default="sweeps", help="Directory for trial logs and results tables")
+    parser.add_argument("--genre", type=str, nargs="+", required=True, help="Genres to tune (one sweep per genre)")
+    parser.add_argument("--base_model", type=str, default="gpt2", help="Pretrained model name or directory to fine-tune from")
+    parser.add_argument("--trials", type=int, default=27, help="Configurations to try per genre")
+    parser.add_argument("--learning_rate_range", type=float, nargs=2, default=[1e-5, 3e-4], help="Log-uniform learning rate range")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[2, 4, 8], help="Batch sizes to choose from")
+    parser.add_argument("--min_steps", type=int, default=50, help="Steps before the first pruning decision")
+    parser.add_argument("--max_steps", type=int, default=1350, help="Steps for trials that are never pruned")
+    parser.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta of trials at each rung")
+    parser.add_argument("--eval_batches", type=int, default=20, help="Validation batches per rung (0 = whole validation set)")
+    parser.add_argument("--parallel", type=int, help="Trials running at once (default: cores / threads_per_trial)")
+    parser.add_argument("--threads_per_trial", type=int, default=2, help="Cores pinned to each trial")
+    parser.add_argument("--record_cache_size", type=int, default=0, help="Decoded song records each trial keeps in memory")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for sampling configurations and for training")
+
+    args = parser.parse_args()
+
+    rungs = rung_steps(args.min_steps, args.max_steps, args.eta)
+    parallel = args.parallel or max(1, len(available_cores()) // args.threads_per_trial)
+    options = {
+        "data_dir": args.data_dir,
+        "output_dir": args.output_dir,
+        "base_model": args.base_model,
+        "eval_batches": args.eval_batches or None,
+        "record_cache_size": args.record_cache_size,
+        "seed": args.seed
+    }
+
+    for genre in args.genre:
+        print(f"Sweeping {args.trials} trials for {genre}: rungs at {rungs} steps, {parallel} at a time "
+              f"with {args.threads_per_trial} threads each")
+        trials = sample_trials(args.trials, args.learning_rate_range, args.batch_sizes, args.seed)
+        sweep_dir = os.path.join(args.output_dir, genre)
+        start = time.perf_counter()
+        rows = run_sweep(genre, trials, options, rungs, args.eta, parallel, args.threads_per_trial, sweep_dir)
+
+        print(f"\n{'trial':>5} {'lr':>9} {'batch':>5} {'status':>9} {'steps':>6} {'val_loss':>9} {'cpu_s':>8}")
+        for row in rows:
+            val_loss = f"{row['val_loss']:.4f}" if row["val_loss"] is not None else "-"
+            cpu_seconds = f"{row['cpu_seconds']:.0f}" if row["cpu_seconds"] is not None else "-"
+            print(f"{row['trial']:>5} {row['learning_rate']:>9.2e} {row['batch_size']:>5} {row['status']:>9} "
+                  f"{row['steps']:>6} {val_loss:>9} {cpu_seconds:>8}")
+
+        trained_steps = sum(row["steps"] for row in rows)
+        print(f"\n{genre}: {trained_steps} trial steps instead of {args.trials * args.max_steps} without pruning "
+              f"({trained_steps / (args.trials * args.max_steps):.0%}), {time.perf_counter() - start:.0f}s wall clock")
+        best = rows[0]
+        if best["status"] == "completed":
+            print(f"Best: python train_models.py --genre {genre} --learning_rate {best['learning_rate']:.2e} "
+                  f"--batch_size {best['batch_size']} --max_steps {args.max_steps}")
+        print(f"Results saved to {os.path.join(sweep_dir, 'trials.csv')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import threading
+import pytest
+from admission import AdmissionController, Overloaded
+
+@pytest.fixture
+def make_controller():
+    controllers = []
+
+    def make(**options):
+        controller = AdmissionController(**options)
+        controllers.append(controller)
+        return controller
+
+    yield make
+    for controller in controllers:
+        controller.shutdown()
+
+def hold_slot(controller, client="holder", cost=10):
+    """Reserve a slot and return its ticket, so further work has to queue"""
+    return controller.reserve(client, "holder", cost).result(timeout=1)
+
+def test_free_slots_go_to_the_client_with_the_least_queued_work(make_controller):
+    controller = make_controller(slots=1, max_queue=8, initial_rate=1000)
+    ticket = hold_slot(controller)
+    order = []
+    done = threading.Event()
+
+    def record(name):
+        order.append(name)
+        if len(order) == 4:
+            done.set()
+
+    for name in ("heavy-1", "heavy-2", "heavy-3"):
+        controller.submit("heavy", "pop", 10, record, {"name": name})
+    controller.submit("light", "rock", 10, record, {"name": "light-1"})
+    assert controller.stats()["queued"] == 4
+
+    controller.release(ticket)
+    assert done.wait(timeout=5)
+    # The light client's only request starts alongside the heavy client's first, not after all three
+    assert order == ["heavy-1", "light-1", "heavy-2", "heavy-3"]
+
+def test_predicted_wait_beyond_the_queue_timeout_is_rejected_with_retry_after(make_controller):
+    controller = make_controller(slots=1, max_queue=8, queue_timeout=2.0, initial_rate=50)
+    hold_slot(controller, client="client", cost=100)
+    # 100 running tokens are half done on average: a 1s predicted wait is admitted
+    controller.submit("client", "pop", 100, lambda: None, {})
+
+    with pytest.raises(Overloaded) as error:
+        controller.submit("client", "pop", 100, lambda: None, {})
+    assert error.value.reason == "predicted_wait"
+    # (100 queued + 100 requested tokens) / 50 tokens per second
+    assert error.value.retry_after == 4
+    assert controller.stats()["queued"] == 1
+
+def test_full_queue_displaces_the_heaviest_clients_newest_work(make_controller):
+    controller = make_controller(slots=1, max_queue=2, initial_rate=1000)
+    hold_slot(controller)
+    first = controller.submit("heavy", "pop", 10, lambda: "first", {})
+    newest = controller.submit("heavy", "pop", 10, lambda: "newest", {})
+
+    controller.submit("light", "pop", 10, lambda: "light", {})
+    with pytest.raises(Overloaded) as error:
+        newest.result(timeout=1)
+    assert error.value.reason == "displaced"
+    assert not first.done()
+
+    # Now both clients have one queued generation, so the heavy client cannot push anyone out
+    with pytest.raises(Overloaded) as error:
+        controller.submit("heavy", "pop", 10, lambda: None, {})
+    assert error.value.reason == "queue_full"
+    assert error.value.retry_after >= 1
+
+def test_work_still_queued_after_the_timeout_is_shed(make_controller):
+    controller = make_controller(slots=1, max_queue=8, queue_timeout=0.1, initial_rate=1000)
+    hold_slot(controller)
+    future = controller.submit("client", "pop", 10, lambda: "late", {})
+
+    with pytest.raises(Overloaded) as error:
+        controller.result(future)
+    assert error.value.reason == "queue_timeout"
+    assert controller.stats()["queued"] == 0
+
+def test_releasing_a_reservation_twice_frees_one_slot(make_controller):
+    controller = make_controller(slots=1, max_queue=8, initial_rate=1000)
+    ticket = hold_slot(controller)
+    waiting = controller.reserve("other", "pop", 10)
+    assert not waiting.done()
+
+    controller.release(ticket)
+    controller.release(ticket)
+    second = waiting.result(timeout=1)
+    assert controller.stats()["running"] == 1
+
+    controller.release(second)
+    assert controller.stats()["running"] == 0
+
+def test_submit_all_admits_every_job_or_none(make_controller):
+    controller = make_controller(slots=1, max_queue=2, initial_rate=1000)
+    hold_slot(controller)
+    jobs = [(genre, 10, lambda: None, {}) for genre in ("pop", "rock", "jazz")]
+
+    with pytest.raises(Overloaded) as error:
+        controller.submit_all("client", jobs)
+    assert error.value.reason == "queue_full"
+    assert controller.stats()["queued"] == 0
+    assert controller.stats()["queued_tokens"] == 0
+
+    futures = controller.submit_all("client", jobs[:2])
+    assert len(futures) == 2
+    assert controller.stats()["queued"] == 2
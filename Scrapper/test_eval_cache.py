@@ -0,0 +1,76 @@
+import json
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+import eval_cache
+from eval_cache import EvaluationCache, evaluation_key
+
+SETTINGS = {"batch_size": 4, "max_length": 512}
+
+@pytest.fixture
+def dirs(tmp_path):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "model.safetensors").write_bytes(b"weights")
+    (model_dir / "config.json").write_text('{"n_layer": 1}')
+    (model_dir / "vocab.json").write_text('{"a": 0}')
+    test_dir = tmp_path / "test"
+    test_dir.mkdir()
+    (test_dir / "song.json").write_text('{"lyrics": "la la"}')
+    return model_dir, test_dir
+
+def key(dirs, settings=SETTINGS, **kwargs):
+    model_dir, test_dir = dirs
+    return evaluation_key(str(model_dir), str(test_dir), settings, **kwargs)
+
+def test_key_is_stable_while_nothing_changes(dirs):
+    assert key(dirs) == key(dirs)
+
+def test_key_changes_with_model_tokenizer_test_set_and_settings(dirs):
+    model_dir, test_dir = dirs
+    original = key(dirs)
+    assert key(dirs, {**SETTINGS, "batch_size": 8}) != original
+
+    (model_dir / "model.safetensors").write_bytes(b"retrained weights")
+    retrained = key(dirs)
+    assert retrained != original
+
+    (model_dir / "vocab.json").write_text('{"a": 0, "b": 1}')
+    retokenized = key(dirs)
+    assert retokenized != retrained
+
+    (test_dir / "song.json").write_text('{"lyrics": "la la la"}')
+    assert key(dirs) != retokenized
+
+def test_key_follows_the_memorization_index(dirs, tmp_path):
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    (index_dir / "tokens.npy").write_bytes(b"one")
+    with_index = key(dirs, index_dir=str(index_dir))
+    assert with_index != key(dirs)
+
+    (index_dir / "tokens.npy").write_bytes(b"rebuilt")
+    assert key(dirs, index_dir=str(index_dir)) != with_index
+
+def test_test_set_manifest_includes_a_shared_shard_dictionary(tmp_path):
+    test_dir = tmp_path / "test" / "pop"
+    test_dir.mkdir(parents=True)
+    (test_dir / eval_cache.SHARD_INDEX).write_text(json.dumps({"dictionary": "../dictionary.zdict", "records": []}))
+    dictionary = tmp_path / "test" / "dictionary.zdict"
+    dictionary.write_bytes(b"dictionary")
+    manifest = eval_cache.test_set_manifest(str(test_dir))
+
+    dictionary.write_bytes(b"retrained dictionary")
+    assert eval_cache.test_set_manifest(str(test_dir)) != manifest
+
+def test_cache_round_trip_and_counters(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    assert cache.get("abc") is None
+    cache.put("abc", {"perplexity": 12.5})
+    assert cache.get("abc") == {"perplexity": 12.5}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert (tmp_path / "cache" / "file_hashes.json").exists()
+
+    (tmp_path / "cache" / "broken.json").write_text("{")
+    assert cache.get("broken") is None
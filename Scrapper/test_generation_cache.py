@@ -0,0 +1,46 @@
+from generation_cache import GenerationCache, generation_key
+
+PARAMS = {"max_length": 100, "temperature": 1.0, "top_k": 50, "top_p": 0.95}
+
+def test_generation_key_changes_with_every_input():
+    key = generation_key("model-a", "hello", PARAMS, 7)
+    assert generation_key("model-a", "hello", dict(reversed(list(PARAMS.items()))), 7) == key
+    assert generation_key("model-b", "hello", PARAMS, 7) != key
+    assert generation_key("model-a", "hello!", PARAMS, 7) != key
+    assert generation_key("model-a", "hello", {**PARAMS, "temperature": 0.9}, 7) != key
+    assert generation_key("model-a", "hello", PARAMS, 8) != key
+
+def test_memory_tier_evicts_the_least_recently_used_entry():
+    cache = GenerationCache(max_entries=2)
+    cache.put("a", "text a")
+    cache.put("b", "text b")
+    assert cache.get("a") == "text a"
+    cache.put("c", "text c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "text a"
+    assert cache.get("c") == "text c"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+
+def test_disk_tier_serves_entries_evicted_from_memory_and_across_instances(tmp_path):
+    cache = GenerationCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put("aa11", "first")
+    cache.put("bb22", "second")
+    assert cache.get("aa11") == "first"
+    assert cache.stats()["disk_hits"] == 1
+
+    reopened = GenerationCache(max_entries=1, disk_dir=str(tmp_path))
+    assert reopened.get("bb22") == "second"
+    assert reopened.get("cc33") is None
+
+def test_corrupt_disk_entries_are_misses(tmp_path):
+    cache = GenerationCache(disk_dir=str(tmp_path))
+    path = tmp_path / "dd" / "dd44.json"
+    path.parent.mkdir()
+    path.write_text("{not json")
+    assert cache.get("dd44") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,62 @@
+import json
+import random
+import pytest
+
+pytest.importorskip("zstandard")
+from lyrics_store import (SHARD_DICTIONARY, SHARD_INDEX, ShardReader, encode_record, is_shard, pack_directory,
+                          shared_dictionary_path, train_dictionary, write_shard)
+from lyrics_records import LyricsRecords
+
+WORDS = "love night heart fire dance baby tonight forever dream rain road city light home".split()
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    return [(f"song_{i}.json", {
+        "lyrics": "\n".join(" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(12)),
+        "metadata": {"title": f"Song {i}", "artist": rng.choice(["Ava", "Ben", "Zoë"]), "genre": "pop"}
+    }) for i in range(count)]
+
+def test_shard_round_trip_with_random_access(tmp_path):
+    records = make_records(20)
+    write_shard(str(tmp_path), records)
+    assert is_shard(str(tmp_path))
+
+    reader = ShardReader(str(tmp_path))
+    assert reader.names == [name for name, _ in records]
+    for idx in (13, 0, 19, 7):
+        assert reader.read(idx) == records[idx][1]
+
+def test_empty_shard_can_be_opened(tmp_path):
+    write_shard(str(tmp_path), [])
+    assert len(ShardReader(str(tmp_path))) == 0
+
+def test_split_shards_share_the_train_dictionary(tmp_path):
+    train_dir = tmp_path / "train" / "pop"
+    val_dir = tmp_path / "val" / "pop"
+    train_records = make_records(300)
+    val_records = make_records(10, seed=1)
+    dictionary = train_dictionary([encode_record(data) for _, data in train_records], 8192)
+    assert dictionary is not None
+
+    write_shard(str(train_dir), train_records, dictionary)
+    shared = shared_dictionary_path(str(val_dir), str(train_dir))
+    assert shared == f"../../train/pop/{SHARD_DICTIONARY}"
+    write_shard(str(val_dir), val_records, dictionary, shared_dictionary=shared)
+
+    assert not (val_dir / SHARD_DICTIONARY).exists()
+    assert json.loads((val_dir / SHARD_INDEX).read_text())["dictionary"] == shared
+    assert list(LyricsRecords(str(val_dir))) == [data for _, data in val_records]
+
+def test_pack_directory_replaces_json_files_transparently(tmp_path):
+    records = make_records(5)
+    for name, data in records:
+        (tmp_path / name).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    expected = {name: data for name, data in records}
+
+    raw_bytes, size = pack_directory(str(tmp_path), remove=True)
+    assert 0 < size < raw_bytes
+    assert not any((tmp_path / name).exists() for name in expected)
+
+    packed = LyricsRecords(str(tmp_path), cache_size=2)
+    assert {name: packed[idx] for idx, name in enumerate(packed.filenames)} == expected
+    assert packed.path(3).endswith("records.zst#3")
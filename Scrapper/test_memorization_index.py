@@ -0,0 +1,47 @@
+import json
+import pytest
+
+pytest.importorskip("numpy")
+from memorization_index import MemorizationChecker, build_index, tokenize
+
+SONGS = {
+    "first.json": ("City Lights", "Ava", "the city lights are calling me home tonight under a silver moon"),
+    "second.json": ("Open Road", "Ben", "we drive along the open road with nothing left to lose but time"),
+}
+
+@pytest.fixture
+def checker(tmp_path):
+    train_dir = tmp_path / "data" / "train" / "pop"
+    train_dir.mkdir(parents=True)
+    for name, (title, artist, lyrics) in SONGS.items():
+        (train_dir / name).write_text(json.dumps({"lyrics": lyrics, "metadata": {"title": title, "artist": artist}}))
+    build_index(str(tmp_path / "data"), "pop", str(tmp_path / "index"), n=4)
+    return MemorizationChecker(str(tmp_path / "index"))
+
+def test_tokenize_ignores_case_and_punctuation():
+    assert tokenize("Don't STOP,\nbelievin'!") == ["don't", "stop", "believin'"]
+
+def test_verbatim_copy_reports_the_longest_overlap_and_its_source(checker):
+    report = checker.check("pop", "Oh, The City Lights are calling me HOME... and then something new")
+    assert report["longest_overlap"] == 7
+    assert report["overlap_text"] == "the city lights are calling me home"
+    assert report["source"] == {"title": "City Lights", "artist": "Ava", "file": "first.json"}
+    assert report["covered_fraction"] == pytest.approx(7 / 12)
+
+def test_original_text_has_no_overlap(checker):
+    report = checker.check("pop", "a completely different verse about rain falling on the quiet sea")
+    assert report["longest_overlap"] == 0
+    assert report["source"] is None
+    assert report["covered_fraction"] == 0.0
+
+def test_overlaps_shorter_than_the_ngram_are_not_reported(checker):
+    assert checker.check("pop", "city lights are")["longest_overlap"] == 0
+    assert checker.check("pop", "the city lights")["longest_overlap"] == 0
+
+def test_words_spanning_two_songs_do_not_count_as_a_copy(checker):
+    # The end of the first song followed by the start of the second was never a single passage
+    assert checker.check("pop", "silver moon we drive along")["longest_overlap"] == 0
+    assert checker.check("pop", "lose but time the city lights")["longest_overlap"] == 0
+
+def test_genre_without_an_index_is_not_checked(checker):
+    assert checker.check("rock", "the city lights are calling me home") is None
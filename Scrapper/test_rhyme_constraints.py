@@ -0,0 +1,92 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+from rhyme_constraints import (RhymeConstraintProcessor, constraint_processors, count_syllables, parse_rhyme_scheme,
+                               parse_syllables, rhyme_ending)
+
+VOCAB = [" the", " night", " light", " time", " go", "ing", ",", "\n", "a\nb", "<eos>"]
+
+class FakeTokenizer:
+    """One decoded string per token id, enough for the vocabulary tables"""
+
+    eos_token_id = len(VOCAB) - 1
+
+    def __len__(self):
+        return len(VOCAB)
+
+    def batch_decode(self, sequences):
+        return ["".join(VOCAB[token_id] for token_id in sequence) for sequence in sequences]
+
+TOKENIZER = FakeTokenizer()
+
+def allowed_after(processor, tokens, scores=None):
+    """Tokens the processor leaves sampleable after the sequence `tokens`"""
+    input_ids = torch.tensor([[VOCAB.index(token) for token in tokens]])
+    if scores is None:
+        scores = torch.zeros(1, len(VOCAB))
+    masked = processor(input_ids, scores)
+    return {VOCAB[token_id] for token_id in torch.nonzero(masked[0] > float("-inf")).flatten().tolist()}
+
+def test_syllable_and_rhyme_estimates():
+    assert [count_syllables(word) for word in ("time", "love", "free", "little", "tonight")] == [1, 1, 1, 2, 2]
+    assert count_syllables("ing", whole_word=False) == 1
+    assert rhyme_ending("night") == rhyme_ending("light") == "ight"
+    assert rhyme_ending("time") == "ime"
+
+def test_parse_syllables_and_rhyme_scheme():
+    assert parse_syllables("8, 6") == [8, 6]
+    assert parse_syllables(7) == [7]
+    assert parse_syllables(None) is None
+    for value in (0, "8,x", 100):
+        with pytest.raises(ValueError):
+            parse_syllables(value)
+
+    assert parse_rhyme_scheme(" aabb ") == "AABB"
+    assert parse_rhyme_scheme("") is None
+    for value in ("A1", "AB-AB", "A" * 17):
+        with pytest.raises(ValueError):
+            parse_rhyme_scheme(value)
+
+def test_no_constraints_means_no_processors():
+    assert constraint_processors(TOKENIZER) == []
+    assert len(constraint_processors(TOKENIZER, rhyme_scheme="AABB")) == 1
+
+def test_a_line_may_only_end_on_a_word_rhyming_with_its_scheme_partner():
+    processor = RhymeConstraintProcessor(TOKENIZER, rhyme_scheme="AA")
+    assert "\n" in allowed_after(processor, [" the"])
+    assert "\n" in allowed_after(processor, [" the", " night"])
+    # The second A line has to rhyme with "night"
+    assert "\n" not in allowed_after(processor, [" the", " night", "\n"])
+    assert "\n" not in allowed_after(processor, [" the", " night", "\n", " time"])
+    assert "\n" in allowed_after(processor, [" the", " night", "\n", " time", " light"])
+    # Punctuation does not change the line's last word
+    assert "\n" in allowed_after(processor, [" the", " night", "\n", " time", " light", ","])
+
+def test_lines_stop_at_their_syllable_count_on_a_whole_word():
+    processor = RhymeConstraintProcessor(TOKENIZER, syllables="2")
+    allowed = allowed_after(processor, [" the"])
+    assert {" night", " go", "ing", ","} <= allowed
+    assert "\n" not in allowed
+
+    # One syllable left: a word piece cannot finish the line, and the line cannot end yet
+    allowed = allowed_after(processor, [" the", " night"])
+    assert " go" in allowed
+    assert "ing" not in allowed and "\n" not in allowed
+
+    assert allowed_after(processor, [" the", " night", " go"]) == {"\n", ",", "<eos>"}
+
+def test_tokens_mixing_line_breaks_and_letters_are_never_allowed():
+    processor = RhymeConstraintProcessor(TOKENIZER, rhyme_scheme="AB", syllables="4")
+    assert "a\nb" not in allowed_after(processor, [" the"])
+    assert "<eos>" in allowed_after(processor, [" the"])
+
+def test_constraints_are_relaxed_when_no_allowed_token_is_left():
+    processor = RhymeConstraintProcessor(TOKENIZER, rhyme_scheme="AA")
+    allowed_after(processor, [" the"])
+    allowed_after(processor, [" the", " night"])
+    allowed_after(processor, [" the", " night", "\n"])
+    # The model leaves only a line break, although " time" does not rhyme with "night"
+    scores = torch.full((1, len(VOCAB)), float("-inf"))
+    scores[0, VOCAB.index("\n")] = 0.0
+    assert "\n" in allowed_after(processor, [" the", " night", "\n", " time"], scores)
@@ -0,0 +1,35 @@
+from sweep import AsyncSuccessiveHalving, rung_steps, sample_trials
+
+def test_rungs_grow_by_eta_and_end_at_the_budget():
+    assert rung_steps(10, 100, 3) == [10, 30, 90, 100]
+    assert rung_steps(10, 90, 3) == [10, 30, 90]
+    assert rung_steps(50, 50, 3) == [50]
+
+def test_sampled_trials_are_reproducible_and_in_range():
+    trials = sample_trials(20, (1e-5, 1e-3), [2, 4], seed=1)
+    assert trials == sample_trials(20, (1e-5, 1e-3), [2, 4], seed=1)
+    assert [trial["trial"] for trial in trials] == list(range(20))
+    assert all(1e-5 <= trial["learning_rate"] <= 1e-3 for trial in trials)
+    assert {trial["batch_size"] for trial in trials} <= {2, 4}
+
+def test_trials_continue_until_a_rung_has_eta_losses():
+    scheduler = AsyncSuccessiveHalving([10, 30, 90], eta=3)
+    # Nothing to compare against yet, so nobody waits for the other trials
+    assert scheduler.report(10, 5.0)
+    assert scheduler.report(10, 9.0)
+
+def test_only_the_best_third_of_a_rung_is_promoted():
+    scheduler = AsyncSuccessiveHalving([10, 30, 90], eta=3)
+    scheduler.report(10, 2.0)
+    scheduler.report(10, 3.0)
+    assert scheduler.report(10, 1.0)
+    # From four to six losses recorded, only the best two are promoted
+    assert not scheduler.report(10, 2.5)
+    assert scheduler.report(10, 1.5)
+    assert not scheduler.report(10, 2.0)
+    # Rungs are judged separately
+    assert scheduler.report(30, 4.0)
+
+def test_trials_stop_at_the_last_rung():
+    scheduler = AsyncSuccessiveHalving([10, 30], eta=3)
+    assert not scheduler.report(30, 0.1)
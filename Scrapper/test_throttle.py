@@ -0,0 +1,67 @@
+import pytest
+from throttle import AIMDThrottle, BlockedError, detect_block
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="<html>lyrics</html>", url="https://www.azlyrics.com/lyrics/a/b.html",
+                 headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+        self.headers = headers or {}
+
+def test_detect_block_recognizes_block_status_captcha_and_block_pages():
+    assert detect_block(FakeResponse(429)) == "rate limited"
+    assert detect_block(FakeResponse(403)) == "forbidden"
+    assert detect_block(FakeResponse(url="https://www.azlyrics.com/captcha/?r=1")) == "captcha redirect"
+    assert detect_block(FakeResponse(text="<p>Please verify you are human</p>")) == "block page (verify you are human)"
+
+def test_detect_block_ignores_normal_pages_and_missing_pages():
+    assert detect_block(FakeResponse()) is None
+    assert detect_block(FakeResponse(404, text="not a robot")) is None
+    assert detect_block(FakeResponse(500)) is None
+
+def test_healthy_responses_raise_the_rate_additively_up_to_the_maximum():
+    throttle = AIMDThrottle(initial_rate=1.0, max_rate=1.1, increase=0.05)
+    assert throttle.record(0.2, FakeResponse()) == ("ok", None)
+    assert throttle.rate == pytest.approx(1.05)
+    throttle.record(0.2, FakeResponse())
+    throttle.record(0.2, FakeResponse())
+    assert throttle.rate == pytest.approx(1.1)
+
+def test_errors_and_server_failures_halve_the_rate_down_to_the_minimum():
+    throttle = AIMDThrottle(initial_rate=1.0, min_rate=0.3, decrease=0.5)
+    assert throttle.record(0.2, FakeResponse(503))[0] == "error"
+    assert throttle.rate == pytest.approx(0.5)
+    assert throttle.record(30.0, error=TimeoutError())[0] == "error"
+    assert throttle.rate == pytest.approx(0.3)
+
+def test_latency_spikes_back_off_without_raising_the_average():
+    throttle = AIMDThrottle(initial_rate=1.0, latency_factor=3.0, latency_floor=0.5)
+    throttle.record(0.5, FakeResponse())
+    rate = throttle.rate
+    assert throttle.record(2.0, FakeResponse())[0] == "slow"
+    assert throttle.rate == pytest.approx(rate / 2)
+    assert throttle.average_latency == pytest.approx(0.5)
+
+def test_blocks_pause_requests_with_a_doubling_cooldown_and_honor_retry_after():
+    throttle = AIMDThrottle(initial_rate=1.0, block_cooldown=10, max_cooldown=100)
+    assert throttle.record(0.2, FakeResponse(429)) == ("blocked", "rate limited")
+    throttle.record(0.2, FakeResponse(403))
+    throttle.record(0.2, FakeResponse(429, headers={"Retry-After": "300"}))
+    assert [event["pause"] for event in throttle.block_events] == [10, 20, 300]
+    assert throttle.status()["blocked_for"] > 250
+    assert throttle.status()["requests"] == {"blocked": 3}
+
+    # A healthy response resets the cooldown doubling
+    throttle.record(0.2, FakeResponse())
+    throttle.record(0.2, FakeResponse(429))
+    assert throttle.block_events[-1]["pause"] == 10
+
+def test_fetch_raises_blocked_error_for_block_pages(monkeypatch):
+    throttle = AIMDThrottle(enabled=False)
+    monkeypatch.setattr("throttle.requests.get", lambda url, **kwargs: FakeResponse(text="Are you a robot?", url=url))
+    with pytest.raises(BlockedError):
+        throttle.fetch("https://www.azlyrics.com/lyrics/a/b.html")
+
+    monkeypatch.setattr("throttle.requests.get", lambda url, **kwargs: FakeResponse(url=url))
+    assert throttle.fetch("https://www.azlyrics.com/lyrics/a/b.html").status_code == 200
@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+from collections import deque
+import requests
+from metrics import registry
+
+# Phrases of captcha / bot-check pages served with status 200 instead of the requested page
+BLOCK_MARKERS = (
+    "unusual activity from your ip",
+    "not a robot",
+    "are you a robot",
+    "verify you are human",
+    "cf-browser-verification",
+    "cf-challenge",
+)
+# Status codes that mean "slow down" rather than "this page does not exist"
+BLOCK_STATUS = {403: "forbidden", 429: "rate limited"}
+
+REQUEST_RATE = registry.gauge(
+    "azlyrics_request_rate", "Current AIMD request rate limit (requests/sec)")
+FETCHES = registry.counter(
+    "azlyrics_fetches_total", "AZLyrics requests by outcome", ("outcome",))
+BLOCK_EVENTS = registry.counter(
+    "azlyrics_block_events_total", "Block or captcha responses", ("reason",))
+FETCH_SECONDS = registry.histogram(
+    "azlyrics_fetch_seconds", "AZLyrics response time")
+
+class BlockedError(requests.RequestException):
+    """The server answered with a block or captcha page instead of the requested page"""
+
+def detect_block(response):
+    """Reason the response is a block page, or None"""
+    if response.status_code in BLOCK_STATUS:
+        return BLOCK_STATUS[response.status_code]
+    if "captcha" in response.url.lower():
+        return "captcha redirect"
+    if response.status_code == 200:
+        text = response.text[:20000].lower()
+        for marker in BLOCK_MARKERS:
+            if marker in text:
+                return f"block page ({marker})"
+    return None
+
+class AIMDThrottle:
+    """Request pacing that follows what the server tolerates.
+
+    Every healthy response raises the rate by ``increase`` requests/sec up to
+    ``max_rate``; server errors, timeouts and latency spikes (``latency_factor``
+    times the running average) multiply it by ``decrease``. Block pages also
+    pause all requests for ``block_cooldown`` seconds, doubling on repeated
+    blocks, or for the server's Retry-After if that is longer.
+    """
+
+    def __init__(self, initial_rate=0.5, min_rate=0.02, max_rate=4.0, increase=0.05, decrease=0.5,
+                 latency_factor=3.0, latency_floor=1.0, block_cooldown=60, max_cooldown=900, enabled=True):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.latency_floor = latency_floor
+        self.block_cooldown = block_cooldown
+        self.max_cooldown = max_cooldown
+        self.enabled = enabled
+        self.average_latency = None
+        self.consecutive_blocks = 0
+        self.counts = {}
+        self.block_events = deque(maxlen=100)
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        REQUEST_RATE.set(self.rate)
+
+    def wait(self):
+        """Sleep until this caller's request slot"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _count(self, outcome):
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        FETCHES.inc(outcome=outcome)
+
+    def _back_off(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def record(self, latency, response=None, error=None):
+        """Adjust the rate for one finished request; returns the outcome and block reason"""
+        reason = detect_block(response) if response is not None else None
+        with self._lock:
+            if reason:
+                outcome = "blocked"
+                self._back_off()
+                self.consecutive_blocks += 1
+                pause = min(self.max_cooldown, self.block_cooldown * 2 ** (self.consecutive_blocks - 1))
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    pause = max(pause, int(retry_after))
+                self._blocked_until = time.monotonic() + pause
+                self.block_events.append({"time": time.time(), "url": response.url, "reason": reason,
+                                          "pause": pause, "rate": self.rate})
+                BLOCK_EVENTS.inc(reason=reason)
+            elif error is not None or response.status_code >= 500:
+                outcome = "error"
+                self._back_off()
+            elif (self.average_latency is not None and
+                  latency > max(self.latency_floor, self.latency_factor * self.average_latency)):
+                outcome = "slow"
+                self._back_off()
+            else:
+                outcome = "ok"
+                self.consecutive_blocks = 0
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+            if error is None and outcome != "slow":
+                # Spikes stay out of the average so one slow page does not raise the bar
+                self.average_latency = latency if self.average_latency is None else \
+                    0.8 * self.average_latency + 0.2 * latency
+            self._count(outcome)
+            REQUEST_RATE.set(self.rate)
+        FETCH_SECONDS.observe(latency)
+        if reason:
+            print(f"Blocked by server ({reason}), pausing requests; rate now {self.rate:.2f}/s")
+        return outcome, reason
+
+    def fetch(self, url, wait=True, **kwargs):
+        """Paced requests.get; raises BlockedError instead of returning a block page"""
+        if wait:
+            self.wait()
+        kwargs.setdefault("timeout", 30)
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, **kwargs)
+        except requests.RequestException as e:
+            self.record(time.perf_counter() - start, error=e)
+            raise
+        _, reason = self.record(time.perf_counter() - start, response)
+        if reason:
+            raise BlockedError(f"Blocked by server: {reason}", response=response)
+        return response
+
+    def status(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "average_latency": self.average_latency,
+                "requests": dict(self.counts),
+                "blocked_for": max(0.0, self._blocked_until - time.monotonic()),
+                "block_events": list(self.block_events)
+            }
+
+_default_throttle = None
+_default_lock = threading.Lock()
+
+def default_throttle():
+    """Throttle shared by every AZLyrics request in the process, configured from the environment"""
+    global _default_throttle
+    with _default_lock:
+        if _default_throttle is None:
+            _default_throttle = AIMDThrottle(
+                initial_rate=float(os.environ.get("AZLYRICS_INITIAL_RATE", 0.5)),
+                max_rate=float(os.environ.get("AZLYRICS_MAX_RATE", 4.0)),
+                enabled=os.environ.get("AZLYRICS_THROTTLE", "1") != "0")
+        return _default_throttle
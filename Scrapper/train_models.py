@@ -1,13 +1,21 @@
 import os
-import json
 import argparse
 import torch
+import torch.nn.functional as F
 from torch.utils.data import Dataset, DataLoader
+from torch.utils.data.distributed import DistributedSampler
+from torch.nn.parallel import DistributedDataParallel
 from transformers import GPT2Tokenizer, GPT2LMHeadModel, GPT2Config
-from transformers import AdamW, get_linear_schedule_with_warmup
+from transformers import get_linear_schedule_with_warmup
+from torch.optim import AdamW
 from tqdm import tqdm
 import numpy as np
 import random
+import time
+from training_telemetry import TrainingTelemetry
+from lyrics_records import LyricsRecords, format_training_text
+from dataloader_options import add_dataloader_args, dataloader_kwargs_from_args
+from distributed_training import init_distributed, main_process_first, all_reduce_sum, all_reduce_mean, cleanup
 
 # Set random seeds for reproducibility
 def set_seed(seed):
@@ -18,27 +26,19 @@ def set_seed(seed):
 
 # Custom dataset for lyrics
 class LyricsDataset(Dataset):
-    def __init__(self, data_dir, tokenizer, max_length=512):
+    def __init__(self, data_dir, tokenizer, max_length=512, cache_size=0):
         self.tokenizer = tokenizer
         self.max_length = max_length
-        self.examples = []
-        
-        # Load all JSON files in the directory
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(data_dir, filename)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Format the text with metadata
-                    text = f"Title: {data['metadata']['title']}\nArtist: {data['metadata']['artist']}\n\nLyrics:\n{data['lyrics']}"
-                    self.examples.append(text)
+        
+        # Index the JSON files in the directory; records are read on demand
+        self.records = LyricsRecords(data_dir, cache_size=cache_size)
     
     def __len__(self):
-        return len(self.examples)
+        return len(self.records)
     
     def __getitem__(self, idx):
-        text = self.examples[idx]
+        # Format the text with metadata
+        text = format_training_text(self.records[idx])
         
         # Tokenize the text
         encodings = self.tokenizer(text, 
@@ -61,34 +61,64 @@ class LyricsDataset(Dataset):
             "labels": labels
         }
 
-def train_genre_model(genre, data_dir, output_dir, epochs=3, batch_size=4, learning_rate=5e-5):
-    """Train a model for a specific genre"""
-    print(f"Training model for {genre} genre...")
+def train_genre_model(genre, data_dir, output_dir, epochs=3, batch_size=4, learning_rate=5e-5, base_model="gpt2", max_steps=None,
+                      telemetry_dir=None, profile_start=5, profile_steps=0, dataloader_options=None, record_cache_size=0,
+                      distributed=False, seed=42, eval_steps=(), eval_batches=None, on_eval=None, save_model=True):
+    """Train a model for a specific genre
+
+    With distributed=True each process launched by launch_distributed.py trains on its own shard
+    of the data (DDP over gloo); only rank 0 saves the model.
+
+    dataloader_options are extra DataLoader keyword arguments (workers, prefetching, pinning);
+    record_cache_size keeps that many decoded song records in memory between epochs.
+    With telemetry_dir, per-step telemetry is written to <telemetry_dir>/<genre>.jsonl and,
+    if profile_steps is set, a torch.profiler trace of those steps to <genre>_trace.json.
+    After each optimizer step in eval_steps, the validation loss over up to eval_batches batches
+    is passed to on_eval(step, loss); training stops early if it returns False (used by sweep.py,
+    single process only). With on_eval the end-of-epoch validation is skipped and the final
+    weights are saved instead of the best epoch's.
+    """
+    rank, world_size = init_distributed() if distributed else (0, 1)
+    is_main = rank == 0
+    if is_main:
+        print(f"Training model for {genre} genre..." + (f" ({world_size} processes)" if world_size > 1 else ""))
     
     # Create output directory
     model_dir = os.path.join(output_dir, genre)
-    os.makedirs(model_dir, exist_ok=True)
+    if save_model:
+        os.makedirs(model_dir, exist_ok=True)
     
-    # Initialize tokenizer and model
-    tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
-    tokenizer.pad_token = tokenizer.eos_token
-    
-    model = GPT2LMHeadModel.from_pretrained("gpt2")
-    model.resize_token_embeddings(len(tokenizer))
+    # Initialize tokenizer and model; rank 0 downloads the base model first
+    with main_process_first():
+        tokenizer = GPT2Tokenizer.from_pretrained(base_model)
+        tokenizer.pad_token = tokenizer.eos_token
+        
+        model = GPT2LMHeadModel.from_pretrained(base_model)
+        model.resize_token_embeddings(len(tokenizer))
     
     # Prepare dataset and dataloader
     train_dir = os.path.join(data_dir, "train", genre)
     val_dir = os.path.join(data_dir, "val", genre)
     
-    train_dataset = LyricsDataset(train_dir, tokenizer)
-    val_dataset = LyricsDataset(val_dir, tokenizer)
+    train_dataset = LyricsDataset(train_dir, tokenizer, cache_size=record_cache_size)
+    val_dataset = LyricsDataset(val_dir, tokenizer, cache_size=record_cache_size)
+    
+    # Every rank sees a disjoint shard of the data
+    train_sampler = None
+    val_sampler = None
+    if world_size > 1:
+        train_sampler = DistributedSampler(train_dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=seed)
+        val_sampler = DistributedSampler(val_dataset, num_replicas=world_size, rank=rank, shuffle=False)
     
-    train_dataloader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_dataloader = DataLoader(val_dataset, batch_size=batch_size)
+    train_dataloader = DataLoader(train_dataset, batch_size=batch_size, shuffle=train_sampler is None,
+                                  sampler=train_sampler, **(dataloader_options or {}))
+    val_dataloader = DataLoader(val_dataset, batch_size=batch_size, sampler=val_sampler, **(dataloader_options or {}))
     
     # Set up optimizer and scheduler
-    optimizer = AdamW(model.parameters(), lr=learning_rate)
+    optimizer = AdamW(model.parameters(), lr=learning_rate, weight_decay=0.0)
     total_steps = len(train_dataloader) * epochs
+    if max_steps:
+        total_steps = min(total_steps, max_steps)
     scheduler = get_linear_schedule_with_warmup(
         optimizer, 
         num_warmup_steps=0, 
@@ -96,54 +126,111 @@ def train_genre_model(genre, data_dir, output_dir, epochs=3, batch_size=4, learn
     )
     
     # Check if GPU is available
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    device = torch.device("cuda" if torch.cuda.is_available() and world_size == 1 else "cpu")
     model.to(device)
     
+    # Gradients are averaged across ranks during backward()
+    unwrapped_model = model
+    if world_size > 1:
+        model = DistributedDataParallel(model)
+    
+    # Step timing, throughput and memory; written to JSONL when telemetry_dir is set
+    telemetry_name = genre if world_size == 1 else f"{genre}.rank{rank}"
+    telemetry = TrainingTelemetry(
+        path=os.path.join(telemetry_dir, f"{telemetry_name}.jsonl") if telemetry_dir else None,
+        device=device,
+        profile_start=profile_start,
+        profile_steps=profile_steps,
+        profile_path=os.path.join(telemetry_dir or "training_telemetry", f"{telemetry_name}_trace.json")
+    )
+    
     # Training loop
     best_val_loss = float('inf')
+    global_step = 0
+    stopped = False
     
     for epoch in range(epochs):
-        print(f"Epoch {epoch+1}/{epochs}")
+        if is_main:
+            print(f"Epoch {epoch+1}/{epochs}")
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)
         
         # Training
         model.train()
         train_loss = 0
+        train_steps = 0
+        telemetry.start_epoch()
         
-        for batch in tqdm(train_dataloader, desc="Training"):
-            input_ids = batch["input_ids"].to(device)
-            attention_mask = batch["attention_mask"].to(device)
-            labels = batch["labels"].to(device)
+        for batch in tqdm(train_dataloader, desc="Training", disable=not is_main):
+            if global_step >= total_steps:
+                break
+            telemetry.data_ready(global_step)
+            with telemetry.phase("data"):
+                input_ids = batch["input_ids"].to(device, non_blocking=True)
+                attention_mask = batch["attention_mask"].to(device, non_blocking=True)
+                labels = batch["labels"].to(device, non_blocking=True)
             
             # Forward pass
-            outputs = model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                labels=labels
-            )
-            
-            loss = outputs.loss
-            train_loss += loss.item()
+            with telemetry.phase("forward"):
+                outputs = model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    labels=labels
+                )
+                
+                loss = outputs.loss
             
             # Backward pass
-            loss.backward()
-            optimizer.step()
-            scheduler.step()
-            optimizer.zero_grad()
+            with telemetry.phase("backward"):
+                loss.backward()
+            with telemetry.phase("optimizer"):
+                optimizer.step()
+                scheduler.step()
+                optimizer.zero_grad()
+            
+            step_loss = loss.item()
+            train_loss += step_loss
+            telemetry.end_step(global_step, epoch, step_loss, attention_mask, scheduler.get_last_lr()[0])
+            train_steps += 1
+            global_step += 1
+            
+            # Step-level validation for early stopping
+            if on_eval is not None and global_step in eval_steps:
+                step_val_loss = validation_loss(unwrapped_model, val_dataloader, device, eval_batches)
+                model.train()
+                if not on_eval(global_step, step_val_loss):
+                    stopped = True
+                    break
         
-        avg_train_loss = train_loss / len(train_dataloader)
-        print(f"Average training loss: {avg_train_loss}")
+        if stopped:
+            if is_main:
+                print(f"Stopped early at step {global_step}")
+            break
+        
+        avg_train_loss = all_reduce_mean(train_loss, train_steps)
+        if is_main:
+            print(f"Average training loss: {avg_train_loss}")
+        
+        # The step-level evaluations stand in for the full pass below, which on a small
+        # corpus would otherwise run every few dozen steps
+        if on_eval is not None:
+            telemetry.end_epoch(epoch, avg_train_loss, None, 0.0)
+            if global_step >= total_steps:
+                break
+            continue
         
         # Validation
         model.eval()
         val_loss = 0
+        val_start = time.perf_counter()
         
         with torch.no_grad():
-            for batch in tqdm(val_dataloader, desc="Validation"):
+            for batch in tqdm(val_dataloader, desc="Validation", disable=not is_main):
                 input_ids = batch["input_ids"].to(device)
                 attention_mask = batch["attention_mask"].to(device)
                 labels = batch["labels"].to(device)
                 
-                outputs = model(
+                outputs = unwrapped_model(
                     input_ids=input_ids,
                     attention_mask=attention_mask,
                     labels=labels
@@ -152,19 +239,188 @@ def train_genre_model(genre, data_dir, output_dir, epochs=3, batch_size=4, learn
                 loss = outputs.loss
                 val_loss += loss.item()
         
-        avg_val_loss = val_loss / len(val_dataloader)
-        print(f"Average validation loss: {avg_val_loss}")
+        # Every rank gets the same average, so they agree on the best epoch
+        avg_val_loss = all_reduce_mean(val_loss, len(val_dataloader))
+        if is_main:
+            print(f"Average validation loss: {avg_val_loss}")
+        telemetry.end_epoch(epoch, avg_train_loss, avg_val_loss, time.perf_counter() - val_start)
         
         # Save model if it's the best so far
         if avg_val_loss < best_val_loss:
             best_val_loss = avg_val_loss
-            print(f"Saving best model with validation loss: {best_val_loss}")
-            model.save_pretrained(model_dir)
-            tokenizer.save_pretrained(model_dir)
+            if is_main and save_model:
+                print(f"Saving best model with validation loss: {best_val_loss}")
+                unwrapped_model.save_pretrained(model_dir)
+                tokenizer.save_pretrained(model_dir)
+        
+        if global_step >= total_steps:
+            break
     
-    print(f"Training complete for {genre} genre!")
+    if on_eval is not None and is_main and save_model:
+        print("Saving final model")
+        unwrapped_model.save_pretrained(model_dir)
+        tokenizer.save_pretrained(model_dir)
+    
+    summary = telemetry.close(verbose=is_main)
+    if world_size > 1:
+        total_samples_per_sec, = all_reduce_sum(summary["samples_per_sec"] or 0.0)
+        if is_main:
+            print(f"Aggregate throughput: {total_samples_per_sec:.2f} samples/sec across {world_size} processes")
+        cleanup()
+    if is_main:
+        print(f"Training complete for {genre} genre!")
     return model_dir
 
+def validation_loss(model, dataloader, device, max_batches=None):
+    """Average language-modelling loss over the first max_batches batches (all if None)"""
+    model.eval()
+    total = 0.0
+    batches = 0
+    with torch.no_grad():
+        for batch in dataloader:
+            if max_batches is not None and batches >= max_batches:
+                break
+            outputs = model(
+                input_ids=batch["input_ids"].to(device),
+                attention_mask=batch["attention_mask"].to(device),
+                labels=batch["labels"].to(device)
+            )
+            total += outputs.loss.item()
+            batches += 1
+    return total / max(batches, 1)
+
+def distillation_loss(student_logits, teacher_logits, labels, attention_mask, temperature=2.0, alpha=0.5):
+    """Blend next-token cross-entropy with KL divergence to the teacher's softened distribution"""
+    # Shift so that position i predicts token i+1, as GPT2LMHeadModel does
+    student_logits = student_logits[:, :-1, :]
+    teacher_logits = teacher_logits[:, :-1, :]
+    mask = attention_mask[:, 1:].float()
+    
+    ce_loss = F.cross_entropy(
+        student_logits.reshape(-1, student_logits.size(-1)),
+        labels[:, 1:].reshape(-1),
+        ignore_index=-100
+    )
+    
+    kl = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=-1),
+        F.log_softmax(teacher_logits / temperature, dim=-1),
+        reduction="none",
+        log_target=True
+    ).sum(-1)
+    kl_loss = (kl * mask).sum() / mask.sum().clamp(min=1) * temperature ** 2
+    
+    return alpha * ce_loss + (1 - alpha) * kl_loss
+
+def train_draft_model(genre, data_dir, output_dir, epochs=3, batch_size=4, learning_rate=5e-4,
+                      draft_layers=2, draft_embd=256, draft_heads=4, distill_temperature=2.0, distill_alpha=0.5,
+                      dataloader_options=None):
+    """Distill a small draft model from a trained genre model for speculative decoding"""
+    print(f"Distilling draft model for {genre} genre...")
+    
+    # The trained genre model is the teacher
+    teacher_dir = os.path.join(output_dir, genre)
+    if not os.path.exists(teacher_dir):
+        print(f"No trained model found for genre: {genre}, train it before distilling a draft")
+        return None
+    
+    draft_dir = os.path.join(teacher_dir, "draft")
+    os.makedirs(draft_dir, exist_ok=True)
+    
+    tokenizer = GPT2Tokenizer.from_pretrained(teacher_dir)
+    tokenizer.pad_token = tokenizer.eos_token
+    
+    teacher = GPT2LMHeadModel.from_pretrained(teacher_dir)
+    teacher.eval()
+    
+    # The draft must share the teacher's vocabulary so its tokens can be verified
+    config = GPT2Config(
+        vocab_size=teacher.config.vocab_size,
+        n_positions=teacher.config.n_positions,
+        n_embd=draft_embd,
+        n_layer=draft_layers,
+        n_head=draft_heads,
+        bos_token_id=teacher.config.bos_token_id,
+        eos_token_id=teacher.config.eos_token_id
+    )
+    student = GPT2LMHeadModel(config)
+    
+    # Prepare dataset and dataloader
+    train_dataset = LyricsDataset(os.path.join(data_dir, "train", genre), tokenizer)
+    val_dataset = LyricsDataset(os.path.join(data_dir, "val", genre), tokenizer)
+    
+    train_dataloader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **(dataloader_options or {}))
+    val_dataloader = DataLoader(val_dataset, batch_size=batch_size, **(dataloader_options or {}))
+    
+    # Set up optimizer and scheduler
+    optimizer = AdamW(student.parameters(), lr=learning_rate, weight_decay=0.0)
+    total_steps = len(train_dataloader) * epochs
+    scheduler = get_linear_schedule_with_warmup(
+        optimizer,
+        num_warmup_steps=0,
+        num_training_steps=total_steps
+    )
+    
+    # Check if GPU is available
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    teacher.to(device)
+    student.to(device)
+    
+    best_val_loss = float('inf')
+    
+    for epoch in range(epochs):
+        print(f"Epoch {epoch+1}/{epochs}")
+        
+        # Training
+        student.train()
+        train_loss = 0
+        
+        for batch in tqdm(train_dataloader, desc="Distilling"):
+            input_ids = batch["input_ids"].to(device)
+            attention_mask = batch["attention_mask"].to(device)
+            labels = batch["labels"].to(device)
+            
+            with torch.no_grad():
+                teacher_logits = teacher(input_ids=input_ids, attention_mask=attention_mask).logits
+            
+            student_logits = student(input_ids=input_ids, attention_mask=attention_mask).logits
+            loss = distillation_loss(student_logits, teacher_logits, labels, attention_mask,
+                                     distill_temperature, distill_alpha)
+            train_loss += loss.item()
+            
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+        
+        avg_train_loss = train_loss / len(train_dataloader)
+        print(f"Average distillation loss: {avg_train_loss}")
+        
+        # Validation on plain language-modelling loss
+        student.eval()
+        val_loss = 0
+        
+        with torch.no_grad():
+            for batch in tqdm(val_dataloader, desc="Validation"):
+                outputs = student(
+                    input_ids=batch["input_ids"].to(device),
+                    attention_mask=batch["attention_mask"].to(device),
+                    labels=batch["labels"].to(device)
+                )
+                val_loss += outputs.loss.item()
+        
+        avg_val_loss = val_loss / len(val_dataloader)
+        print(f"Average validation loss: {avg_val_loss}")
+        
+        if avg_val_loss < best_val_loss:
+            best_val_loss = avg_val_loss
+            print(f"Saving best draft model with validation loss: {best_val_loss}")
+            student.save_pretrained(draft_dir)
+            tokenizer.save_pretrained(draft_dir)
+    
+    print(f"Draft distillation complete for {genre} genre!")
+    return draft_dir
+
 def main():
     parser = argparse.ArgumentParser(description="Train genre-specific lyrics generation models")
     parser.add_argument("--data_dir", type=str, default="processed_lyrics_data", help="Directory with processed lyrics data")
@@ -174,6 +430,20 @@ def main():
     parser.add_argument("--learning_rate", type=float, default=5e-5, help="Learning rate")
     parser.add_argument("--genre", type=str, help="Specific genre to train (if not specified, train all genres)")
     parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility")
+    parser.add_argument("--base_model", type=str, default="gpt2", help="Pretrained model name or directory to fine-tune from")
+    parser.add_argument("--max_steps", type=int, help="Stop training after this many optimizer steps")
+    parser.add_argument("--telemetry_dir", type=str, help="Write per-step training telemetry (JSONL) for each genre to this directory")
+    parser.add_argument("--profile_steps", type=int, default=0, help="Record a torch.profiler trace for this many steps")
+    parser.add_argument("--profile_start", type=int, default=5, help="First step of the profiler window (after warm-up)")
+    add_dataloader_args(parser)
+    parser.add_argument("--record_cache_size", type=int, default=0, help="Decoded song records kept in memory between epochs (0 = read from disk every time)")
+    parser.add_argument("--distributed", action="store_true", help="Train with DistributedDataParallel (gloo); set by launch_distributed.py")
+    parser.add_argument("--distill_draft", action="store_true", help="Distill a small draft model from each trained genre model for speculative decoding")
+    parser.add_argument("--draft_layers", type=int, default=2, help="Number of transformer layers in the draft model")
+    parser.add_argument("--draft_embd", type=int, default=256, help="Hidden size of the draft model")
+    parser.add_argument("--draft_learning_rate", type=float, default=5e-4, help="Learning rate for the draft model (trained from scratch)")
+    parser.add_argument("--distill_temperature", type=float, default=2.0, help="Softmax temperature for distillation")
+    parser.add_argument("--distill_alpha", type=float, default=0.5, help="Weight of the cross-entropy term in the distillation loss")
     
     args = parser.parse_args()
     
@@ -190,6 +460,25 @@ def main():
         genres = [d for d in os.listdir(os.path.join(args.data_dir, "train")) 
                  if os.path.isdir(os.path.join(args.data_dir, "train", d))]
     
+    # Distill draft models from the already trained genre models
+    if args.distill_draft:
+        for genre in genres:
+            train_draft_model(
+                genre=genre,
+                data_dir=args.data_dir,
+                output_dir=args.output_dir,
+                epochs=args.epochs,
+                batch_size=args.batch_size,
+                learning_rate=args.draft_learning_rate,
+                draft_layers=args.draft_layers,
+                draft_embd=args.draft_embd,
+                distill_temperature=args.distill_temperature,
+                distill_alpha=args.distill_alpha,
+                dataloader_options=dataloader_kwargs_from_args(args)
+            )
+        print("All draft models distilled successfully!")
+        return
+    
     # Train models for each genre
     for genre in genres:
         train_genre_model(
@@ -198,10 +487,21 @@ def main():
             output_dir=args.output_dir,
             epochs=args.epochs,
             batch_size=args.batch_size,
-            learning_rate=args.learning_rate
+            learning_rate=args.learning_rate,
+            base_model=args.base_model,
+            max_steps=args.max_steps,
+            telemetry_dir=args.telemetry_dir,
+            profile_start=args.profile_start,
+            profile_steps=args.profile_steps,
+            dataloader_options=dataloader_kwargs_from_args(args),
+            record_cache_size=args.record_cache_size,
+            distributed=args.distributed,
+            seed=args.seed
         )
     
-    print("All models trained successfully!")
+    # The process group is gone once each genre's training has cleaned up, so ask the launcher
+    if not args.distributed or int(os.environ.get("RANK", "0")) == 0:
+        print("All models trained successfully!")
 
 if __name__ == "__main__":
     main()
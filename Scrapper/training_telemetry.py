@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PHASES = ("data", "forward", "backward", "optimizer")
+
+# torch is imported where it is used, so processes that never load it (the
+# benchmarks' scraping stages) can use peak_rss_mb without inflating it
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class TrainingTelemetry:
+    """Per-step timing, throughput and memory for a training loop.
+
+    Call ``data_ready()`` once a batch has been fetched, wrap the forward,
+    backward and optimizer work in ``phase()``, then ``end_step()``. Each step
+    is appended to ``path`` as a JSON line when a path is given; ``close()``
+    writes and returns a summary. Steps ``profile_start`` to
+    ``profile_start + profile_steps - 1`` are recorded with torch.profiler
+    and exported as a Chrome trace to ``profile_path``.
+    """
+
+    def __init__(self, path=None, device=None, profile_start=None, profile_steps=0, profile_path=None):
+        import torch
+
+        self.path = path
+        self.device = device or torch.device("cpu")
+        # CUDA kernels run asynchronously, so phases are only accurate after a sync
+        self.synchronize = self.device.type == "cuda" and path is not None
+        self.profile_start = profile_start
+        self.profile_steps = profile_steps
+        self.profile_path = profile_path
+        self.profiler = None
+        self.file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.file = open(path, 'w', encoding='utf-8')
+
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self.steps = 0
+        self.samples = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.started = time.perf_counter()
+        self.current = {}
+        self._mark = self.started
+
+    def _sync(self):
+        if self.synchronize:
+            import torch
+            torch.cuda.synchronize(self.device)
+
+    def _write(self, record):
+        if self.file is not None:
+            self.file.write(json.dumps(record) + "\n")
+
+    def start_epoch(self):
+        """Reset the data-loading clock, e.g. after validation"""
+        self._mark = time.perf_counter()
+
+    def data_ready(self, step):
+        """The batch for `step` has been fetched; starts the profiler window if due"""
+        self.current = {"data": time.perf_counter() - self._mark}
+        if self.profile_steps and self.profiler is None and step == self.profile_start:
+            import torch
+            self.profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU] +
+                           ([torch.profiler.ProfilerActivity.CUDA] if self.device.type == "cuda" else []),
+                record_shapes=True,
+                profile_memory=True
+            )
+            self.profiler.__enter__()
+
+    @contextmanager
+    def phase(self, name):
+        self._sync()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._sync()
+            self.current[name] = self.current.get(name, 0.0) + time.perf_counter() - start
+
+    def end_step(self, step, epoch, loss, attention_mask, learning_rate):
+        """Record a finished optimizer step"""
+        tokens = int(attention_mask.sum().item())
+        padded = attention_mask.numel()
+        step_seconds = sum(self.current.values())
+
+        for phase in PHASES:
+            self.totals[phase] += self.current.get(phase, 0.0)
+        self.steps += 1
+        self.samples += attention_mask.shape[0]
+        self.tokens += tokens
+        self.padded_tokens += padded
+
+        record = {
+            "type": "step",
+            "step": step,
+            "epoch": epoch,
+            "loss": loss,
+            "learning_rate": learning_rate,
+            **{f"{phase}_seconds": round(self.current.get(phase, 0.0), 6) for phase in PHASES},
+            "step_seconds": round(step_seconds, 6),
+            "tokens": tokens,
+            "tokens_per_sec": tokens / step_seconds if step_seconds else None,
+            "padding_ratio": 1 - tokens / padded if padded else 0.0,
+            "peak_rss_mb": peak_rss_mb()
+        }
+        if self.device.type == "cuda":
+            import torch
+            record["peak_cuda_mb"] = torch.cuda.max_memory_allocated(self.device) / (1024 * 1024)
+        self._write(record)
+
+        if self.profiler is not None:
+            if step + 1 >= self.profile_start + self.profile_steps:
+                self._stop_profiler()
+
+        self._mark = time.perf_counter()
+
+    def _stop_profiler(self):
+        self.profiler.__exit__(None, None, None)
+        if self.profile_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            self.profiler.export_chrome_trace(self.profile_path)
+            print(f"Profiler trace saved to {self.profile_path}")
+        self.profiler = None
+        self.profile_steps = 0
+
+    def end_epoch(self, epoch, train_loss, val_loss, val_seconds):
+        self._write({
+            "type": "epoch",
+            "epoch": epoch,
+            "train_loss": train_loss,
+            "val_loss": val_loss,
+            "val_seconds": round(val_seconds, 6)
+        })
+
+    def summary(self):
+        step_seconds = sum(self.totals.values())
+        summary = {
+            "type": "summary",
+            "steps": self.steps,
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "samples": self.samples,
+            "samples_per_sec": self.samples / step_seconds if step_seconds else None,
+            "tokens": self.tokens,
+            "tokens_per_sec": self.tokens / step_seconds if step_seconds else None,
+            "padding_ratio": 1 - self.tokens / self.padded_tokens if self.padded_tokens else 0.0,
+            "peak_rss_mb": peak_rss_mb()
+        }
+        for phase in PHASES:
+            summary[f"{phase}_seconds"] = round(self.totals[phase], 3)
+            summary[f"{phase}_fraction"] = self.totals[phase] / step_seconds if step_seconds else 0.0
+        if self.device.type == "cuda":
+            import torch
+            summary["peak_cuda_mb"] = torch.cuda.max_memory_allocated(self.device) / (1024 * 1024)
+        return summary
+
+    def close(self, verbose=True):
+        """Write the summary record, print it (if verbose) and return it"""
+        if self.profiler is not None:
+            self._stop_profiler()
+        summary = self.summary()
+        self._write(summary)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if not verbose:
+            return summary
+
+        print(f"Steps: {summary['steps']}, tokens/sec: {summary['tokens_per_sec'] or 0:.0f}, "
+              f"padding: {summary['padding_ratio']:.1%}")
+        print("Step time: " + ", ".join(f"{phase} {summary[f'{phase}_fraction']:.1%}" for phase in PHASES))
+        if summary["peak_rss_mb"] is not None:
+            print(f"Peak RSS: {summary['peak_rss_mb']:.0f} MB")
+        return summary
@@ -0,0 +1,13 @@
+"""WSGI entry point for production serving.
+
+Run with gunicorn so the models are preloaded once in the master process and
+shared copy-on-write by the forked workers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from api import app, preload_models
+
+# Runs in the gunicorn master before forking (preload_app = True). Only load
+# weights here; running inference before the fork would start torch's thread
+# pools in the parent, which forked children cannot safely inherit.
+preload_models()